@@ -1,3 +1,4 @@
+import inspect
 import sys
 
 from gunicorn import six
@@ -82,6 +83,9 @@ if six.PY3:
 
     _unquote_to_bytes = urllib.parse.unquote_to_bytes
 
+    # getargspec was removed in Python 3.11
+    getargspec = inspect.getfullargspec
+
 else:
     def execfile_(fname, *args):
         """ Overriding PY2 execfile() implementation to support .pyc files """
@@ -92,11 +96,15 @@ else:
     def bytes_to_str(s):
         if isinstance(s, unicode):
             return s.encode('utf-8')
+        elif isinstance(s, bytearray):
+            return str(s)
         return s
 
     import urllib
     unquote_to_wsgi_str = urllib.unquote
 
+    getargspec = inspect.getargspec
+
 
 # The following code adapted from trollius.py33_exceptions
 def _wrap_error(exc, mapping, key):
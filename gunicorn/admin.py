@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import errno
+import json
+import os
+import socket
+import stat
+
+from gunicorn import util
+
+
+class AdminSocket(object):
+    """\
+    Unix socket of the arbiter. Every client connecting to it is sent the
+    scoreboard of the workers as a JSON document and disconnected.
+    """
+
+    def __init__(self, path, cfg):
+        self.path = path
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            if e.args[0] != errno.ENOENT:
+                raise
+        else:
+            if stat.S_ISSOCK(st.st_mode):
+                os.remove(path)
+            else:
+                raise ValueError("%r is not a socket" % path)
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(cfg.umask)
+        try:
+            self.sock.bind(path)
+        finally:
+            os.umask(old_umask)
+        self.inode = os.stat(path).st_ino
+        self.sock.setblocking(0)
+        self.sock.listen(5)
+        util.close_on_exec(self.sock.fileno())
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def status(self, arbiter):
+        workers = []
+        for pid, worker in sorted(arbiter.WORKERS.items(),
+                key=lambda w: w[1].age):
+            status = worker.tmp.status()
+            status.update({"pid": pid, "age": worker.age})
+            workers.append(status)
+
+        return {
+            "pid": arbiter.pid,
+            "num_workers": arbiter.num_workers,
+            "workers": workers
+        }
+
+    def handle(self, arbiter):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except socket.error as e:
+                if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK,
+                        errno.ECONNABORTED, errno.EINTR):
+                    raise
+                return
+
+            try:
+                self.reply(client, arbiter)
+            except socket.error:
+                pass
+            finally:
+                util.close(client)
+
+    def reply(self, client, arbiter):
+        """\
+        Send the scoreboard to ``client`` without waiting for it. The
+        socket buffer is grown to hold it, what doesn't fit is dropped.
+        """
+        data = json.dumps(self.status(arbiter), sort_keys=True)
+        data = data.encode("utf-8") + b"\n"
+        client.setblocking(0)
+        if len(data) > client.getsockopt(socket.SOL_SOCKET,
+                socket.SO_SNDBUF):
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF,
+                    len(data))
+        client.send(data)
+
+    def close(self, unlink=True):
+        util.close(self.sock)
+        if not unlink:
+            return
+
+        # a new master started by USR2 may have replaced the socket
+        try:
+            if os.stat(self.path).st_ino == self.inode:
+                util.unlink(self.path)
+        except OSError:
+            pass
@@ -5,21 +5,28 @@
 from __future__ import print_function
 
 import errno
+import heapq
+import math
 import os
-import random
-import select
 import signal
 import sys
 import time
 import traceback
 
+from gunicorn.admin import AdminSocket
 from gunicorn.errors import HaltServer, AppImportError
+from gunicorn.forkserver import ForkServer
 from gunicorn.pidfile import Pidfile
 from gunicorn.sock import create_sockets
 from gunicorn import util
 
 from gunicorn import __version__, SERVER_SOFTWARE
 
+try:
+    import selectors
+except ImportError:  # python < 3.4
+    from gunicorn import selectors
+
 
 class Arbiter(object):
     """
@@ -41,6 +48,7 @@ class Arbiter(object):
     LISTENERS = []
     WORKERS = {}
     PIPE = []
+    ADMIN = None
 
     # I love dynamic languages
     SIG_QUEUE = []
@@ -55,6 +63,21 @@ class Arbiter(object):
         os.environ["SERVER_SOFTWARE"] = SERVER_SOFTWARE
 
         self._num_workers = None
+        self.fork_server = None
+        self.subreaper = False
+        self.selector = None
+        # heap of (deadline, pid, age), when to check the heartbeat of the
+        # workers next
+        self.timeouts = []
+        # pidfds of the workers by pid, readable once the worker exits
+        self.pidfds = {}
+        self.load_samples = []
+        self.last_scale = util.monotonic()
+        # age of the last worker started before a rolling reload, until
+        # they are all replaced
+        self.reload_age = None
+        # the autoscaling thresholds, (down, up) in percent
+        self.scale_thresholds = None
         self.setup(app)
 
         self.pidfile = None
@@ -83,7 +106,7 @@ class Arbiter(object):
         self.cfg.nworkers_changed(self, value, old_value)
     num_workers = property(_get_num_workers, _set_num_workers)
 
-    def setup(self, app):
+    def setup(self, app, reloading=False):
         self.app = app
         self.cfg = app.cfg
         self.log = self.cfg.logger_class(app.cfg)
@@ -94,7 +117,14 @@ class Arbiter(object):
 
         self.worker_class = self.cfg.worker_class
         self.address = self.cfg.address
-        self.num_workers = self.cfg.workers
+        num_workers = self.cfg.workers
+        if self.cfg.max_workers:
+            min_workers = min(self.cfg.min_workers, self.cfg.max_workers)
+            num_workers = max(min_workers,
+                              min(num_workers, self.cfg.max_workers))
+        self.num_workers = num_workers
+        if self.cfg.max_workers:
+            self.set_scale_thresholds(reloading)
         self.timeout = self.cfg.timeout
         self.proc_name = self.cfg.proc_name
 
@@ -112,6 +142,8 @@ class Arbiter(object):
 
         if self.cfg.preload_app:
             self.app.wsgi()
+            if self.cfg.gc_freeze:
+                util.gc_freeze()
 
     def start(self):
         """\
@@ -129,6 +161,15 @@ class Arbiter(object):
         if not self.LISTENERS:
             self.LISTENERS = create_sockets(self.cfg, self.log)
 
+        if self.cfg.admin_socket and self.ADMIN is None:
+            self.ADMIN = AdminSocket(self.cfg.admin_socket, self.cfg)
+        if self.ADMIN is not None:
+            self.selector.register(self.ADMIN, selectors.EVENT_READ,
+                                   lambda: self.ADMIN.handle(self))
+
+        if self.cfg.fork_server:
+            self.start_fork_server()
+
         listeners_str = ",".join([str(l) for l in self.LISTENERS])
         self.log.debug("Arbiter booted")
         self.log.info("Listening at: %s (%s)", listeners_str, self.pid)
@@ -153,6 +194,12 @@ class Arbiter(object):
 
         self.log.close_on_exec()
 
+        if self.selector is not None:
+            self.selector.close()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.PIPE[0], selectors.EVENT_READ,
+                               self.clear_pipe)
+
         # initialize all signals
         [signal.signal(s, self.signal) for s in self.SIGNALS]
         signal.signal(signal.SIGCHLD, self.handle_chld)
@@ -174,7 +221,9 @@ class Arbiter(object):
                 if sig is None:
                     self.sleep()
                     self.murder_workers()
+                    self.autoscale()
                     self.manage_workers()
+                    self.roll_workers()
                     continue
 
                 if sig not in self.SIG_NAMES:
@@ -296,45 +345,40 @@ class Arbiter(object):
             self.log.info("Reason: %s", reason)
         if self.pidfile is not None:
             self.pidfile.unlink()
+        if self.ADMIN is not None:
+            self.ADMIN.close()
         self.cfg.on_exit(self)
         sys.exit(exit_status)
 
     def sleep(self):
         """\
-        Sleep until PIPE is readable or we timeout.
-        A readable PIPE means a signal occurred.
+        Sleep until a signal is received, a worker exits, a client connects
+        to the admin socket or the heartbeat of a worker is due.
         """
-        if self.WORKERS:
-            worker_values = list(self.WORKERS.values())
-
-            oldest = time.time()
-            for w in worker_values:
-                try:
-                    last_update = w.tmp.last_update()
-                    if last_update < oldest:
-                        oldest = last_update
-                except ValueError:
-                    pass
-
-            timeout = self.timeout - (time.time() - oldest)
-            # The timeout can be reached, so don't wait for a negative value
-            timeout = max(timeout, 1.0)
-        else:
-            timeout = 1.0
         try:
-            ready = select.select([self.PIPE[0]], [], [], timeout)
-            if not ready[0]:
-                return
-            while os.read(self.PIPE[0], 1):
+            events = self.selector.select(self.sleep_timeout())
+        except KeyboardInterrupt:
+            sys.exit()
+        for key, _ in events:
+            key.data()
+        self.close_pidfds()
+
+    def sleep_timeout(self):
+        timeout = None
+        if self.timeout and self.timeouts:
+            timeout = max(self.timeouts[0][0] - util.monotonic(), 0)
+        if self.cfg.max_workers:
+            # the load is sampled every second when autoscaling
+            timeout = 1.0 if timeout is None else min(timeout, 1.0)
+        return timeout
+
+    def clear_pipe(self):
+        try:
+            while os.read(self.PIPE[0], 4096):
                 pass
-        except select.error as e:
-            if e.args[0] not in [errno.EAGAIN, errno.EINTR]:
-                raise
-        except OSError as e:
+        except (IOError, OSError) as e:
             if e.errno not in [errno.EAGAIN, errno.EINTR]:
                 raise
-        except KeyboardInterrupt:
-            sys.exit()
 
     def stop(self, graceful=True):
         """\
@@ -344,6 +388,9 @@ class Arbiter(object):
         killed gracefully  (ie. trying to wait for the current connection)
         """
         self.LISTENERS = []
+        if self.fork_server is not None:
+            self.fork_server.stop()
+            self.fork_server = None
         sig = signal.SIGTERM
         if not graceful:
             sig = signal.SIGQUIT
@@ -368,6 +415,8 @@ class Arbiter(object):
         environ = self.cfg.env_orig.copy()
         fds = [l.fileno() for l in self.LISTENERS]
         environ['GUNICORN_FD'] = ",".join([str(fd) for fd in fds])
+        # sockets aren't inheritable by default since python 3.4
+        [util.inherit_on_exec(fd) for fd in fds]
 
         os.chdir(self.START_CTX['cwd'])
         self.cfg.pre_exec(self)
@@ -393,7 +442,7 @@ class Arbiter(object):
 
         # reload conf
         self.app.reload()
-        self.setup(self.app)
+        self.setup(self.app, reloading=True)
 
         # reopen log files
         self.log.reopen_files()
@@ -421,8 +470,23 @@ class Arbiter(object):
         # set new proc_name
         util._setproctitle("master [%s]" % self.proc_name)
 
+        # spare workers and the fork server run the old code
+        for pid, worker in self.spare_workers():
+            self.retire_worker(pid, worker)
+        if self.fork_server is not None:
+            self.fork_server.stop()
+            self.fork_server = None
+        if self.cfg.fork_server:
+            self.start_fork_server()
+
+        if self.cfg.reload_batch_size:
+            # the workers started until now are replaced in batches
+            self.reload_age = self.worker_age
+            self.roll_workers()
+            return
+
         # spawn new workers
-        for i in range(self.cfg.workers):
+        for i in range(self.num_workers):
             self.spawn_worker()
 
         # manage workers
@@ -434,12 +498,15 @@ class Arbiter(object):
         """
         if not self.timeout:
             return
-        workers = list(self.WORKERS.items())
-        for (pid, worker) in workers:
-            try:
-                if time.time() - worker.tmp.last_update() <= self.timeout:
-                    continue
-            except ValueError:
+        now = util.monotonic()
+        while self.timeouts and self.timeouts[0][0] <= now:
+            _, pid, age = heapq.heappop(self.timeouts)
+            worker = self.WORKERS.get(pid)
+            if worker is None or worker.age != age:
+                continue
+            deadline = worker.tmp.last_update() + self.timeout
+            if deadline > now:
+                heapq.heappush(self.timeouts, (deadline, pid, age))
                 continue
 
             if not worker.aborted:
@@ -448,6 +515,72 @@ class Arbiter(object):
                 self.kill_worker(pid, signal.SIGABRT)
             else:
                 self.kill_worker(pid, signal.SIGKILL)
+            # check again in a second if it is still there
+            heapq.heappush(self.timeouts, (now + 1.0, pid, age))
+
+    def autoscale(self):
+        """\
+        Adjust the number of workers to the load, averaged over
+        ``scale_cooldown`` seconds, when ``max_workers`` is set.
+        """
+        if not self.cfg.max_workers or not self.WORKERS:
+            return
+
+        workers = self.active_workers()
+        if not workers:
+            return
+
+        # the requests in progress and the connections waiting to be
+        # accepted, relative to what the workers can handle at once
+        busy = sum(w.tmp.active() for _, w in workers)
+        busy += sum(l.queued() or 0 for l in self.LISTENERS)
+        capacity = len(workers) * self.worker_class.capacity(self.cfg)
+        self.load_samples.append(100.0 * busy / capacity)
+
+        now = util.monotonic()
+        if now - self.last_scale < self.cfg.scale_cooldown:
+            return
+        load = sum(self.load_samples) / len(self.load_samples)
+        self.load_samples = []
+        self.last_scale = now
+
+        min_workers = min(self.cfg.min_workers, self.cfg.max_workers)
+        num_workers = self.num_workers
+        down, up = self.scale_thresholds
+        if load >= up:
+            # enough workers to bring the load under the threshold
+            wanted = num_workers * load / up
+            num_workers = max(int(math.ceil(wanted)), num_workers + 1)
+        elif load <= down:
+            num_workers -= 1
+
+        num_workers = max(min_workers, min(num_workers, self.cfg.max_workers))
+        if num_workers != self.num_workers:
+            self.log.info("Load at %d%%, scaling from %s to %s workers",
+                          load, self.num_workers, num_workers)
+            self.num_workers = num_workers
+
+    def set_scale_thresholds(self, reloading):
+        """\
+        Use the autoscaling thresholds of the configuration. Wrong ones
+        stop the arbiter from starting, a reload keeps the previous ones.
+        """
+        down = self.cfg.scale_down_threshold
+        up = self.cfg.scale_up_threshold
+        if down < up:
+            self.scale_thresholds = (down, up)
+            return
+
+        msg = ("scale_down_threshold (%s) must be less than "
+               "scale_up_threshold (%s)" % (down, up))
+        if not reloading:
+            raise RuntimeError(msg)
+        if self.scale_thresholds is None:
+            # autoscaling was off until now
+            self.scale_thresholds = (
+                self.cfg.settings["scale_down_threshold"].default,
+                self.cfg.settings["scale_up_threshold"].default)
+        self.log.error("%s, keeping %s and %s", msg, *self.scale_thresholds)
 
     def reap_workers(self):
         """\
@@ -460,6 +593,10 @@ class Arbiter(object):
                     break
                 if self.reexec_pid == wpid:
                     self.reexec_pid = 0
+                elif self.subreaper and wpid not in self.WORKERS and \
+                        not (self.fork_server and wpid == self.fork_server.pid):
+                    # an orphaned process adopted by the arbiter
+                    continue
                 else:
                     # A worker said it cannot boot. We'll shutdown
                     # to avoid infinite start/stop cycles.
@@ -474,42 +611,138 @@ class Arbiter(object):
                     if not worker:
                         continue
                     worker.tmp.close()
+                    if worker.spare is not None:
+                        os.close(worker.spare)
         except OSError as e:
             if e.errno != errno.ECHILD:
                 raise
 
+    def active_workers(self):
+        """\
+        Return the workers accepting connections, oldest first. Workers
+        about to exit and spare workers are left out.
+        """
+        for worker in self.WORKERS.values():
+            if worker.tmp.requests() >= worker.max_requests:
+                # it reached max_requests and exits after its requests
+                worker.retiring = True
+        workers = [(pid, w) for pid, w in self.WORKERS.items()
+                   if w.spare is None and not w.retiring]
+        return sorted(workers, key=lambda w: w[1].age)
+
+    def spare_workers(self):
+        """\
+        Return the spare workers, oldest first.
+        """
+        workers = [(pid, w) for pid, w in self.WORKERS.items()
+                   if w.spare is not None and not w.retiring]
+        return sorted(workers, key=lambda w: w[1].age)
+
     def manage_workers(self):
         """\
         Maintain the number of workers by spawning or killing
-        as required.
+        as required. Missing workers are replaced by spare workers
+        first.
         """
-        if len(self.WORKERS.keys()) < self.num_workers:
+        workers = self.active_workers()
+        spares = self.spare_workers()
+        while len(workers) < self.num_workers and spares:
+            (pid, worker) = spares.pop(0)
+            if self.promote_worker(pid, worker):
+                workers.append((pid, worker))
+
+        if len(workers) < self.num_workers:
             self.spawn_workers()
+            workers = self.active_workers()
+
+        # during a rolling reload, the old workers are stopped once their
+        # replacements are ready
+        while len(workers) > self.num_workers and self.reload_age is None:
+            (pid, worker) = workers.pop(0)
+            self.retire_worker(pid, worker)
 
-        workers = self.WORKERS.items()
-        workers = sorted(workers, key=lambda w: w[1].age)
-        while len(workers) > self.num_workers:
-            (pid, _) = workers.pop(0)
-            self.kill_worker(pid, signal.SIGTERM)
+        num_spares = self.cfg.spare_workers if self.num_workers else 0
+        for i in range(num_spares - len(spares)):
+            self.spawn_worker(spare=True)
+        while len(spares) > num_spares:
+            (pid, worker) = spares.pop(0)
+            self.retire_worker(pid, worker)
 
         self.log.debug("{0} workers".format(len(workers)),
                        extra={"metric": "gunicorn.workers",
                               "value": len(workers),
                               "mtype": "gauge"})
 
-    def spawn_worker(self):
+    def roll_workers(self):
+        """\
+        Replace the workers started before a rolling reload,
+        ``reload_batch_size`` at a time. Old workers are stopped once all
+        the new workers are ready.
+        """
+        if self.reload_age is None:
+            return
+        workers = self.active_workers()
+        new = [(pid, w) for pid, w in workers if w.age > self.reload_age]
+        if not all(w.tmp.ready() for _, w in new):
+            return
+
+        old = [(pid, w) for pid, w in workers if w.age <= self.reload_age]
+        excess = max(len(workers) - self.num_workers, 0)
+        for pid, worker in old[:excess]:
+            self.retire_worker(pid, worker)
+        old = old[excess:]
+        if not old:
+            self.log.info("Rolling reload done")
+            self.reload_age = None
+            return
+        for i in range(min(self.cfg.reload_batch_size, len(old))):
+            self.spawn_worker()
+
+    def spawn_worker(self, spare=False):
         self.worker_age += 1
         worker = self.worker_class(self.worker_age, self.pid, self.LISTENERS,
                                    self.app, self.timeout / 2.0,
                                    self.cfg, self.log)
+        if spare:
+            fds = os.pipe()
+            util.close_on_exec(fds[1])
         self.cfg.pre_fork(self, worker)
+        if self.fork_server is not None and not spare:
+            pid = self.fork_server.spawn(worker)
+            if pid is not None:
+                self.add_worker(pid, worker)
+                return pid
+            if self.fork_server.pid is None:
+                self.fork_server = None
+
         pid = os.fork()
         if pid != 0:
-            self.WORKERS[pid] = worker
+            if spare:
+                os.close(fds[0])
+                worker.spare = fds[1]
+            self.add_worker(pid, worker)
             return pid
 
         # Process Child
+        if spare:
+            os.close(fds[1])
+            worker.spare = fds[0]
+        self.run_worker(worker)
+
+    def run_worker(self, worker):
+        """\
+        Run ``worker`` in the process forked for it, never returns.
+        """
         worker_pid = os.getpid()
+        if self.ADMIN is not None:
+            self.ADMIN.close(unlink=False)
+        if self.selector is not None:
+            self.selector.close()
+        for fd in self.pidfds.values():
+            os.close(fd)
+        for other in self.WORKERS.values():
+            if other.spare is not None:
+                os.close(other.spare)
         try:
             util._setproctitle("worker [%s]" % self.proc_name)
             self.log.info("Booting worker with pid: %s", worker_pid)
@@ -538,6 +771,18 @@ class Arbiter(object):
             except:
                 pass
 
+    def start_fork_server(self):
+        """\
+        Start the process forking the workers, the arbiter adopts them.
+        """
+        self.subreaper = self.subreaper or util.set_child_subreaper()
+        if not self.subreaper:
+            self.log.warning("The fork server needs Linux 3.4 or later, the "
+                             "workers are forked by the arbiter.")
+            return
+        self.fork_server = ForkServer(self)
+        self.fork_server.start()
+
     def spawn_workers(self):
         """\
         Spawn new workers as needed.
@@ -546,9 +791,67 @@ class Arbiter(object):
         of the master process.
         """
 
-        for i in range(self.num_workers - len(self.WORKERS.keys())):
+        for i in range(self.num_workers - len(self.active_workers())):
             self.spawn_worker()
-            time.sleep(0.1 * random.random())
+
+    def add_worker(self, pid, worker):
+        """\
+        Track a worker just forked: its heartbeat and, when possible, its
+        exit with a pidfd (Linux 5.3 and Python 3.9 or later).
+        """
+        self.WORKERS[pid] = worker
+        if self.timeout:
+            deadline = worker.tmp.last_update() + self.timeout
+            heapq.heappush(self.timeouts, (deadline, pid, worker.age))
+
+        if not hasattr(os, "pidfd_open") or self.selector is None:
+            return
+        self.close_pidfd(pid)
+        try:
+            fd = os.pidfd_open(pid)
+        except OSError:
+            return
+        util.close_on_exec(fd)
+        self.pidfds[pid] = fd
+        self.selector.register(fd, selectors.EVENT_READ, self.reap_workers)
+
+    def close_pidfd(self, pid):
+        fd = self.pidfds.pop(pid, None)
+        if fd is not None:
+            self.selector.unregister(fd)
+            os.close(fd)
+
+    def close_pidfds(self):
+        """\
+        Close the pidfds of the workers reaped.
+        """
+        for pid in [pid for pid in self.pidfds if pid not in self.WORKERS]:
+            self.close_pidfd(pid)
+
+    def promote_worker(self, pid, worker):
+        """\
+        Let a spare worker accept connections. Return False when it is
+        already gone.
+        """
+        self.log.info("Promoting spare worker (pid: %s)", pid)
+        try:
+            os.write(worker.spare, b".")
+        except OSError as e:
+            if e.errno != errno.EPIPE:
+                raise
+            worker.retiring = True
+            return False
+        finally:
+            os.close(worker.spare)
+            worker.spare = None
+        return True
+
+    def retire_worker(self, pid, worker):
+        """\
+        Stop a worker gracefully, it is not counted anymore.
+        """
+        worker.retiring = True
+        self.kill_worker(pid, signal.SIGTERM)
 
     def kill_workers(self, sig):
         """\
@@ -573,6 +876,8 @@ class Arbiter(object):
                 try:
                     worker = self.WORKERS.pop(pid)
                     worker.tmp.close()
+                    if worker.spare is not None:
+                        os.close(worker.spare)
                     self.cfg.worker_exit(self, worker)
                     return
                 except (KeyError, OSError):
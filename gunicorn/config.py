@@ -159,6 +159,22 @@ class Config(object):
             logger_class.install()
         return logger_class
 
+    @property
+    def parser_class(self):
+        uri = self.settings['parser_class'].get()
+        uri = {
+            "auto": "gunicorn.http.parser.DefaultRequestParser",
+            "python": "gunicorn.http.parser.RequestParser",
+            "httptools": "gunicorn.http.parser.HttptoolsRequestParser"
+        }.get(uri, uri)
+
+        parser_class = util.load_class(uri,
+            default="gunicorn.http.parser.RequestParser",
+            section="gunicorn.parsers")
+        if hasattr(parser_class, "setup"):
+            parser_class.setup()
+        return parser_class
+
     @property
     def is_ssl(self):
         return self.certfile or self.keyfile
@@ -309,6 +325,13 @@ def validate_pos_int(val):
     return val
 
 
+def validate_percent(val):
+    val = validate_pos_int(val)
+    if not 1 <= val <= 100:
+        raise ValueError("Value must be between 1 and 100: %s" % val)
+    return val
+
+
 def validate_string(val):
     if val is None:
         return None
@@ -363,7 +386,7 @@ def validate_callable(arity):
                     "" % (obj_name, mod_name))
         if not six.callable(val):
             raise TypeError("Value is not six.callable: %s" % val)
-        if arity != -1 and arity != len(inspect.getargspec(val)[0]):
+        if arity != -1 and arity != len(_compat.getargspec(val)[0]):
             raise TypeError("Value must have an arity of: %s" % arity)
         return val
     return _validate_callable
@@ -401,7 +424,7 @@ def validate_group(val):
 def validate_post_request(val):
     val = validate_callable(-1)(val)
 
-    largs = len(inspect.getargspec(val)[0])
+    largs = len(_compat.getargspec(val)[0])
     if largs == 4:
         return val
     elif largs == 3:
@@ -452,6 +475,16 @@ def validate_hostport(val):
     else:
         raise TypeError("Value must consist of: hostname:port")
 
+
+def validate_choice(choices):
+    def _validate_choice(val):
+        val = validate_string(val)
+        if val not in choices:
+            raise ValueError("Value must be one of %s: %r" % (
+                ", ".join(choices), val))
+        return val
+    return _validate_choice
+
 def get_default_config_file():
     config_path = os.path.join(os.path.abspath(os.getcwd()),
             'gunicorn.conf.py')
@@ -522,6 +555,53 @@ class Backlog(Setting):
         """
 
 
+class ReusePort(Setting):
+    name = "reuse_port"
+    section = "Server Socket"
+    cli = ["--reuse-port"]
+    validator = validate_bool
+    action = "store_true"
+    default = False
+    desc = """\
+        Give each worker a TCP socket of its own with ``SO_REUSEPORT``.
+
+        The arbiter binds the address without listening and each worker
+        listens on a socket bound to the same address, so the kernel
+        spreads the new connections between the workers instead of waking
+        them all up on a shared socket. The connections still waiting in
+        the queue of a worker are reset when it exits.
+
+        Unix sockets and sockets passed by systemd are still shared. This
+        requires Linux 3.9 or a BSD and applies to the listeners created
+        afterwards, it isn't changed on ``HUP``.
+
+        .. versionadded:: 19.2
+        """
+
+
+class AcceptMutex(Setting):
+    name = "accept_mutex"
+    section = "Server Socket"
+    cli = ["--accept-mutex"]
+    validator = validate_bool
+    action = "store_true"
+    default = False
+    desc = """\
+        Let the sync workers wait for connections in turn with a file lock.
+
+        On Linux 4.5 and later, a new connection only wakes up one of the
+        sync workers waiting on the listeners, with ``EPOLLEXCLUSIVE``.
+        Elsewhere they all wake up and all but one fail to accept it. With
+        this setting only the worker holding the lock waits on the
+        listeners, the others try to get it every 100 milliseconds. The
+        lock is used instead of ``EPOLLEXCLUSIVE`` when both are available.
+        It isn't used with ``reuse_port``. The lock file is created in
+        ``worker_tmp_dir``.
+
+        .. versionadded:: 19.2
+        """
+
+
 class Workers(Setting):
     name = "workers"
     section = "Worker Processes"
@@ -542,6 +622,91 @@ class Workers(Setting):
         """
 
 
+class MaxWorkers(Setting):
+    name = "max_workers"
+    section = "Worker Processes"
+    cli = ["--max-workers"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        The maximum number of worker processes when autoscaling.
+
+        When set, the arbiter adjusts the number of workers between
+        ``min_workers`` and this value to the load: the requests in
+        progress in the workers and the connections waiting in the accept
+        queue of the listeners, as a percentage of what the workers can
+        handle at once. ``workers`` is the number of workers started.
+
+        The load is averaged over ``scale_cooldown`` seconds. Workers are
+        added as needed when it is above ``scale_up_threshold`` and
+        removed one at a time when it is below ``scale_down_threshold``.
+        Each change is reported to the ``nworkers_changed`` hook.
+
+        A value of 0 (the default) disables autoscaling.
+        """
+
+
+class MinWorkers(Setting):
+    name = "min_workers"
+    section = "Worker Processes"
+    cli = ["--min-workers"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 1
+    desc = """\
+        The minimum number of worker processes when autoscaling.
+        """
+
+
+class ScaleUpThreshold(Setting):
+    name = "scale_up_threshold"
+    section = "Worker Processes"
+    cli = ["--scale-up-threshold"]
+    meta = "INT"
+    validator = validate_percent
+    type = int
+    default = 80
+    desc = """\
+        The load, in percent, above which workers are added.
+
+        An integer between 1 and 100, greater than
+        ``scale_down_threshold`` when ``max_workers`` is set. A reload with
+        wrong thresholds keeps the previous ones.
+        """
+
+
+class ScaleDownThreshold(Setting):
+    name = "scale_down_threshold"
+    section = "Worker Processes"
+    cli = ["--scale-down-threshold"]
+    meta = "INT"
+    validator = validate_percent
+    type = int
+    default = 30
+    desc = """\
+        The load, in percent, below which a worker is removed.
+
+        An integer between 1 and 100, less than ``scale_up_threshold``.
+        """
+
+
+class ScaleCooldown(Setting):
+    name = "scale_cooldown"
+    section = "Worker Processes"
+    cli = ["--scale-cooldown"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 30
+    desc = """\
+        The number of seconds between two changes of the number of workers
+        when autoscaling.
+        """
+
+
 class WorkerClass(Setting):
     name = "worker_class"
     section = "Worker Processes"
@@ -564,6 +729,8 @@ class WorkerClass(Setting):
         * ``eventlet`` - Requires eventlet >= 0.9.7
         * ``gevent``   - Requires gevent >= 0.13
         * ``tornado``  - Requires tornado >= 0.2
+        * ``gasyncio`` - Requires Python >= 3.5, serves ASGI applications
+          and WSGI applications in ``threads`` threads
 
         Optionally, you can provide your own worker by giving gunicorn a
         python path to a subclass of gunicorn.workers.base.Worker. This
@@ -572,6 +739,29 @@ class WorkerClass(Setting):
         can also load the gevent class with ``egg:gunicorn#gevent``
         """
 
+
+class EventLoop(Setting):
+    name = "event_loop"
+    section = "Worker Processes"
+    cli = ["--event-loop"]
+    meta = "STRING"
+    validator = validate_choice(["auto", "asyncio", "uvloop"])
+    default = "auto"
+    desc = """\
+        The event loop of the asyncio based workers.
+
+        * ``auto``    - ``uvloop`` when it is installed, else the loop of the
+          current asyncio event loop policy
+        * ``asyncio`` - The default asyncio event loop
+        * ``uvloop``  - Requires uvloop
+
+        The ``gasyncio`` and ``gaiohttp`` workers create their loop with it.
+        The ``tornado`` worker keeps its own IOLoop with ``auto`` and runs it
+        on the asyncio loop chosen otherwise, which requires tornado >= 3.2.
+
+        .. versionadded:: 19.2
+        """
+
 class WorkerThreads(Setting):
     name = "threads"
     section = "Worker Processes"
@@ -604,7 +794,29 @@ class WorkerConnections(Setting):
     desc = """\
         The maximum number of simultaneous clients.
 
-        This setting only affects the Eventlet and Gevent worker types.
+        This setting only affects the Eventlet, Gevent and gthread worker
+        types. A gthread worker stops accepting connections while this many
+        are handled or waiting for a thread, they wait in the backlog
+        instead.
+        """
+
+
+class MaxQueueTime(Setting):
+    name = "max_queue_time"
+    section = "Worker Processes"
+    cli = ["--max-queue-time"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        The maximum time in milliseconds a connection waits for a thread.
+
+        A gthread worker answers the connections which waited longer with a
+        503 error instead of handling them, so the clients retry elsewhere
+        rather than wait behind a saturated worker.
+
+        If it is 0 (the default) the connections wait as long as needed.
         """
 
 
@@ -647,6 +859,48 @@ class MaxRequestsJitter(Setting):
         """
 
 
+class SpareWorkers(Setting):
+    name = "spare_workers"
+    section = "Worker Processes"
+    cli = ["--spare-workers"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        The number of spare worker processes.
+
+        Spare workers load the application but don't accept connections.
+        When a worker restarts after ``max_requests``, is stopped or
+        exits, a spare worker takes its place at once and a new spare
+        worker is started in the background, so the application doesn't
+        run with fewer workers while the replacement boots.
+
+        .. versionadded:: 19.2
+        """
+
+
+class ReloadBatchSize(Setting):
+    name = "reload_batch_size"
+    section = "Worker Processes"
+    cli = ["--reload-batch-size"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        The number of workers replaced at a time on ``HUP``.
+
+        By default all the new workers are started at once and the old
+        workers are stopped right away. With a rolling reload the workers
+        are replaced this many at a time: the next old workers are only
+        stopped once the workers replacing them have booted, so the
+        application keeps its capacity during the reload.
+
+        .. versionadded:: 19.2
+        """
+
+
 class Timeout(Setting):
     name = "timeout"
     section = "Worker Processes"
@@ -662,6 +916,9 @@ class Timeout(Setting):
         you're sure of the repercussions for sync workers. For the non sync
         workers it just means that the worker process is still communicating and
         is not tied to the length of time required to handle a single request.
+
+        The gthread and gasyncio workers also close the connections which
+        don't send a complete request head within this many seconds.
         """
 
 
@@ -816,6 +1073,75 @@ class PreloadApp(Setting):
         restarting workers.
         """
 
+class ForkServer(Setting):
+    name = "fork_server"
+    section = "Server Mechanics"
+    cli = ["--fork-server"]
+    validator = validate_bool
+    action = "store_true"
+    default = False
+    desc = """\
+        Fork the worker processes from a fork server.
+
+        The fork server is a process started by the arbiter before the
+        workers. It loads the application once and forks the workers the
+        arbiter asks for, which are then adopted by the arbiter. The
+        workers start faster and don't inherit the memory the arbiter uses
+        over time. On reload a new fork server loads the new application.
+        Spare workers are still forked by the arbiter.
+
+        Linux 3.4 or later is needed, elsewhere the workers are forked by
+        the arbiter. A fork server that doesn't fork a worker within
+        ``timeout`` seconds, loading the application included, is killed
+        and the arbiter forks the workers itself.
+
+        .. versionadded:: 19.2
+        """
+
+
+class GcFreeze(Setting):
+    name = "gc_freeze"
+    section = "Server Mechanics"
+    cli = ["--gc-freeze"]
+    validator = validate_bool
+    action = "store_true"
+    default = False
+    desc = """\
+        Freeze the objects of the preloaded application before the worker
+        processes are forked.
+
+        With ``preload_app`` or ``fork_server``, the garbage is collected
+        once the application is loaded and, on Python 3.7 and later, the
+        objects left are moved out of the reach of the garbage collector
+        with ``gc.freeze()``. The collections in the workers then don't
+        touch them, and the memory pages holding them stay shared between
+        the workers instead of being copied in each one.
+
+        .. versionadded:: 19.2
+        """
+
+
+class WorkerGcThreshold(Setting):
+    name = "worker_gc_threshold"
+    section = "Server Mechanics"
+    cli = ["--worker-gc-threshold"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        The threshold of the youngest generation of the garbage collector
+        in the worker processes.
+
+        The number of allocations minus deallocations that starts a
+        collection, see ``gc.set_threshold()``. A large value makes the
+        collections less frequent. 0 keeps the default of the
+        interpreter.
+
+        .. versionadded:: 19.2
+        """
+
+
 class Sendfile(Setting):
     name = "sendfile"
     section = "Server Mechanics"
@@ -829,6 +1155,52 @@ class Sendfile(Setting):
         .. versionadded:: 19.2
         """
 
+
+class ResponseBufferSize(Setting):
+    name = "response_buffer_size"
+    section = "Server Mechanics"
+    cli = ["--response-buffer-size"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        Buffer the response body up to this number of bytes before writing it.
+
+        Applications yielding many small strings are then written with a
+        few large writes instead of one per string. The buffer is written
+        when it is full, at the end of the response, or when the
+        application calls ``environ["gunicorn.flush"]()``.
+
+        A value of 0 (the default) writes each string as it is yielded.
+
+        .. versionadded:: 19.2
+        """
+
+class ParserClass(Setting):
+    name = "parser_class"
+    section = "Server Mechanics"
+    cli = ["--parser-class"]
+    meta = "STRING"
+    validator = validate_class
+    default = "auto"
+    desc = """\
+        The HTTP request parser used by the workers.
+
+        A string referring to one of the following bundled parsers:
+
+        * ``auto``      - ``httptools`` when it is installed, else ``python``
+        * ``python``    - The pure Python parser
+        * ``httptools`` - Requires httptools
+
+        Both parsers accept and reject exactly the same requests.
+
+        Optionally, you can provide your own parser by giving gunicorn a
+        python path to a subclass of ``gunicorn.http.parser.Parser``.
+
+        .. versionadded:: 19.2
+        """
+
 class Chdir(Setting):
     name = "chdir"
     section = "Server Mechanics"
@@ -895,9 +1267,37 @@ class WorkerTmpDir(Setting):
     validator = validate_string
     default = None
     desc = """\
-        A directory to use for the worker heartbeat temporary file.
+        A directory to use for the ``accept_mutex`` lock file.
+
+        If not set, the default temporary directory will be used. The sync
+        workers lock the file each time they wait for a connection, so it
+        should be on a local file system supporting ``flock``, a memory
+        only one such as ``/dev/shm`` is best.
+
+        Workers no longer use a heartbeat file here, they notify the
+        arbiter through a table in shared memory.
+        """
+
+class AdminSocket(Setting):
+    name = "admin_socket"
+    section = "Server Mechanics"
+    cli = ["--admin-socket"]
+    meta = "PATH"
+    validator = validate_string
+    default = None
+    desc = """\
+        A Unix socket path where the arbiter reports the state of the
+        workers.
+
+        Each connection is sent a JSON document describing every worker:
+        its state (``booting``, ``spare``, ``idle``, ``reading``, ``app``
+        or ``writing``), the number of requests in progress and handled,
+        the seconds since its last heartbeat and the start time and url of
+        the current request. For example
+        ``socat - UNIX-CONNECT:/path/to/socket``.
 
-        If not set, the default temporary directory will be used.
+        The arbiter never waits for a client, the part of a document larger
+        than the socket buffer (``net.core.wmem_max`` on Linux) is dropped.
         """
 
 class User(Setting):
@@ -960,7 +1360,8 @@ class TmpUploadDir(Setting):
     desc = """\
         Directory to store temporary request data as they are read.
 
-        This may disappear in the near future.
+        Request bodies larger than ``body_spool_threshold`` are written
+        there.
 
         This path should be writable by the process permissions set for Gunicorn
         workers. If not specified, Gunicorn will choose a system generated
@@ -968,6 +1369,26 @@ class TmpUploadDir(Setting):
         """
 
 
+class BodySpoolThreshold(Setting):
+    name = "body_spool_threshold"
+    section = "Server Mechanics"
+    cli = ["--body-spool-threshold"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        Spool request bodies to disk past this number of bytes.
+
+        When set, the request body is kept in a temporary file as it is
+        read. It stays in memory up to this size and is moved to a file in
+        ``tmp_upload_dir`` beyond, so reading a large upload doesn't grow
+        the worker memory. ``wsgi.input`` is then also seekable.
+
+        A value of 0 (the default) keeps request bodies in memory.
+        """
+
+
 class SecureSchemeHeader(Setting):
     name = "secure_scheme_headers"
     section = "Server Mechanics"
@@ -1057,6 +1478,44 @@ class AccessLogFormat(Setting):
         """
 
 
+class AccessLogQueueSize(Setting):
+    name = "access_log_queue_size"
+    section = "Logging"
+    cli = ["--access-log-queue-size"]
+    meta = "INT"
+    validator = validate_pos_int
+    type = int
+    default = 0
+    desc = """\
+        Write the access log from a background thread.
+
+        When set, access log lines are queued, up to this number of lines,
+        and written in batches by a thread of the worker so a slow disk or
+        pipe doesn't delay the requests. ``access_log_overflow`` sets what
+        happens when the queue is full.
+
+        A value of 0 (the default) writes each line as the request ends.
+        """
+
+
+class AccessLogOverflow(Setting):
+    name = "access_log_overflow"
+    section = "Logging"
+    cli = ["--access-log-overflow"]
+    meta = "STRING"
+    validator = validate_choice(["drop", "block"])
+    default = "drop"
+    desc = """\
+        What to do with access log lines when the queue is full.
+
+        * ``drop`` - drop the line. The number of lines dropped is logged
+          to the error log.
+        * ``block`` - wait for room in the queue.
+
+        Only used when ``access_log_queue_size`` is set.
+        """
+
+
 class ErrorLog(Setting):
     name = "errorlog"
     section = "Logging"
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+from __future__ import print_function
+
+import errno
+import os
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+
+from gunicorn.errors import AppImportError
+from gunicorn.workers import workertmp
+from gunicorn.workers.workertmp import WorkerTmp
+from gunicorn import util
+
+# age, heartbeat slot and max_requests of the worker to fork
+REQUEST = struct.Struct("=IIQ")
+# pid of the worker, -1 when it couldn't be forked
+RESPONSE = struct.Struct("=i")
+
+
+def read_exactly(fd, size):
+    """\
+    Read ``size`` bytes from ``fd``, less only at the end of the file.
+    """
+    data = b""
+    while len(data) < size:
+        try:
+            chunk = os.read(fd, size - len(data))
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            raise
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class ForkServer(object):
+    """\
+    A process forked from the arbiter before the workers, which loads the
+    application and forks the workers the arbiter asks for over a pipe.
+
+    The workers don't inherit the state the arbiter accumulates over time
+    and the application is only loaded once. The intermediate process
+    forking each worker exits right away so the worker is adopted by the
+    arbiter, which must be a child subreaper.
+    """
+
+    def __init__(self, arbiter):
+        self.arbiter = arbiter
+        self.pid = None
+        self.requests = None
+        self.responses = None
+        self.table = None
+
+    def start(self):
+        # the arbiter acquires the slots of the workers from this table
+        self.table = workertmp.get_table()
+        requests = os.pipe()
+        responses = os.pipe()
+        pid = os.fork()
+        if pid != 0:
+            os.close(requests[0])
+            os.close(responses[1])
+            self.requests, self.responses = requests[1], responses[0]
+            util.close_on_exec(self.requests)
+            util.close_on_exec(self.responses)
+            util.set_non_blocking(self.responses)
+            self.pid = pid
+            return pid
+
+        # Process Child
+        os.close(requests[1])
+        os.close(responses[0])
+        self.requests, self.responses = requests[0], responses[1]
+        self.run()
+
+    def spawn(self, worker):
+        """\
+        Fork ``worker`` and return its pid, None when the fork server
+        can't.
+        """
+        if self.pid is None or worker.tmp.table is not self.table:
+            return None
+        timeout = self.arbiter.cfg.timeout
+        try:
+            os.write(self.requests, REQUEST.pack(worker.age,
+                     worker.tmp.index, worker.max_requests))
+            data = self.read_response(timeout)
+        except OSError as e:
+            if e.errno != errno.EPIPE:
+                raise
+            data = b""
+        if data is None:
+            # still loading the application or stuck in a fork, the
+            # arbiter can't wait for it
+            self.arbiter.log.error("Fork server (pid: %s) didn't answer "
+                                   "in %s seconds, killing it", self.pid,
+                                   timeout)
+            self.kill()
+            return None
+        if not data:
+            self.arbiter.log.warning("Fork server (pid: %s) is gone",
+                                     self.pid)
+            self.stop()
+            return None
+        pid = RESPONSE.unpack(data)[0]
+        return pid if pid > 0 else None
+
+    def read_response(self, timeout):
+        """\
+        Read the response to a request, less at the end of the file and
+        None when it doesn't come in ``timeout`` seconds, 0 waits forever.
+        """
+        deadline = util.monotonic() + timeout
+        data = b""
+        while len(data) < RESPONSE.size:
+            wait = None
+            if timeout:
+                wait = deadline - util.monotonic()
+                if wait <= 0:
+                    return None
+            try:
+                ready = select.select([self.responses], [], [], wait)[0]
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                continue
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self.responses, RESPONSE.size - len(data))
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EINTR):
+                    raise
+                continue
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+        self.stop()
+
+    def stop(self):
+        # the fork server exits when its end of the pipe is closed
+        if self.pid is None:
+            return
+        self.pid = None
+        os.close(self.requests)
+        os.close(self.responses)
+
+    def run(self):
+        arbiter = self.arbiter
+        [signal.signal(s, signal.SIG_DFL) for s in arbiter.SIGNALS]
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for p in arbiter.PIPE:
+            os.close(p)
+        arbiter.PIPE = []
+        if arbiter.ADMIN is not None:
+            arbiter.ADMIN.close(unlink=False)
+            arbiter.ADMIN = None
+        if arbiter.selector is not None:
+            arbiter.selector.close()
+            arbiter.selector = None
+        for fd in arbiter.pidfds.values():
+            os.close(fd)
+        arbiter.pidfds = {}
+        # the slots of the workers are acquired by the arbiter
+        workertmp.detach()
+
+        util._setproctitle("fork server [%s]" % arbiter.proc_name)
+        arbiter.log.info("Booting fork server with pid: %s", os.getpid())
+        try:
+            arbiter.app.wsgi()
+        except AppImportError as e:
+            arbiter.log.debug("Exception while loading the application: \n%s",
+                    traceback.format_exc())
+            print("%s" % e, file=sys.stderr)
+            sys.stderr.flush()
+            sys.exit(arbiter.APP_LOAD_ERROR)
+        if arbiter.cfg.gc_freeze:
+            util.gc_freeze()
+
+        while True:
+            data = read_exactly(self.requests, REQUEST.size)
+            if len(data) < REQUEST.size:
+                # the arbiter is gone or stopped us
+                arbiter.log.info("Fork server exiting (pid: %s)", os.getpid())
+                sys.exit(0)
+            self.fork_worker(*REQUEST.unpack(data))
+
+    def fork_worker(self, age, index, max_requests):
+        arbiter = self.arbiter
+        worker = arbiter.worker_class(age, arbiter.pid, arbiter.LISTENERS,
+                                      arbiter.app, arbiter.timeout / 2.0,
+                                      arbiter.cfg, arbiter.log)
+        worker.tmp.close()
+        worker.tmp = WorkerTmp.attach(self.table, index)
+        worker.max_requests = max_requests
+
+        try:
+            pid = os.fork()
+        except OSError:
+            arbiter.log.exception("Can't fork a worker")
+            os.write(self.responses, RESPONSE.pack(-1))
+            return
+        if pid != 0:
+            # the intermediate process exits right away
+            while True:
+                try:
+                    os.waitpid(pid, 0)
+                    break
+                except OSError as e:
+                    if e.errno != errno.EINTR:
+                        raise
+            return
+
+        try:
+            pid = os.fork()
+        except OSError:
+            os.write(self.responses, RESPONSE.pack(-1))
+            os._exit(1)
+        if pid != 0:
+            os.write(self.responses, RESPONSE.pack(pid))
+            os._exit(0)
+
+        # wait to be adopted by the arbiter, the worker exits when its
+        # parent changes
+        os.close(self.requests)
+        os.close(self.responses)
+        limit = time.time() + 1
+        while os.getppid() != arbiter.pid and time.time() < limit:
+            time.sleep(0.001)
+        arbiter.run_worker(worker)
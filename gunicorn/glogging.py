@@ -8,12 +8,15 @@ import logging
 logging.Logger.manager.emittedNoHandlerWarning = 1
 from logging.config import fileConfig
 import os
+import re
 import socket
 import sys
+import threading
 import traceback
 
 from gunicorn import util
-from gunicorn.six import string_types
+from gunicorn.six import string_types, get_unbound_function
+from gunicorn.six.moves import queue
 
 
 # syslog facility codes
@@ -102,6 +105,187 @@ class SafeAtoms(dict):
             return '-'
 
 
+ATOM_RE = re.compile(r"%\(([^)]*)\)")
+
+# how to compute each atom from the response, the request, the environ
+# and the request time
+ATOMS = {
+    'h': lambda resp, req, env, rt: env.get('REMOTE_ADDR', '-'),
+    'l': lambda resp, req, env, rt: '-',
+    'u': lambda resp, req, env, rt: '-',
+    'r': lambda resp, req, env, rt: "%s %s %s" % (env['REQUEST_METHOD'],
+        env['RAW_URI'], env["SERVER_PROTOCOL"]),
+    's': lambda resp, req, env, rt: resp.status.split(None, 1)[0],
+    'b': lambda resp, req, env, rt: (resp.response_length and
+        str(resp.response_length) or '-'),
+    'f': lambda resp, req, env, rt: env.get('HTTP_REFERER', '-'),
+    'a': lambda resp, req, env, rt: env.get('HTTP_USER_AGENT', '-'),
+    'T': lambda resp, req, env, rt: rt.seconds,
+    'D': lambda resp, req, env, rt: (rt.seconds*1000000) + rt.microseconds,
+    'L': lambda resp, req, env, rt: "%d.%06d" % (rt.seconds, rt.microseconds),
+    'p': lambda resp, req, env, rt: "<%s>" % os.getpid(),
+}
+
+
+def header_atom(name, response):
+    def atom(resp, req, env, rt):
+        if response:
+            headers = resp.headers
+        else:
+            headers = getattr(req, 'headers', req)
+
+        value = '-'
+        for k, v in headers:
+            if k.lower() == name:
+                value = v
+        return value
+    return atom
+
+
+class AccessFormatter(object):
+    """\
+    Access log format compiled to the atoms it references.
+
+    Only these atoms are computed for a request, and the time is only
+    formatted once per second. The result is the same as formatting the
+    atoms returned by ``Logger.atoms`` wrapped in ``SafeAtoms``.
+    """
+
+    def __init__(self, fmt, now=None):
+        self.fmt = fmt
+        self.now = now or self.cached_now
+        self.last_now = (None, None)
+        self.atoms = [(key, self.compile_atom(key))
+                for key in set(ATOM_RE.findall(fmt))]
+
+    def compile_atom(self, key):
+        if key == 't':
+            return lambda resp, req, env, rt: self.now()
+        elif key.startswith("{"):
+            key = key.lower()
+            if key.endswith("}i"):
+                return header_atom(key[1:-2], False)
+            elif key.endswith("}o"):
+                return header_atom(key[1:-2], True)
+        return ATOMS.get(key, ATOMS['l'])
+
+    def cached_now(self):
+        second = int(time.time())
+        if self.last_now[0] != second:
+            now = time.strftime('[%d/%b/%Y:%H:%M:%S %z]',
+                    time.localtime(second))
+            self.last_now = (second, now)
+        return self.last_now[1]
+
+    def format(self, resp, req, environ, request_time):
+        atoms = {}
+        for key, atom in self.atoms:
+            value = atom(resp, req, environ, request_time)
+            if isinstance(value, string_types):
+                value = value.replace('"', '\\"')
+            atoms[key] = value
+        return self.fmt % atoms
+
+
+class QueuedHandler(logging.Handler):
+    """\
+    Handler queuing the lines formatted by the stream handler ``target``.
+
+    A thread of the process writes the queued lines to the stream of
+    ``target`` in batches. When the queue is full the line is dropped, or
+    the caller waits when ``block`` is true. The thread is started on the
+    first line logged by a process, so it also runs in forked workers.
+    """
+
+    batch_size = 1024
+
+    def __init__(self, target, maxsize, block=False):
+        logging.Handler.__init__(self)
+        self.target = target
+        self.maxsize = maxsize
+        self.block = block
+        self.dropped = 0
+        self.reported = 0
+        self.pid = None
+        self.queue = None
+        self.thread = None
+
+    def start(self):
+        self.pid = os.getpid()
+        self.queue = queue.Queue(self.maxsize)
+        self.dropped = self.reported = 0
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+
+        try:
+            line = self.target.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        try:
+            self.queue.put(line, self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            lines = [self.queue.get()]
+            try:
+                while len(lines) < self.batch_size:
+                    lines.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            stop = lines[-1] is None
+            if stop:
+                lines.pop()
+            if lines:
+                self.write(lines)
+            for _ in range(len(lines) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def write(self, lines):
+        terminator = getattr(self.target, "terminator", "\n")
+        self.target.acquire()
+        try:
+            if self.target.stream is not None:
+                self.target.stream.write(terminator.join(lines) + terminator)
+                self.target.flush()
+        except Exception:
+            self.handleError(logging.makeLogRecord({"msg": lines[0]}))
+        finally:
+            self.target.release()
+
+        dropped = self.dropped
+        if dropped != self.reported:
+            logging.getLogger("gunicorn.error").warning(
+                "%d access log lines dropped, the queue is full",
+                dropped - self.reported)
+            self.reported = dropped
+
+    def running(self):
+        return (self.pid == os.getpid() and self.thread is not None and
+                self.thread.is_alive())
+
+    def flush(self):
+        if self.running():
+            self.queue.join()
+
+    def close(self):
+        if self.running():
+            self.queue.put(None)
+            self.thread.join()
+        logging.Handler.close(self)
+
+
 def parse_syslog_address(addr):
 
     if addr.startswith("unix://"):
@@ -172,6 +356,7 @@ class Logger(object):
         self.error_handlers = []
         self.access_handlers = []
         self.cfg = cfg
+        self.access_formatter = None
         self.setup(cfg)
 
     def setup(self, cfg):
@@ -186,7 +371,9 @@ class Logger(object):
         # set gunicorn.access handler
         if cfg.accesslog is not None:
             self._set_handler(self.access_log, cfg.accesslog,
-                fmt=logging.Formatter(self.access_fmt))
+                fmt=logging.Formatter(self.access_fmt),
+                queue_size=cfg.access_log_queue_size,
+                block=cfg.access_log_overflow == "block")
 
         # set syslog handler
         if cfg.syslog:
@@ -270,6 +457,15 @@ class Logger(object):
         if not self.cfg.accesslog and not self.cfg.logconfig:
             return
 
+        formatter = self.get_access_formatter()
+        if formatter is not None:
+            try:
+                self.access_log.info(formatter.format(resp, req, environ,
+                    request_time))
+            except:
+                self.error(traceback.format_exc())
+            return
+
         # wrap atoms:
         # - make sure atoms will be test case insensitively
         # - if atom doesn't exist replace it by '-'
@@ -281,6 +477,26 @@ class Logger(object):
         except:
             self.error(traceback.format_exc())
 
+    def get_access_formatter(self):
+        """\
+        Return the compiled access log format, or None when the atoms are
+        customized by a subclass.
+        """
+        cls = type(self)
+        if (cls.atoms_wrapper_class is not SafeAtoms or
+                get_unbound_function(cls.atoms) is not
+                get_unbound_function(Logger.atoms)):
+            return None
+
+        fmt = self.cfg.access_log_format
+        if self.access_formatter is None or self.access_formatter.fmt != fmt:
+            now = None
+            if get_unbound_function(cls.now) is not get_unbound_function(
+                    Logger.now):
+                now = self.now
+            self.access_formatter = AccessFormatter(fmt, now)
+        return self.access_formatter
+
     def now(self):
         """ return date in Apache Common Log Format """
         return time.strftime('[%d/%b/%Y:%H:%M:%S %z]')
@@ -288,6 +504,8 @@ class Logger(object):
     def reopen_files(self):
         for log in loggers():
             for handler in log.handlers:
+                if isinstance(handler, QueuedHandler):
+                    handler = handler.target
                 if isinstance(handler, logging.FileHandler):
                     handler.acquire()
                     try:
@@ -301,6 +519,8 @@ class Logger(object):
     def close_on_exec(self):
         for log in loggers():
             for handler in log.handlers:
+                if isinstance(handler, QueuedHandler):
+                    handler = handler.target
                 if isinstance(handler, logging.FileHandler):
                     handler.acquire()
                     try:
@@ -314,11 +534,13 @@ class Logger(object):
             if getattr(h, "_gunicorn", False) == True:
                 return h
 
-    def _set_handler(self, log, output, fmt):
+    def _set_handler(self, log, output, fmt, queue_size=0, block=False):
         # remove previous gunicorn log handler
         h = self._get_gunicorn_handler(log)
         if h:
             log.handlers.remove(h)
+            if isinstance(h, QueuedHandler):
+                h.close()
 
         if output is not None:
             if output == "-":
@@ -328,6 +550,8 @@ class Logger(object):
                 h = logging.FileHandler(output)
 
             h.setFormatter(fmt)
+            if queue_size:
+                h = QueuedHandler(h, queue_size, block)
             h._gunicorn = True
             log.addHandler(h)
 
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import httptools
+
+from gunicorn._compat import bytes_to_str
+from gunicorn.http.errors import LimitRequestHeaders
+from gunicorn.http.message import Request
+
+# httptools only parses complete messages, the header block is fed to it
+# behind this request line. The real request line is parsed in Python.
+HEAD_PREFIX = b"GET / HTTP/1.1\r\n"
+
+
+class HeadersCollector(object):
+    def __init__(self):
+        self.headers = []
+
+    def on_header(self, name, value):
+        self.headers.append((name, value))
+
+
+class HttptoolsRequest(Request):
+    """\
+    Request whose header block is parsed by httptools.
+
+    Blocks that httptools rejects are parsed again by the pure Python
+    parser so the error raised, or the headers accepted, are exactly the
+    same for both parsers. Blocks with continuation lines, or that may
+    hold a field larger than ``limit_request_field_size``, are left to the
+    Python parser which enforces those rules.
+    """
+
+    def parse_headers(self, data):
+        if (len(data) > self.limit_request_field_size > 0
+                or b"\r\n " in data or b"\r\n\t" in data):
+            return super(HttptoolsRequest, self).parse_headers(data)
+
+        collector = HeadersCollector()
+        parser = httptools.HttpRequestParser(collector)
+        try:
+            parser.feed_data(HEAD_PREFIX + bytes(data) + b"\r\n\r\n")
+        except httptools.HttpParserUpgrade:
+            pass
+        except httptools.HttpParserError:
+            return super(HttptoolsRequest, self).parse_headers(data)
+
+        if len(collector.headers) > self.limit_request_fields:
+            raise LimitRequestHeaders("limit request headers fields")
+
+        return [(bytes_to_str(name).upper(), bytes_to_str(value).strip())
+                for name, value in collector.headers]
@@ -3,16 +3,34 @@
 # This file is part of gunicorn released under the MIT license.
 # See the NOTICE for more information.
 
+import tempfile
+
 from gunicorn.http.errors import (NoMoreData, ChunkMissingTerminator,
         InvalidChunkSize)
 from gunicorn import six
 
 
+# ChunkedReader states
+CHUNK_SIZE, CHUNK_DATA, CHUNK_END, DONE = range(4)
+
+
 class ChunkedReader(object):
+    """\
+    Incremental decoder of a chunked request body.
+
+    Raw data is kept in one buffer for the whole request and consumed by
+    moving a cursor through the chunk size lines, the chunk data and
+    their terminators, then the trailers. Only the data left after the
+    trailers is given back to the unreader.
+    """
+
     def __init__(self, req, unreader):
         self.req = req
-        self.parser = self.parse_chunked(unreader)
-        self.buf = six.BytesIO()
+        self.unreader = unreader
+        self.state = CHUNK_SIZE
+        self.remaining = 0
+        self.buf = bytearray()
+        self.pos = 0
 
     def read(self, size):
         if not isinstance(size, six.integer_types):
@@ -22,86 +40,101 @@ class ChunkedReader(object):
         if size == 0:
             return b""
 
-        if self.parser:
-            while self.buf.tell() < size:
-                try:
-                    self.buf.write(six.next(self.parser))
-                except StopIteration:
-                    self.parser = None
+        ret = []
+        buf = self.buf
+        pos, state, remaining = self.pos, self.state, self.remaining
+        while size > 0 and state != DONE:
+            if state == CHUNK_SIZE:
+                idx = buf.find(b"\r\n", pos)
+                if idx < 0:
+                    pos = self.get_data(pos)
+                    continue
+                remaining = self.parse_chunk_size(bytes(buf[pos:idx]))
+                pos = idx + 2
+                if not remaining:
+                    self.pos = pos
+                    self.parse_trailers()
+                    pos, state = self.pos, DONE
+                    break
+                state = CHUNK_DATA
+
+            if state == CHUNK_DATA:
+                count = len(buf) - pos
+                if count > remaining:
+                    count = remaining
+                if count > size:
+                    count = size
+                if not count:
+                    pos = self.get_data(pos)
+                    continue
+                ret.append(bytes(buf[pos:pos + count]))
+                pos += count
+                size -= count
+                remaining -= count
+                if remaining:
+                    continue
+                state = CHUNK_END
+                if not size:
                     break
 
-        data = self.buf.getvalue()
-        ret, rest = data[:size], data[size:]
-        self.buf = six.BytesIO()
-        self.buf.write(rest)
-        return ret
-
-    def parse_trailers(self, unreader, data):
-        buf = six.BytesIO()
-        buf.write(data)
-
-        idx = buf.getvalue().find(b"\r\n\r\n")
-        done = buf.getvalue()[:2] == b"\r\n"
-        while idx < 0 and not done:
-            self.get_data(unreader, buf)
-            idx = buf.getvalue().find(b"\r\n\r\n")
-            done = buf.getvalue()[:2] == b"\r\n"
-        if done:
-            unreader.unread(buf.getvalue()[2:])
-            return b""
-        self.req.trailers = self.req.parse_headers(buf.getvalue()[:idx])
-        unreader.unread(buf.getvalue()[idx + 4:])
-
-    def parse_chunked(self, unreader):
-        (size, rest) = self.parse_chunk_size(unreader)
-        while size > 0:
-            while size > len(rest):
-                size -= len(rest)
-                yield rest
-                rest = unreader.read()
-                if not rest:
-                    raise NoMoreData()
-            yield rest[:size]
             # Remove \r\n after chunk
-            rest = rest[size:]
-            while len(rest) < 2:
-                rest += unreader.read()
-            if rest[:2] != b'\r\n':
-                raise ChunkMissingTerminator(rest[:2])
-            (size, rest) = self.parse_chunk_size(unreader, data=rest[2:])
-
-    def parse_chunk_size(self, unreader, data=None):
-        buf = six.BytesIO()
-        if data is not None:
-            buf.write(data)
-
-        idx = buf.getvalue().find(b"\r\n")
-        while idx < 0:
-            self.get_data(unreader, buf)
-            idx = buf.getvalue().find(b"\r\n")
-
-        data = buf.getvalue()
-        line, rest_chunk = data[:idx], data[idx + 2:]
+            if len(buf) - pos < 2:
+                pos = self.get_data(pos)
+                continue
+            if buf[pos:pos + 2] != b"\r\n":
+                raise ChunkMissingTerminator(bytes(buf[pos:pos + 2]))
+            pos += 2
+            state = CHUNK_SIZE
+
+        self.pos, self.state, self.remaining = pos, state, remaining
+        return b"".join(ret)
+
+    def parse_trailers(self):
+        try:
+            scan = self.pos
+            while True:
+                if self.buf[self.pos:self.pos + 2] == b"\r\n":
+                    self.pos += 2
+                    break
+                idx = self.buf.find(b"\r\n\r\n", scan)
+                if idx >= 0:
+                    self.req.trailers = self.req.parse_headers(
+                            self.buf[self.pos:idx])
+                    self.pos = idx + 4
+                    break
+                scan = max(self.pos, len(self.buf) - 3)
+                self.get_data()
+        except NoMoreData:
+            pass
 
+        # give back what belongs to the next request
+        self.unreader.unread(self.buf[self.pos:])
+        del self.buf[:]
+        self.pos = 0
+
+    def parse_chunk_size(self, line):
         chunk_size = line.split(b";", 1)[0].strip()
         try:
-            chunk_size = int(chunk_size, 16)
+            return int(chunk_size, 16)
         except ValueError:
             raise InvalidChunkSize(chunk_size)
 
-        if chunk_size == 0:
-            try:
-                self.parse_trailers(unreader, rest_chunk)
-            except NoMoreData:
-                pass
-            return (0, None)
-        return (chunk_size, rest_chunk)
-
-    def get_data(self, unreader, buf):
-        data = unreader.read()
+    def get_data(self, pos=None):
+        """\
+        Read more data in the buffer. The data before ``pos``, the
+        current position by default, is dropped. Return the position
+        of the first byte kept.
+        """
+        if pos is None:
+            pos = self.pos
+        data = self.unreader.read()
         if not data:
             raise NoMoreData()
-        buf.write(data)
+        if pos:
+            del self.buf[:pos]
+        self.buf.extend(data)
+        self.pos = 0
+        return 0
 
 
 class LengthReader(object):
@@ -119,17 +152,7 @@ class LengthReader(object):
         if size == 0:
             return b""
 
-        buf = six.BytesIO()
-        data = self.unreader.read()
-        while data:
-            buf.write(data)
-            if buf.tell() >= size:
-                break
-            data = self.unreader.read()
-
-        buf = buf.getvalue()
-        ret, rest = buf[:size], buf[size:]
-        self.unreader.unread(rest)
+        ret = self.unreader.read(size)
         self.length -= size
         return ret
 
@@ -257,3 +280,93 @@ class Body(object):
                 line, data = data[:pos + 1], data[pos + 1:]
                 ret.append(line)
         return ret
+
+    def close(self):
+        # nothing is held beyond the request
+        pass
+
+
+class SpooledBody(Body):
+    """\
+    Body keeping the data read in a temporary file.
+
+    The file is held in memory up to ``threshold`` bytes and rolled over
+    to disk, in ``tmpdir``, past it. Everything read so far stays in the
+    file which makes the body seekable.
+    """
+
+    def __init__(self, reader, threshold, tmpdir=None):
+        self.reader = reader
+        self.file = tempfile.SpooledTemporaryFile(max_size=threshold,
+                dir=tmpdir)
+        self.pos = 0
+        self.size = 0
+
+    def fetch(self, size):
+        """\
+        Append up to ``size`` bytes from the reader to the file, return
+        the number of bytes added.
+        """
+        self.file.seek(self.size)
+        fetched = 0
+        while fetched < size:
+            data = self.reader.read(min(size - fetched, 8192))
+            if not data:
+                break
+            self.file.write(data)
+            fetched += len(data)
+        self.size += fetched
+        return fetched
+
+    def read(self, size=None):
+        size = self.getsize(size)
+        if size == 0:
+            return b""
+
+        missing = size - (self.size - self.pos)
+        if missing > 0:
+            self.fetch(missing)
+
+        self.file.seek(self.pos)
+        ret = self.file.read(min(size, self.size - self.pos))
+        self.pos += len(ret)
+        return ret
+
+    def readline(self, size=None):
+        size = self.getsize(size)
+        if size == 0:
+            return b""
+
+        ret = []
+        while size:
+            if self.pos == self.size and not self.fetch(min(size, 8192)):
+                break
+            self.file.seek(self.pos)
+            line = self.file.readline(min(size, self.size - self.pos))
+            self.pos += len(line)
+            size -= len(line)
+            ret.append(line)
+            if line.endswith(b"\n"):
+                break
+        return b"".join(ret)
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            self.fetch(six.MAXSIZE)
+            offset += self.size
+        if offset < 0:
+            raise ValueError("negative seek position %d" % offset)
+
+        if offset > self.size:
+            self.fetch(offset - self.size)
+        self.pos = min(offset, self.size)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        # release the file, on disk once rolled over
+        self.file.close()
@@ -8,13 +8,12 @@ import socket
 from errno import ENOTCONN
 
 from gunicorn._compat import bytes_to_str
-from gunicorn.http.unreader import SocketUnreader
-from gunicorn.http.body import ChunkedReader, LengthReader, EOFReader, Body
+from gunicorn.http.body import (ChunkedReader, LengthReader, EOFReader, Body,
+    SpooledBody)
 from gunicorn.http.errors import (InvalidHeader, InvalidHeaderName, NoMoreData,
     InvalidRequestLine, InvalidRequestMethod, InvalidHTTPVersion,
     LimitRequestLine, LimitRequestHeaders)
 from gunicorn.http.errors import InvalidProxyLine, ForbiddenProxyRequest
-from gunicorn.six import BytesIO
 from gunicorn.six.moves.urllib.parse import urlsplit
 
 MAX_REQUEST_LINE = 8190
@@ -25,6 +24,26 @@ HEADER_RE = re.compile("[\x00-\x1F\x7F()<>@,;:\[\]={} \t\\\\\"]")
 METH_RE = re.compile(r"[A-Z0-9$-_.]{3,20}")
 VERSION_RE = re.compile(r"HTTP/(\d+).(\d+)")
 
+# the longest proxy protocol line
+MAX_PROXY_LINE = 107
+
+
+def max_head_size(cfg):
+    """\
+    Return the size of the largest request head the parser may accept
+    with the limits of ``cfg``.
+    """
+    line = cfg.limit_request_line
+    if line <= 0 or line >= MAX_REQUEST_LINE:
+        line = MAX_REQUEST_LINE
+    fields = cfg.limit_request_fields
+    if fields <= 0 or fields > MAX_HEADERS:
+        fields = MAX_HEADERS
+    field_size = cfg.limit_request_field_size
+    if field_size <= 0 or field_size > MAX_HEADERFIELD_SIZE:
+        field_size = MAX_HEADERFIELD_SIZE
+    return MAX_PROXY_LINE + line + 2 + fields * (field_size + 2) + 4
+
 
 class Message(object):
     def __init__(self, cfg, unreader):
@@ -108,7 +127,7 @@ class Message(object):
                 content_length = 8
 
         if chunked:
-            self.body = Body(ChunkedReader(self, self.unreader))
+            self.body = self.make_body(ChunkedReader(self, self.unreader))
         elif content_length is not None:
             try:
                 content_length = int(content_length)
@@ -118,9 +137,16 @@ class Message(object):
             if content_length < 0:
                 raise InvalidHeader("CONTENT-LENGTH", req=self)
 
-            self.body = Body(LengthReader(self.unreader, content_length))
+            self.body = self.make_body(LengthReader(self.unreader,
+                                                    content_length))
         else:
-            self.body = Body(EOFReader(self.unreader))
+            self.body = self.make_body(EOFReader(self.unreader))
+
+    def make_body(self, reader):
+        threshold = self.cfg.body_spool_threshold
+        if threshold > 0:
+            return SpooledBody(reader, threshold, self.cfg.tmp_upload_dir)
+        return Body(reader)
 
     def should_close(self):
         for (h, v) in self.headers:
@@ -157,71 +183,65 @@ class Request(Message):
         if not data:
             if stop:
                 raise StopIteration()
-            raise NoMoreData(buf.getvalue())
-        buf.write(data)
+            raise NoMoreData(bytes(buf))
+        buf.extend(data)
 
     def parse(self, unreader):
-        buf = BytesIO()
+        # The request head is accumulated in a single growable buffer.
+        # Parsing only moves offsets forward and searches resume where
+        # the previous search stopped, so a head received in many small
+        # segments is not copied and rescanned on every read.
+        buf = bytearray()
         self.get_data(unreader, buf, stop=True)
 
         # get request line
-        line, rbuf = self.read_line(unreader, buf, self.limit_request_line)
+        line, pos = self.read_line(unreader, buf, 0, self.limit_request_line)
 
         # proxy protocol
         if self.proxy_protocol(bytes_to_str(line)):
             # get next request line
-            buf = BytesIO()
-            buf.write(rbuf)
-            line, rbuf = self.read_line(unreader, buf, self.limit_request_line)
+            line, pos = self.read_line(unreader, buf, pos,
+                    self.limit_request_line)
 
         self.parse_request_line(bytes_to_str(line))
-        buf = BytesIO()
-        buf.write(rbuf)
 
         # Headers
-        data = buf.getvalue()
-        idx = data.find(b"\r\n\r\n")
-
-        done = data[:2] == b"\r\n"
+        scan = pos
         while True:
-            idx = data.find(b"\r\n\r\n")
-            done = data[:2] == b"\r\n"
-
-            if idx < 0 and not done:
-                self.get_data(unreader, buf)
-                data = buf.getvalue()
-                if len(data) > self.max_buffer_headers:
-                    raise LimitRequestHeaders("max buffer headers")
-            else:
+            idx = buf.find(b"\r\n\r\n", scan)
+            done = buf[pos:pos + 2] == b"\r\n"
+            if idx >= 0 or done:
                 break
 
+            # the terminator may straddle the end of the current data
+            scan = max(pos, len(buf) - 3)
+            self.get_data(unreader, buf)
+            if len(buf) - pos > self.max_buffer_headers:
+                raise LimitRequestHeaders("max buffer headers")
+
         if done:
-            self.unreader.unread(data[2:])
+            self.unreader.unread(buf[pos + 2:])
             return b""
 
-        self.headers = self.parse_headers(data[:idx])
-
-        ret = data[idx + 4:]
-        buf = BytesIO()
-        return ret
-
-    def read_line(self, unreader, buf, limit=0):
-        data = buf.getvalue()
+        self.headers = self.parse_headers(buf[pos:idx])
+        return buf[idx + 4:]
 
+    def read_line(self, unreader, buf, start, limit=0):
+        scan = start
         while True:
-            idx = data.find(b"\r\n")
+            idx = buf.find(b"\r\n", scan)
             if idx >= 0:
                 # check if the request line is too large
-                if idx > limit > 0:
-                    raise LimitRequestLine(idx, limit)
+                if idx - start > limit > 0:
+                    raise LimitRequestLine(idx - start, limit)
                 break
-            elif len(data) - 2 > limit > 0:
-                raise LimitRequestLine(len(data), limit)
+            elif len(buf) - start - 2 > limit > 0:
+                raise LimitRequestLine(len(buf) - start, limit)
+            scan = max(start, len(buf) - 1)
             self.get_data(unreader, buf)
-            data = buf.getvalue()
 
-        return (data[:idx],  # request line,
-                data[idx + 2:])  # residue in the buffer, skip \r\n
+        return (buf[start:idx],  # request line,
+                idx + 2)  # offset of the residue in the buffer, skip \r\n
 
     def proxy_protocol(self, line):
         """\
@@ -246,9 +266,10 @@ class Request(Message):
 
     def proxy_protocol_access_check(self):
         # check in allow list
-        if isinstance(self.unreader, SocketUnreader):
+        sock = getattr(self.unreader, "sock", None)
+        if sock is not None:
             try:
-                remote_host = self.unreader.sock.getpeername()[0]
+                remote_host = sock.getpeername()[0]
             except socket.error as e:
                 if e.args[0] == ENOTCONN:
                     raise ForbiddenProxyRequest("UNKNOW")
@@ -4,7 +4,12 @@
 # See the NOTICE for more information.
 
 from gunicorn.http.message import Request
-from gunicorn.http.unreader import SocketUnreader, IterUnreader
+from gunicorn.http.unreader import Unreader, SocketUnreader, IterUnreader
+
+try:
+    from gunicorn.http._httptools import HttptoolsRequest
+except ImportError:
+    HttptoolsRequest = None
 
 
 class Parser(object):
@@ -12,7 +17,9 @@ class Parser(object):
     def __init__(self, mesg_class, cfg, source):
         self.mesg_class = mesg_class
         self.cfg = cfg
-        if hasattr(source, "recv"):
+        if isinstance(source, Unreader):
+            self.unreader = source
+        elif hasattr(source, "recv"):
             self.unreader = SocketUnreader(source)
         else:
             self.unreader = IterUnreader(source)
@@ -29,11 +36,13 @@ class Parser(object):
         if self.mesg and self.mesg.should_close():
             raise StopIteration()
 
-        # Discard any unread body of the previous message
+        # Discard any unread body of the previous message, straight from
+        # its reader so a spooled body isn't written out for nothing
         if self.mesg:
-            data = self.mesg.body.read(8192)
+            data = self.mesg.body.reader.read(8192)
             while data:
-                data = self.mesg.body.read(8192)
+                data = self.mesg.body.reader.read(8192)
+            self.mesg.body.close()
 
         # Parse the next request
         self.req_count += 1
@@ -49,3 +58,23 @@ class RequestParser(Parser):
 
     def __init__(self, *args, **kwargs):
         super(RequestParser, self).__init__(Request, *args, **kwargs)
+
+
+class HttptoolsRequestParser(Parser):
+
+    def __init__(self, *args, **kwargs):
+        super(HttptoolsRequestParser, self).__init__(HttptoolsRequest,
+                *args, **kwargs)
+
+    @classmethod
+    def setup(cls):
+        if HttptoolsRequest is None:
+            raise RuntimeError("You need httptools installed to use this "
+                    "parser.")
+
+
+# the compiled parser is used by default when it is available
+if HttptoolsRequest is not None:
+    DefaultRequestParser = HttptoolsRequestParser
+else:
+    DefaultRequestParser = RequestParser
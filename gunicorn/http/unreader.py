@@ -3,21 +3,75 @@
 # This file is part of gunicorn released under the MIT license.
 # See the NOTICE for more information.
 
-import os
-
 from gunicorn import six
 
+try:
+    memoryview
+except NameError:  # python 2.6
+    memoryview = None
+
 # Classes that can undo reading data from
 # a given type of data source.
 
 
 class Unreader(object):
-    def __init__(self):
-        self.buf = six.BytesIO()
+    """\
+    Buffer the data read from a source.
+
+    Pending data lives in ``self.buf[self.start:self.end]``. Reading moves
+    ``start`` forward and unreading moves it back, the buffer itself is
+    only compacted or grown when there is no room left at its end.
+    """
+
+    def __init__(self, bufsize=8192):
+        self.buf = bytearray(bufsize)
+        self.start = 0
+        self.end = 0
 
     def chunk(self):
         raise NotImplementedError()
 
+    def fill(self):
+        """\
+        Append new data from the source to the buffer and return the
+        number of bytes read, 0 at the end of the stream.
+        """
+        data = self.chunk()
+        size = len(data)
+        self.reserve(size)
+        self.buf[self.end:self.end + size] = data
+        self.end += size
+        return size
+
+    def reserve(self, size):
+        """\
+        Make room for ``size`` bytes at the end of the buffer.
+        """
+        if self.start == self.end:
+            self.start = self.end = 0
+
+        if len(self.buf) - self.end >= size:
+            return
+
+        # move the pending data to the front of the buffer
+        pending = self.end - self.start
+        if self.start:
+            self.buf[:pending] = self.buf[self.start:self.end]
+            self.start, self.end = 0, pending
+
+        missing = size - (len(self.buf) - self.end)
+        if missing > 0:
+            self.buf.extend(bytearray(max(missing, len(self.buf))))
+
+    def take(self, size):
+        if memoryview is None:
+            ret = bytes(self.buf[self.start:self.start + size])
+        else:
+            view = memoryview(self.buf)[self.start:self.start + size]
+            ret = view.tobytes()
+        self.start += size
+        return ret
+
     def read(self, size=None):
         if size is not None and not isinstance(size, six.integer_types):
             raise TypeError("size parameter must be an int or long.")
@@ -28,42 +82,52 @@ class Unreader(object):
             if size < 0:
                 size = None
 
-        self.buf.seek(0, os.SEEK_END)
-
-        if size is None and self.buf.tell():
-            ret = self.buf.getvalue()
-            self.buf = six.BytesIO()
-            return ret
         if size is None:
-            d = self.chunk()
-            return d
-
-        while self.buf.tell() < size:
-            chunk = self.chunk()
-            if not len(chunk):
-                ret = self.buf.getvalue()
-                self.buf = six.BytesIO()
-                return ret
-            self.buf.write(chunk)
-        data = self.buf.getvalue()
-        self.buf = six.BytesIO()
-        self.buf.write(data[size:])
-        return data[:size]
+            if self.start == self.end:
+                # nothing buffered, hand the new data over as is
+                return self.chunk()
+            return self.take(self.end - self.start)
+
+        while self.end - self.start < size:
+            if not self.fill():
+                break
+        return self.take(min(size, self.end - self.start))
 
     def unread(self, data):
-        self.buf.seek(0, os.SEEK_END)
-        self.buf.write(data)
+        size = len(data)
+        if size <= self.start:
+            # the data usually is what has just been read, step back
+            self.start -= size
+            self.buf[self.start:self.start + size] = data
+        else:
+            pending = self.buf[self.start:self.end]
+            self.start = self.end = 0
+            self.reserve(size + len(pending))
+            self.buf[:size] = data
+            self.buf[size:size + len(pending)] = pending
+            self.end = size + len(pending)
 
 
 class SocketUnreader(Unreader):
     def __init__(self, sock, max_chunk=8192):
-        super(SocketUnreader, self).__init__()
+        super(SocketUnreader, self).__init__(max_chunk)
         self.sock = sock
         self.mxchunk = max_chunk
 
     def chunk(self):
         return self.sock.recv(self.mxchunk)
 
+    def fill(self):
+        if memoryview is None:
+            return super(SocketUnreader, self).fill()
+
+        # receive directly in the buffer
+        self.reserve(self.mxchunk)
+        view = memoryview(self.buf)[self.end:self.end + self.mxchunk]
+        size = self.sock.recv_into(view, self.mxchunk)
+        self.end += size
+        return size
+
 
 class IterUnreader(Unreader):
     def __init__(self, iterable):
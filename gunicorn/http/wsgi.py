@@ -26,6 +26,17 @@ except ImportError:
 
 NORMALIZE_SPACE = re.compile(r'(?:\r\n)?[ \t]+')
 
+# status and Server lines of the responses, keyed by the HTTP version, the
+# status and the server software
+HEADER_PREFIXES = {}
+MAX_HEADER_PREFIXES = 256
+
+CONNECTION_HEADERS = {
+    "close": b"Connection: close\r\n",
+    "keep-alive": b"Connection: keep-alive\r\n",
+    "upgrade": b"Connection: upgrade\r\n",
+}
+
 log = logging.getLogger(__name__)
 
 
@@ -113,6 +124,7 @@ def create(req, sock, client, server, cfg):
 
     # set initial environ
     environ = default_environ(req, sock, cfg)
+    environ["gunicorn.flush"] = resp.flush
 
     # default variables
     host = None
@@ -214,10 +226,14 @@ class Response(object):
         self.must_close = False
         self.headers = []
         self.headers_sent = False
+        # the headers are in the buffer, not written yet
+        self.headers_buffered = False
         self.response_length = None
         self.sent = 0
         self.upgrade = False
         self.cfg = cfg
+        self.buffer = bytearray()
+        self.buffer_size = cfg.response_buffer_size
 
     def force_close(self):
         self.must_close = True
@@ -238,6 +254,12 @@ class Response(object):
                     reraise(exc_info[0], exc_info[1], exc_info[2])
             finally:
                 exc_info = None
+            # nothing was written, the buffered response is replaced
+            del self.buffer[:]
+            self.headers_buffered = False
+            self.headers = []
+            self.response_length = None
+            self.sent = 0
         elif self.status is not None:
             raise AssertionError("Response headers already set!")
 
@@ -299,30 +321,61 @@ class Response(object):
         else:
             connection = "keep-alive"
 
-        headers = [
-            "HTTP/%s.%s %s\r\n" % (self.req.version[0],
-                self.req.version[1], self.status),
-            "Server: %s\r\n" % self.version,
-            "Date: %s\r\n" % util.http_date(),
-            "Connection: %s\r\n" % connection
-        ]
+        key = (self.req.version, self.status, self.version)
+        prefix = HEADER_PREFIXES.get(key)
+        if prefix is None:
+            if len(HEADER_PREFIXES) >= MAX_HEADER_PREFIXES:
+                HEADER_PREFIXES.clear()
+            prefix = util.to_bytestring("HTTP/%s.%s %s\r\nServer: %s\r\n" % (
+                self.req.version[0], self.req.version[1], self.status,
+                self.version))
+            HEADER_PREFIXES[key] = prefix
+
+        headers = [prefix, util.date_header(), CONNECTION_HEADERS[connection]]
         if self.chunked:
-            headers.append("Transfer-Encoding: chunked\r\n")
+            headers.append(b"Transfer-Encoding: chunked\r\n")
         return headers
 
-    def send_headers(self):
-        if self.headers_sent:
-            return
+    def header_bytes(self):
         tosend = self.default_headers()
-        tosend.extend(["%s: %s\r\n" % (k, v) for k, v in self.headers])
+        header_str = "".join(["%s: %s\r\n" % (k, v) for k, v in self.headers])
+        tosend.append(util.to_bytestring(header_str))
+        tosend.append(b"\r\n")
+        return b"".join(tosend)
+
+    def send(self, data):
+        # the headers go out with the first data written
+        if not self.headers_sent and not self.headers_buffered:
+            data.insert(0, self.header_bytes())
+            self.headers_buffered = True
+
+        if self.buffer_size and not self.upgrade:
+            size = len(self.buffer) + sum(len(buf) for buf in data)
+            if size < self.buffer_size:
+                for buf in data:
+                    self.buffer.extend(buf)
+                return
+            if self.buffer:
+                data.insert(0, bytes(self.buffer))
+                del self.buffer[:]
 
-        header_str = "%s\r\n" % "".join(tosend)
-        util.write(self.sock, util.to_bytestring(header_str))
-        self.headers_sent = True
+        if data:
+            util.writev(self.sock, data)
+            self.headers_sent = True
 
-    def write(self, arg):
+    def flush(self):
         self.send_headers()
+        if self.buffer:
+            self.sock.sendall(bytes(self.buffer))
+            del self.buffer[:]
+            self.headers_sent = True
 
+    def send_headers(self):
+        if self.headers_sent or self.headers_buffered:
+            return
+        self.send([])
+
+    def write(self, arg):
         assert isinstance(arg, binary_type), "%r is not a byte." % arg
 
         arglen = len(arg)
@@ -330,6 +383,7 @@ class Response(object):
         if self.response_length is not None:
             if self.sent >= self.response_length:
                 # Never write more than self.response_length bytes
+                self.send_headers()
                 return
 
             tosend = min(self.response_length - self.sent, tosend)
@@ -339,13 +393,20 @@ class Response(object):
         # Sending an empty chunk signals the end of the
         # response and prematurely closes the response
         if self.chunked and tosend == 0:
+            self.send_headers()
             return
 
         self.sent += tosend
-        util.write(self.sock, arg, self.chunked)
+        if self.chunked:
+            self.send(util.chunk_buffers(arg))
+        else:
+            self.send([arg])
 
     def can_sendfile(self):
-        return (self.cfg.sendfile and (sendfile is not None))
+        # the file is sent to the socket itself, which the writer of an
+        # asyncio transport doesn't expose
+        return (self.cfg.sendfile and (sendfile is not None) and
+                hasattr(self.sock, "fileno"))
 
     def sendfile_all(self, fileno, sockno, offset, nbytes):
         # Send file in at most 1GB blocks as some operating
@@ -400,14 +461,14 @@ class Response(object):
             if nbytes == 0:
                 return
 
-            self.send_headers()
-
             if self.cfg.is_ssl:
+                self.flush()
                 self.sendfile_use_send(fileno, fo_offset, nbytes)
             else:
                 if self.is_chunked():
                     chunk_size = "%X\r\n" % nbytes
-                    self.sock.sendall(chunk_size.encode('utf-8'))
+                    self.send([chunk_size.encode('utf-8')])
+                self.flush()
 
                 self.sendfile_all(fileno, self.sock.fileno(), fo_offset, nbytes)
 
@@ -420,7 +481,7 @@ class Response(object):
                 self.write(item)
 
     def close(self):
-        if not self.headers_sent:
-            self.send_headers()
         if self.chunked:
-            util.write_chunk(self.sock, b"")
+            # send the headers along the last chunk when nothing was written
+            self.send([b"0\r\n\r\n"])
+        self.flush()
@@ -7,6 +7,7 @@ import errno
 import os
 import socket
 import stat
+import struct
 import sys
 import time
 
@@ -15,9 +16,20 @@ from gunicorn.six import string_types
 
 SD_LISTEN_FDS_START = 3
 
+# the layout of struct tcp_info is only known on linux
+if sys.platform.startswith("linux"):
+    TCP_INFO = getattr(socket, "TCP_INFO", None)
+    SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", 15)
+else:
+    TCP_INFO = None
+    SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", None)
+
 
 class BaseSocket(object):
 
+    # the workers listen on sockets of their own bound to the same address
+    reuse_port = False
+
     def __init__(self, address, conf, log, fd=None):
         self.log = log
         self.conf = conf
@@ -41,12 +53,27 @@ class BaseSocket(object):
         if not bound:
             self.bind(sock)
         sock.setblocking(0)
-        sock.listen(self.conf.backlog)
+        if not self.reuse_port:
+            sock.listen(self.conf.backlog)
         return sock
 
     def bind(self, sock):
         sock.bind(self.cfg_addr)
 
+    def worker_socket(self):
+        """\
+        Return the socket a worker accepts connections from. The worker
+        calls ``listen`` once it accepts connections.
+        """
+        return self
+
+    def queued(self):
+        """\
+        Return the number of connections waiting to be accepted, None
+        when it can't be known.
+        """
+        return None
+
     def close(self):
         try:
             self.sock.close()
@@ -71,8 +98,44 @@ class TCPSocket(BaseSocket):
 
     def set_options(self, sock, bound=False):
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.conf.reuse_port and SO_REUSEPORT is not None:
+            if not bound:
+                sock.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+            # the socket of the arbiter is bound but doesn't listen, so the
+            # kernel only hands connections to the workers. A socket
+            # inherited from systemd may already listen and is shared.
+            self.reuse_port = (
+                bool(sock.getsockopt(socket.SOL_SOCKET, SO_REUSEPORT)) and
+                not sock.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN))
         return super(TCPSocket, self).set_options(sock, bound=bound)
 
+    def worker_socket(self):
+        if not self.reuse_port:
+            return self
+        sock = socket.socket(self.FAMILY, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.bind(self.sock.getsockname())
+        sock.setblocking(0)
+
+        listener = self.__class__.__new__(self.__class__)
+        listener.__dict__.update(self.__dict__)
+        listener.sock = sock
+        listener.reuse_port = False
+        return listener
+
+    def queued(self):
+        if TCP_INFO is None or self.reuse_port:
+            # the connections wait in the queues of the workers
+            return None
+        try:
+            info = self.sock.getsockopt(socket.IPPROTO_TCP, TCP_INFO, 104)
+        except socket.error:
+            return None
+        # tcpi_unacked is the length of the accept queue of a listener
+        return struct.unpack_from("=I", info, 24)[0]
+
 
 class TCP6Socket(TCPSocket):
 
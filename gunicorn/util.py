@@ -7,6 +7,7 @@ from __future__ import print_function
 
 import email.utils
 import fcntl
+import gc
 import io
 import os
 import pkg_resources
@@ -20,7 +21,6 @@ import traceback
 import inspect
 import errno
 import warnings
-import cgi
 
 from gunicorn.errors import AppImportError
 from gunicorn.six import text_type
@@ -30,8 +30,16 @@ from gunicorn.workers import SUPPORTED_WORKERS
 MAXFD = 1024
 REDIRECT_TO = getattr(os, 'devnull', '/dev/null')
 
+# prctl option, see set_child_subreaper
+PR_SET_CHILD_SUBREAPER = 36
+
 timeout_default = object()
 
+try:
+    monotonic = time.monotonic
+except AttributeError:  # python < 3.3
+    monotonic = time.time
+
 CHUNK_SIZE = (16 * 1024)
 
 MAX_BODY = 1024 * 132
@@ -59,6 +67,12 @@ except ImportError:
         return
 
 
+try:
+    from html import escape
+except ImportError:  # python < 3.2, cgi.escape was removed in 3.8
+    from cgi import escape
+
+
 try:
     from importlib import import_module
 except ImportError:
@@ -264,6 +278,12 @@ def close_on_exec(fd):
     fcntl.fcntl(fd, fcntl.F_SETFD, flags)
 
 
+def inherit_on_exec(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+    flags &= ~fcntl.FD_CLOEXEC
+    fcntl.fcntl(fd, fcntl.F_SETFD, flags)
+
+
 def set_non_blocking(fd):
     flags = fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK
     fcntl.fcntl(fd, fcntl.F_SETFL, flags)
@@ -286,12 +306,43 @@ except ImportError:
                 pass
 
 
+def can_sendmsg(sock):
+    # only plain sockets, ssl and the green sockets of the async workers
+    # either lack sendmsg or don't implement it
+    return type(sock) is socket.socket and hasattr(sock, "sendmsg")
+
+
+def writev(sock, data):
+    """\
+    Send a list of buffers with as few system calls as possible, without
+    concatenating them when ``sendmsg`` is available.
+    """
+    if len(data) == 1:
+        sock.sendall(data[0])
+        return
+    elif not can_sendmsg(sock):
+        sock.sendall(b"".join(data))
+        return
+
+    data = [buf for buf in data if buf]
+    while data:
+        sent = sock.sendmsg(data)
+        # drop what has been sent and retry the rest
+        while data and sent >= len(data[0]):
+            sent -= len(data[0])
+            data.pop(0)
+        if sent:
+            data[0] = memoryview(data[0])[sent:]
+
+
+def chunk_buffers(data):
+    return [("%X\r\n" % len(data)).encode('utf-8'), data, b"\r\n"]
+
+
 def write_chunk(sock, data):
     if isinstance(data, text_type):
         data = data.encode('utf-8')
-    chunk_size = "%X\r\n" % len(data)
-    chunk = b"".join([chunk_size.encode('utf-8'), data, b"\r\n"])
-    sock.sendall(chunk)
+    writev(sock, chunk_buffers(data))
 
 
 def write(sock, data, chunked=False):
@@ -328,7 +379,7 @@ def write_error(sock, status_int, reason, mesg):
         %(mesg)s
       </body>
     </html>
-    """) % {"reason": reason, "mesg": cgi.escape(mesg)}
+    """) % {"reason": reason, "mesg": escape(mesg, quote=False)}
 
     http = textwrap.dedent("""\
     HTTP/1.1 %s %s\r
@@ -397,6 +448,22 @@ def http_date(timestamp=None):
     return s
 
 
+_date_header = (None, b"")
+
+
+def date_header():
+    """\
+    Return the Date header line of the current second, as bytes. The line
+    is formatted once per second.
+    """
+    global _date_header
+    now = int(time.time())
+    if _date_header[0] != now:
+        line = "Date: %s\r\n" % http_date(now)
+        _date_header = (now, line.encode("latin-1"))
+    return _date_header[1]
+
+
 def is_hoppish(header):
     return header.lower().strip() in hop_headers
 
@@ -491,6 +558,60 @@ def seed():
         random.seed('%s.%s' % (time.time(), os.getpid()))
 
 
+def gc_freeze():
+    """\
+    Collect the garbage, then move the objects left out of the reach of
+    the garbage collector (Python 3.7 and later) so the processes forked
+    afterwards don't write to the memory they share with this one when
+    they collect.
+    """
+    if hasattr(gc, "unfreeze"):
+        # the objects frozen before a reload can be collected again
+        gc.unfreeze()
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+
+
+def set_child_subreaper():
+    """\
+    Make the orphaned descendants of this process its children instead of
+    children of init, on Linux 3.4 and later. Return False when it is not
+    supported.
+    """
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+    except (ImportError, OSError, AttributeError):
+        return False
+
+
+def set_event_loop_policy(name):
+    """\
+    Install the asyncio event loop policy of the ``event_loop`` setting
+    ``name``. ``auto`` installs the policy of uvloop when it is installed
+    and keeps the current policy otherwise.
+    """
+    try:
+        import asyncio
+    except ImportError:
+        raise RuntimeError("You need Python >= 3.4 to use an asyncio event "
+                "loop.")
+    if name == "asyncio":
+        asyncio.set_event_loop_policy(None)
+        return
+
+    try:
+        import uvloop
+    except ImportError:
+        if name == "uvloop":
+            raise RuntimeError("You need uvloop installed to use this event "
+                    "loop.")
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
 def check_is_writeable(path):
     try:
         f = open(path, 'a')
@@ -18,3 +18,7 @@ SUPPORTED_WORKERS = {
 if sys.version_info >= (3, 3):
     # gaiohttp worker can be used with Python 3.3+ only.
     SUPPORTED_WORKERS["gaiohttp"] = "gunicorn.workers.gaiohttp.AiohttpWorker"
+
+if sys.version_info >= (3, 5):
+    # gasyncio worker can be used with Python 3.5+ only.
+    SUPPORTED_WORKERS["gasyncio"] = "gunicorn.workers.gasyncio.AsyncioWorker"
@@ -6,6 +6,7 @@
 import asyncio
 import functools
 import os
+from gunicorn import util
 import gunicorn.workers.base as base
 
 from aiohttp.wsgi import WSGIServerHttpProtocol
@@ -21,6 +22,7 @@ class AiohttpWorker(base.Worker):
 
     def init_process(self):
         # create new event_loop after fork
+        util.set_event_loop_policy(self.cfg.event_loop)
         asyncio.get_event_loop().close()
 
         self.loop = asyncio.new_event_loop()
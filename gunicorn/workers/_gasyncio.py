@@ -0,0 +1,783 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+# design:
+# a protocol buffers what its client sends, the request head is parsed
+# with the gunicorn parser in the loop once it is complete. ASGI
+# applications are called in the loop, WSGI applications in a thread of a
+# pool bounded by the ``threads`` setting. Both write their responses with
+# ``gunicorn.http.wsgi.Response`` through the transport of the connection.
+# On keepalive connections the next request is read by the loop, idle
+# connections are closed after the keep alive timeout.
+
+import asyncio
+from collections import deque
+import concurrent.futures as futures
+from datetime import datetime
+import errno
+from functools import partial
+from http.client import responses
+import inspect
+import os
+import socket
+import ssl
+import threading
+from urllib.parse import unquote
+
+import gunicorn.http as http
+import gunicorn.http.wsgi as wsgi
+import gunicorn.util as util
+from gunicorn._compat import bytes_to_str
+from gunicorn.http.body import ChunkedReader, LengthReader, DONE
+from gunicorn.http.message import max_head_size
+from gunicorn.http.unreader import Unreader
+import gunicorn.workers.base as base
+from gunicorn.workers.workertmp import IDLE, READING, APP, WRITING
+
+ASGI_VERSION = {"version": "3.0", "spec_version": "2.1"}
+
+# data buffered before the protocol stops reading from its client
+MAX_PENDING = 65536
+
+# the largest piece of body given to an ASGI application at once
+BODY_CHUNK = 65536
+
+
+def is_asgi(app):
+    """\
+    Return True when ``app`` is an ASGI 3 application, a coroutine
+    function taking the scope, receive and send arguments.
+    """
+    return (inspect.iscoroutinefunction(app) or
+            inspect.iscoroutinefunction(getattr(app, "__call__", None)))
+
+
+def body_done(reader):
+    if isinstance(reader, LengthReader):
+        return reader.length == 0
+    if isinstance(reader, ChunkedReader):
+        return reader.state == DONE
+    return False
+
+
+def ssl_context(cfg):
+    context = ssl.SSLContext(cfg.ssl_version)
+    context.load_cert_chain(cfg.certfile, cfg.keyfile)
+    context.verify_mode = cfg.cert_reqs
+    if cfg.ca_certs:
+        context.load_verify_locations(cfg.ca_certs)
+    if cfg.ciphers:
+        context.set_ciphers(cfg.ciphers)
+    return context
+
+
+def asgi_scope(req, environ):
+    """\
+    Return the ASGI scope of ``req``, the addresses and the scheme are
+    taken from its WSGI ``environ``.
+    """
+    client = server = None
+    if environ.get("REMOTE_PORT", "").isdigit():
+        client = (environ["REMOTE_ADDR"], int(environ["REMOTE_PORT"]))
+    if environ["SERVER_PORT"].isdigit():
+        server = (environ["SERVER_NAME"], int(environ["SERVER_PORT"]))
+    return {
+        "type": "http",
+        "asgi": ASGI_VERSION,
+        "http_version": "%d.%d" % req.version,
+        "method": req.method,
+        "scheme": environ["wsgi.url_scheme"],
+        "path": unquote(req.path),
+        "raw_path": req.path.encode("latin-1"),
+        "query_string": req.query.encode("latin-1"),
+        "root_path": environ["SCRIPT_NAME"],
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in req.headers],
+        "client": client,
+        "server": server,
+    }
+
+
+class FeedUnreader(Unreader):
+    """\
+    Unreader of the data a protocol receives. The protocol feeds it from
+    the loop, a thread reading the request waits until there is data.
+
+    The loop only reads what is already buffered: while ``blocking`` is
+    False, reading past it raises ``LimitRequestHeaders`` since the loop
+    only parses a request head once it is complete or larger than the
+    parser accepts.
+    """
+
+    def __init__(self, sock=None):
+        super().__init__()
+        # checked against ``proxy_allow_ips`` by the parser
+        self.sock = sock
+        self.pending = deque()
+        # the size of the pending data
+        self.size = 0
+        self.eof = False
+        self.blocking = True
+        # called once the pending data is read
+        self.on_drain = None
+        self.cond = threading.Condition()
+
+    def feed(self, data):
+        with self.cond:
+            self.pending.append(data)
+            self.size += len(data)
+            self.cond.notify()
+
+    def feed_eof(self):
+        with self.cond:
+            self.eof = True
+            self.cond.notify()
+
+    def buffered(self):
+        return self.end - self.start + self.size
+
+    def chunk(self):
+        with self.cond:
+            while not self.pending and not self.eof:
+                if not self.blocking:
+                    raise http.errors.LimitRequestHeaders(
+                            "max buffer headers")
+                self.cond.wait()
+            if not self.pending:
+                return b""
+            data = self.pending.popleft()
+            self.size -= len(data)
+            on_drain = None
+            if not self.size:
+                on_drain, self.on_drain = self.on_drain, None
+        if on_drain is not None:
+            on_drain()
+        return data
+
+
+class TransportWriter(object):
+    """\
+    Socket like object sending the data written by a response through the
+    transport of a protocol. From a thread each write waits until the
+    transport accepts more data.
+    """
+
+    def __init__(self, protocol, threaded=False):
+        self.protocol = protocol
+        self.threaded = threaded
+
+    def sendall(self, data):
+        if self.threaded:
+            self.protocol.write_threadsafe(data)
+        else:
+            self.protocol.write(data)
+
+    def send(self, data):
+        self.sendall(data)
+        return len(data)
+
+    def gettimeout(self):
+        # writes never block the loop
+        return 0.0
+
+    def setblocking(self, flag):
+        pass
+
+
+class HttpProtocol(asyncio.Protocol):
+
+    def __init__(self, worker):
+        self.worker = worker
+        self.cfg = worker.cfg
+        self.loop = worker.loop
+        self.transport = None
+        self.peername = None
+        self.sockname = None
+        self.unreader = None
+        self.parser = None
+        self.proxy_protocol_info = None
+        # bytes of the buffered request head already searched for its end
+        self.scanned = 0
+        self.max_head = max_head_size(self.cfg)
+
+        # the task handling the current request
+        self.task = None
+        # closes the connection after the keepalive timeout, or when the
+        # request head isn't received in time
+        self.timer = None
+        self.keepalived = False
+        self.closed = False
+        self.reading = True
+        self.writing = True
+        # futures waiting for the transport to accept more data
+        self.waiters = deque()
+        # future waiting for more data from the client
+        self.data_waiter = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.peername = transport.get_extra_info("peername")
+        self.sockname = transport.get_extra_info("sockname")
+        self.unreader = FeedUnreader(transport.get_extra_info("socket"))
+        self.parser = self.worker.parser_class(self.cfg, self.unreader)
+        self.worker.connections.add(self)
+        self.wait_head()
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.worker.connections.discard(self)
+        self.cancel_timer()
+        self.unreader.feed_eof()
+        self.wake_reader()
+        self.release_writers(socket.error(errno.EPIPE, "Connection lost"))
+
+    def data_received(self, data):
+        self.unreader.feed(data)
+        if self.task is None:
+            self.next_request()
+            return
+
+        self.wake_reader()
+        if self.reading and self.unreader.size > MAX_PENDING:
+            # let the request catch up with the client
+            self.transport.pause_reading()
+            self.reading = False
+            self.unreader.on_drain = partial(self.loop.call_soon_threadsafe,
+                    self.resume_reading)
+
+    def eof_received(self):
+        self.unreader.feed_eof()
+        if self.task is None:
+            self.next_request()
+        else:
+            self.wake_reader()
+        # keep the connection half open to send the response
+        return self.task is not None
+
+    def pause_writing(self):
+        self.writing = False
+
+    def resume_writing(self):
+        self.writing = True
+        self.release_writers()
+
+    def resume_reading(self):
+        if not self.reading and not self.closed:
+            self.transport.resume_reading()
+            self.reading = True
+
+    def close(self):
+        self.closed = True
+        self.transport.close()
+
+    def cancel_timer(self):
+        self.keepalived = False
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def wait_head(self):
+        """\
+        Close the connection unless its request head is received within
+        the ``timeout``. Partial heads don't extend the deadline.
+        """
+        self.cancel_timer()
+        if self.cfg.timeout:
+            self.timer = self.loop.call_later(self.cfg.timeout, self.close)
+
+    def head_received(self):
+        """\
+        Return True when a request head is buffered, or more data than
+        the parser accepts for one.
+        """
+        unreader = self.unreader
+        # the end of the head may straddle what was searched already
+        start = unreader.start + max(self.scanned - 3, 0)
+        if (unreader.buf.find(b"\r\n\r\n", start, unreader.end) >= 0 or
+                unreader.end - unreader.start > self.max_head):
+            self.scanned = 0
+            return True
+        self.scanned = unreader.end - unreader.start
+        return False
+
+    def next_request(self):
+        """\
+        Parse the next request and handle it once its head is buffered.
+        """
+        if self.closed:
+            return
+        unreader = self.unreader
+        # the head is searched in the buffer of the unreader
+        while unreader.size:
+            unreader.fill()
+        if not self.head_received() and not unreader.eof:
+            if self.timer is None or (self.keepalived and
+                    unreader.buffered()):
+                # the next request started, the keepalive timeout is over
+                self.wait_head()
+            self.resume_reading()
+            return
+
+        req = None
+        unreader.blocking = False
+        try:
+            req = next(self.parser)
+        except StopIteration:
+            self.close()
+            return
+        except Exception as e:
+            self.worker.handle_exception(req, TransportWriter(self),
+                    self.peername, e)
+            self.close()
+            return
+        finally:
+            unreader.blocking = True
+
+        if req.proxy_protocol_info:
+            self.proxy_protocol_info = req.proxy_protocol_info
+        else:
+            req.proxy_protocol_info = self.proxy_protocol_info
+        self.cancel_timer()
+        self.task = self.loop.create_task(self.worker.handle(self, req))
+
+    def finish(self, keepalive):
+        """\
+        Close the connection or wait for its next request.
+        """
+        self.task = None
+        if self.closed:
+            return
+        if not keepalive or not self.worker.alive:
+            self.close()
+            return
+
+        self.timer = self.loop.call_later(self.cfg.keepalive, self.close)
+        self.keepalived = True
+        self.next_request()
+
+    def shutdown(self):
+        # idle connections are closed, the others after their request
+        if self.task is None:
+            self.close()
+
+    def write(self, data):
+        if self.closed:
+            raise socket.error(errno.EPIPE, "Broken pipe")
+        self.transport.write(data)
+
+    def write_threadsafe(self, data):
+        fs = futures.Future()
+        self.loop.call_soon_threadsafe(self.write_waiting, data, fs)
+        fs.result()
+
+    def write_waiting(self, data, fs):
+        try:
+            self.write(data)
+        except socket.error as e:
+            fs.set_exception(e)
+            return
+        if self.writing:
+            fs.set_result(None)
+        else:
+            self.waiters.append(fs)
+
+    def release_writers(self, exc=None):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if waiter.done():
+                continue
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+    async def drain(self):
+        if not self.writing and not self.closed:
+            waiter = self.loop.create_future()
+            self.waiters.append(waiter)
+            await waiter
+
+    def wake_reader(self):
+        if self.data_waiter is not None and not self.data_waiter.done():
+            self.data_waiter.set_result(None)
+
+    async def wait_data(self):
+        """\
+        Wait for more data from the client or the end of the connection.
+        """
+        self.data_waiter = self.loop.create_future()
+        try:
+            await self.data_waiter
+        finally:
+            self.data_waiter = None
+
+    async def read_body(self, reader, size):
+        """\
+        Read up to ``size`` bytes of a request body. A body of known length
+        is read in the loop, a chunked body by a thread of the pool.
+        """
+        if not isinstance(reader, LengthReader):
+            return await self.loop.run_in_executor(self.worker.tpool,
+                    reader.read, size)
+
+        unreader = self.unreader
+        while reader.length and not unreader.buffered():
+            if unreader.eof:
+                raise http.errors.NoMoreData()
+            await self.wait_data()
+        return reader.read(min(size, unreader.buffered()))
+
+
+class ASGIChannel(object):
+    """\
+    The ``receive`` and ``send`` callables of an ASGI request. The body is
+    read with the gunicorn parser, the response is written by
+    ``gunicorn.http.wsgi.Response``.
+    """
+
+    def __init__(self, protocol, req, resp):
+        self.protocol = protocol
+        self.req = req
+        self.resp = resp
+        # the whole body was received by the application
+        self.received = False
+        self.complete = False
+
+    async def receive(self):
+        protocol = self.protocol
+        reader = self.req.body.reader
+        if not self.received:
+            body = b""
+            if not body_done(reader):
+                try:
+                    body = await protocol.read_body(reader, BODY_CHUNK)
+                except http.errors.NoMoreData:
+                    return {"type": "http.disconnect"}
+            self.received = body_done(reader)
+            return {"type": "http.request", "body": body,
+                    "more_body": not self.received}
+
+        # nothing left to read, wait for the client to go away
+        while not protocol.closed and not self.complete:
+            await protocol.wait_data()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        resp = self.resp
+        mtype = message["type"]
+        if mtype == "http.response.start":
+            if resp.status is not None:
+                raise RuntimeError("Response already started")
+            status = message["status"]
+            headers = [(bytes_to_str(name), bytes_to_str(value))
+                       for name, value in message.get("headers", [])]
+            resp.start_response("%d %s" % (status,
+                    responses.get(status, "Unknown")), headers)
+        elif mtype == "http.response.body":
+            if resp.status is None:
+                raise RuntimeError("Response not started")
+            if self.complete:
+                raise RuntimeError("Response already completed")
+            body = message.get("body", b"")
+            if body:
+                resp.write(body)
+            if not message.get("more_body", False):
+                resp.close()
+                self.complete = True
+                self.protocol.wake_reader()
+            await self.protocol.drain()
+        else:
+            raise ValueError("Unexpected ASGI message '%s'" % mtype)
+
+
+class Lifespan(object):
+    """\
+    Run the lifespan protocol of an ASGI application. Applications which
+    don't support it are served all the same.
+    """
+
+    def __init__(self, worker):
+        self.worker = worker
+        self.loop = worker.loop
+        self.events = None
+        self.waiter = None
+        self.task = None
+
+    async def run(self):
+        scope = {"type": "lifespan", "asgi": ASGI_VERSION}
+        try:
+            await self.worker.wsgi(scope, self.receive, self.send)
+        except Exception:
+            self.worker.log.debug("ASGI lifespan protocol unsupported",
+                    exc_info=True)
+        finally:
+            if self.waiter is not None and not self.waiter.done():
+                self.waiter.set_result(None)
+
+    async def receive(self):
+        return await self.events.get()
+
+    async def send(self, message):
+        if self.waiter is None or self.waiter.done():
+            return
+        if message["type"].endswith(".failed"):
+            self.waiter.set_exception(RuntimeError("ASGI %s: %s" % (
+                message["type"], message.get("message", ""))))
+        else:
+            self.waiter.set_result(None)
+
+    async def event(self, name):
+        self.waiter = self.loop.create_future()
+        self.events.put_nowait({"type": "lifespan.%s" % name})
+        await self.waiter
+
+    async def startup(self):
+        # created in the loop it is bound to
+        self.events = asyncio.Queue()
+        self.task = self.loop.create_task(self.run())
+        await self.event("startup")
+
+    async def shutdown(self):
+        if not self.task.done():
+            await self.event("shutdown")
+
+
+class AsyncioWorker(base.Worker):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None
+        self.tpool = None
+        self.servers = []
+        self.connections = set()
+        self.lifespan = None
+
+    @classmethod
+    def capacity(cls, cfg):
+        return cfg.worker_connections
+
+    def init_process(self):
+        # create new event_loop after fork
+        util.set_event_loop_policy(self.cfg.event_loop)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.tpool = futures.ThreadPoolExecutor(max_workers=self.cfg.threads)
+        super().init_process()
+
+    def retire(self):
+        super().retire()
+        # the requests may come from a thread of the pool
+        self.loop.call_soon_threadsafe(self.stop_servers)
+
+    def stop_servers(self):
+        for server in self.servers:
+            server.close()
+        self.servers = []
+
+    def run(self):
+        if is_asgi(self.wsgi):
+            self.lifespan = Lifespan(self)
+        try:
+            self.loop.run_until_complete(self._run())
+        finally:
+            self.tpool.shutdown(False)
+            self.loop.close()
+
+    async def _run(self):
+        if self.lifespan is not None:
+            await self.lifespan.startup()
+
+        context = ssl_context(self.cfg) if self.cfg.is_ssl else None
+        for sock in self.sockets:
+            server = await self.loop.create_server(
+                    partial(HttpProtocol, self), sock=sock.sock,
+                    backlog=self.cfg.backlog, ssl=context)
+            self.servers.append(server)
+
+        while self.alive:
+            self.notify()
+            # If our parent changed then we shut down.
+            if self.ppid != os.getppid():
+                self.log.info("Parent changed, shutting down: %s", self)
+                self.alive = False
+                break
+            await asyncio.sleep(1.0)
+
+        # stop accepting connections and let the requests in progress end
+        self.stop_servers()
+        for conn in list(self.connections):
+            conn.shutdown()
+        limit = self.loop.time() + self.cfg.graceful_timeout
+        while self.connections and self.loop.time() < limit:
+            self.notify()
+            await asyncio.sleep(0.1)
+        for conn in list(self.connections):
+            conn.transport.abort()
+        # let the aborted connections and their requests end
+        await asyncio.sleep(0)
+
+        if self.lifespan is not None:
+            await self.lifespan.shutdown()
+
+    async def handle(self, protocol, req):
+        keepalive = False
+        self.set_status(READING)
+        try:
+            if self.lifespan is not None:
+                keepalive = await self.handle_asgi(protocol, req)
+            else:
+                keepalive = await self.loop.run_in_executor(self.tpool,
+                        self.handle_wsgi, protocol, req)
+        finally:
+            self.set_status(IDLE)
+            protocol.finish(keepalive)
+
+    def handle_exception(self, req, sock, addr, e):
+        if isinstance(e, http.errors.NoMoreData):
+            self.log.debug("Ignored premature client disconnection. %s", e)
+        elif isinstance(e, socket.error):
+            if e.args[0] not in (errno.EPIPE, errno.ECONNRESET):
+                self.log.exception("Socket error processing request.")
+            elif e.args[0] == errno.ECONNRESET:
+                self.log.debug("Ignoring connection reset")
+            else:
+                self.log.debug("Ignoring connection epipe")
+        else:
+            self.handle_error(req, sock, addr, e)
+
+    def handle_wsgi(self, protocol, req):
+        sock = TransportWriter(protocol, threaded=True)
+        try:
+            if not self.handle_request(req, sock, protocol):
+                return False
+            # the next request is parsed by the loop, skip the rest of the
+            # body here while blocking is fine
+            reader = req.body.reader
+            while reader.read(8192):
+                pass
+            return True
+        except Exception as e:
+            self.handle_exception(req, sock, protocol.peername, e)
+        return False
+
+    def handle_request(self, req, sock, protocol):
+        environ = {}
+        resp = None
+        try:
+            self.cfg.pre_request(self, req)
+            request_start = datetime.now()
+            resp, environ = wsgi.create(req, sock, protocol.peername,
+                    protocol.sockname, self.cfg)
+            environ["wsgi.multithread"] = True
+
+            self.nr += 1
+            if self.alive and self.nr >= self.max_requests:
+                resp.force_close()
+                self.retire()
+
+            if not self.cfg.keepalive:
+                resp.force_close()
+
+            self.set_status(APP, req)
+            respiter = self.wsgi(environ, resp.start_response)
+            self.set_status(WRITING)
+            try:
+                if isinstance(respiter, environ['wsgi.file_wrapper']):
+                    resp.write_file(respiter)
+                else:
+                    for item in respiter:
+                        resp.write(item)
+
+                resp.close()
+                request_time = datetime.now() - request_start
+                self.log.access(resp, req, environ, request_time)
+            finally:
+                if hasattr(respiter, "close"):
+                    respiter.close()
+
+            if resp.should_close():
+                self.log.debug("Closing connection.")
+                return False
+        except socket.error:
+            raise
+        except Exception:
+            if resp and resp.headers_sent:
+                # If the requests have already been sent, we should close the
+                # connection to indicate the error.
+                self.log.exception("Error handling request")
+                return False
+            raise
+        finally:
+            try:
+                self.cfg.post_request(self, req, environ, resp)
+            except Exception:
+                self.log.exception("Exception in post_request hook")
+            # the temporary file of a spooled body
+            req.body.close()
+
+        return True
+
+    async def handle_asgi(self, protocol, req):
+        sock = TransportWriter(protocol)
+        try:
+            return await self.handle_asgi_request(req, sock, protocol)
+        except Exception as e:
+            self.handle_exception(req, sock, protocol.peername, e)
+        return False
+
+    async def handle_asgi_request(self, req, sock, protocol):
+        environ = {}
+        resp = None
+        try:
+            self.cfg.pre_request(self, req)
+            request_start = datetime.now()
+            resp, environ = wsgi.create(req, sock, protocol.peername,
+                    protocol.sockname, self.cfg)
+
+            self.nr += 1
+            if self.alive and self.nr >= self.max_requests:
+                resp.force_close()
+                self.retire()
+
+            if not self.cfg.keepalive:
+                resp.force_close()
+
+            self.set_status(APP, req)
+            channel = ASGIChannel(protocol, req, resp)
+            await self.wsgi(asgi_scope(req, environ), channel.receive,
+                    channel.send)
+            if resp.status is None:
+                raise RuntimeError("ASGI application returned without a "
+                        "response")
+
+            request_time = datetime.now() - request_start
+            self.log.access(resp, req, environ, request_time)
+            if not channel.complete:
+                self.log.debug("Incomplete response, closing connection.")
+                return False
+            if resp.should_close():
+                self.log.debug("Closing connection.")
+                return False
+            # the next request follows the body
+            if not body_done(req.body.reader):
+                return False
+        except socket.error:
+            raise
+        except Exception:
+            if resp and resp.headers_sent:
+                # If the requests have already been sent, we should close the
+                # connection to indicate the error.
+                self.log.exception("Error handling request")
+                return False
+            raise
+        finally:
+            try:
+                self.cfg.post_request(self, req, environ, resp)
+            except Exception:
+                self.log.exception("Exception in post_request hook")
+            # the temporary file of a spooled body
+            req.body.close()
+
+        return True
@@ -14,6 +14,7 @@ import gunicorn.http.wsgi as wsgi
 import gunicorn.util as util
 import gunicorn.workers.base as base
 from gunicorn import six
+from gunicorn.workers.workertmp import IDLE, READING, APP, WRITING
 
 ALREADY_HANDLED = object()
 
@@ -24,13 +25,17 @@ class AsyncWorker(base.Worker):
         super(AsyncWorker, self).__init__(*args, **kwargs)
         self.worker_connections = self.cfg.worker_connections
 
+    @classmethod
+    def capacity(cls, cfg):
+        return cfg.worker_connections
+
     def timeout_ctx(self):
         raise NotImplementedError()
 
     def handle(self, listener, client, addr):
         req = None
         try:
-            parser = http.RequestParser(self.cfg, client)
+            parser = self.parser_class(self.cfg, client)
             try:
                 listener_name = listener.getsockname()
                 if not self.cfg.keepalive:
@@ -88,6 +93,7 @@ class AsyncWorker(base.Worker):
         request_start = datetime.now()
         environ = {}
         resp = None
+        self.set_status(READING)
         try:
             self.cfg.pre_request(self, req)
             resp, environ = wsgi.create(req, sock, addr,
@@ -95,16 +101,17 @@ class AsyncWorker(base.Worker):
             environ["wsgi.multithread"] = True
             self.nr += 1
             if self.alive and self.nr >= self.max_requests:
-                self.log.info("Autorestarting worker after current request.")
                 resp.force_close()
-                self.alive = False
+                self.retire()
 
             if not self.cfg.keepalive:
                 resp.force_close()
 
+            self.set_status(APP, req)
             respiter = self.wsgi(environ, resp.start_response)
             if respiter == ALREADY_HANDLED:
                 return False
+            self.set_status(WRITING)
             try:
                 if isinstance(respiter, environ['wsgi.file_wrapper']):
                     resp.write_file(respiter)
@@ -138,8 +145,11 @@ class AsyncWorker(base.Worker):
                 raise StopIteration()
             raise
         finally:
+            self.set_status(IDLE)
             try:
                 self.cfg.post_request(self, req, environ, resp)
             except Exception:
                 self.log.exception("Exception in post_request hook")
+            # the temporary file of a spooled body
+            req.body.close()
         return True
@@ -4,14 +4,18 @@
 # See the NOTICE for more information.
 
 from datetime import datetime
+import errno
+import gc
 import os
+import select
 import signal
 import sys
+import threading
 from random import randint
 
 
 from gunicorn import util
-from gunicorn.workers.workertmp import WorkerTmp
+from gunicorn.workers.workertmp import WorkerTmp, READING, IDLE, SPARE
 from gunicorn.reloader import Reloader
 from gunicorn.http.errors import (
     InvalidHeader, InvalidHeaderName, InvalidRequestLine, InvalidRequestMethod,
@@ -43,6 +47,9 @@ class Worker(object):
         self.cfg = cfg
         self.booted = False
         self.aborted = False
+        self.retiring = False
+        # the pipe a spare worker waits on, the arbiter keeps the write end
+        self.spare = None
 
         self.nr = 0
         jitter = randint(0, cfg.max_requests_jitter)
@@ -50,6 +57,16 @@ class Worker(object):
         self.alive = True
         self.log = log
         self.tmp = WorkerTmp(cfg)
+        self.active = 0
+        self.status_lock = threading.Lock()
+        self.parser_class = cfg.parser_class
+
+    @classmethod
+    def capacity(cls, cfg):
+        """\
+        Return the number of requests a worker handles at once.
+        """
+        return 1
 
     def __str__(self):
         return "<Worker %s>" % self.pid
@@ -64,7 +81,52 @@ class Worker(object):
         once every ``self.timeout`` seconds. If you fail in accomplishing
         this task, the master process will murder your workers.
         """
-        self.tmp.notify()
+        self.tmp.notify(self.nr)
+
+    def retire(self):
+        """\
+        Stop accepting requests once ``max_requests`` is reached, and wake
+        the arbiter up so a spare worker takes over right away.
+        """
+        self.log.info("Autorestarting worker after current request.")
+        self.alive = False
+        self.notify()
+        if self.cfg.spare_workers:
+            self.wake_arbiter()
+
+    def ready(self):
+        """\
+        Tell the arbiter the worker has booted and accepts connections,
+        a rolling reload waits for it to stop an old worker.
+        """
+        self.tmp.set_status(IDLE, 0)
+        if self.cfg.reload_batch_size:
+            self.wake_arbiter()
+
+    def wake_arbiter(self):
+        if self.ppid == os.getppid():
+            os.kill(self.ppid, signal.SIGCHLD)
+
+    def set_status(self, state, req=None):
+        """\
+        Publish what the worker is doing on the scoreboard, one of the
+        ``READING``, ``APP``, ``WRITING`` or ``IDLE`` states of
+        ``gunicorn.workers.workertmp``. A request starts in ``READING``
+        and ends in ``IDLE``, ``req`` is given when the application is
+        called.
+
+        Workers handling several requests at once show the state of the
+        latest one, and are idle once they are all done.
+        """
+        with self.status_lock:
+            if state == READING:
+                self.active += 1
+            elif state == IDLE:
+                self.active = max(self.active - 1, 0)
+                if self.active:
+                    state = None
+            self.tmp.set_status(state, self.active,
+                    None if req is None else req.uri)
 
     def run(self):
         """\
@@ -95,11 +157,19 @@ class Worker(object):
             for k, v in self.cfg.env.items():
                 os.environ[k] = v
 
+        # the sockets of a worker join the SO_REUSEPORT group of the
+        # listeners, which the kernel only allows to their owner
+        self.init_sockets()
+
         util.set_owner_process(self.cfg.uid, self.cfg.gid)
 
         # Reseed the random number generator
         util.seed()
 
+        if self.cfg.worker_gc_threshold:
+            thresholds = gc.get_threshold()
+            gc.set_threshold(self.cfg.worker_gc_threshold, *thresholds[1:])
+
         # For waking ourselves up
         self.PIPE = os.pipe()
         for p in self.PIPE:
@@ -108,7 +178,6 @@ class Worker(object):
 
         # Prevent fd inheritance
         [util.close_on_exec(s) for s in self.sockets]
-        util.close_on_exec(self.tmp.fileno())
 
         self.log.close_on_exec()
 
@@ -120,8 +189,46 @@ class Worker(object):
 
         # Enter main run loop
         self.booted = True
+        if self.spare is not None:
+            self.wait_promotion()
+            if not self.alive:
+                return
+        if self.cfg.reuse_port:
+            [s.listen(self.cfg.backlog) for s in self.sockets]
+        self.ready()
         self.run()
 
+    def init_sockets(self):
+        """\
+        With ``reuse_port``, bind sockets of this worker to the addresses
+        of the listeners. They listen once the worker accepts connections.
+        """
+        if self.cfg.reuse_port:
+            self.sockets = [s.worker_socket() for s in self.sockets]
+
+    def wait_promotion(self):
+        """\
+        Wait with the application loaded until the arbiter needs this
+        spare worker to accept connections.
+        """
+        self.tmp.set_status(SPARE, 0)
+        while self.alive:
+            self.notify()
+            if self.ppid != os.getppid():
+                self.log.info("Parent changed, shutting down: %s", self)
+                self.alive = False
+                break
+            try:
+                ready = select.select([self.spare], [], [], 1.0)
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                continue
+            if ready[0]:
+                break
+        os.close(self.spare)
+        self.spare = None
+
     def init_signals(self):
         # reset signaling
         [signal.signal(s, signal.SIG_DFL) for s in self.SIGNALS]
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import sys
+
+if sys.version_info >= (3, 5):
+    from gunicorn.workers._gasyncio import AsyncioWorker
+    __all__ = ['AsyncioWorker']
+else:
+    raise RuntimeError("You need Python >= 3.5 to use the gasyncio worker")
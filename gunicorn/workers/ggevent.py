@@ -67,6 +67,9 @@ class GeventWorker(AsyncWorker):
         # monkey patch sendfile to make it none blocking
         patch_sendfile()
 
+    def init_sockets(self):
+        super(GeventWorker, self).init_sockets()
+
         # patch sockets
         sockets = []
         for s in self.sockets:
@@ -4,8 +4,9 @@
 # See the NOTICE for more information.
 
 # design:
-# a threaded worker accepts connections in the main loop, accepted
-# connections are are added to the thread pool as a connection job. On
+# a threaded worker accepts connections in the main loop, the request head
+# is read without blocking in the loop and once it is complete the
+# connection is added to the thread pool as a connection job. On
 # keepalive connections are put back in the loop waiting for an event.
 # If no event happen after the keep alive timeout, the connectoin is
 # closed.
@@ -19,13 +20,14 @@ import operator
 import socket
 import ssl
 import sys
-import time
 
 from .. import http
 from ..http import wsgi
+from ..http.message import max_head_size
 from .. import util
 from . import base
 from .. import six
+from .workertmp import IDLE, READING, APP, WRITING
 
 
 try:
@@ -37,21 +39,29 @@ except ImportError:
     """)
 
 try:
-    from asyncio import selectors
-except ImportError:
+    import selectors
+except ImportError:  # python < 3.4
     from gunicorn import selectors
 
 
 class TConn(object):
 
-    def __init__(self, cfg, listener, sock, addr):
+    def __init__(self, cfg, listener, sock, addr, parser_class):
         self.cfg = cfg
         self.listener = listener
         self.sock = sock
         self.addr = addr
+        self.parser_class = parser_class
 
         self.timeout = None
+        # the deadline is the keepalive timeout, not the one of a head
+        self.keepalived = False
         self.parser = None
+        # when the connection was last submitted to the thread pool
+        self.queued = None
+        # bytes of the buffered request head already searched for its end
+        self.scanned = 0
+        self.max_head = max_head_size(cfg)
 
         # set the socket to non blocking
         self.sock.setblocking(False)
@@ -61,17 +71,55 @@ class TConn(object):
         if self.parser is None:
             # wrap the socket if needed
             if self.cfg.is_ssl:
-                self.sock = ssl.wrap_socket(client, server_side=True,
+                self.sock = ssl.wrap_socket(self.sock, server_side=True,
                         **self.cfg.ssl_options)
 
             # initialize the parser
-            self.parser = http.RequestParser(self.cfg, self.sock)
+            self.parser = self.parser_class(self.cfg, self.sock)
             return True
         return False
 
-    def set_timeout(self):
+    def read_head(self):
+        """\
+        Buffer what the client sent without blocking. Return True once
+        the connection can be handled without waiting for the request
+        head, False to wait for more data.
+        """
+        if self.cfg.is_ssl:
+            # the handshake is done by the thread handling the connection
+            return True
+        if self.parser is None:
+            self.parser = self.parser_class(self.cfg, self.sock)
+        try:
+            if not self.parser.unreader.fill():
+                # the client is gone, let the parser see it
+                return True
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return False
+            return True
+        return self.head_received()
+
+    def head_received(self):
+        """\
+        Return True when a request head is buffered, or more data than
+        the parser accepts for one.
+        """
+        if self.parser is None:
+            return False
+        unreader = self.parser.unreader
+        # the end of the head may straddle what was searched already
+        start = unreader.start + max(self.scanned - 3, 0)
+        if (unreader.buf.find(b"\r\n\r\n", start, unreader.end) >= 0 or
+                unreader.end - unreader.start > self.max_head):
+            self.scanned = 0
+            return True
+        self.scanned = unreader.end - unreader.start
+        return False
+
+    def set_timeout(self, timeout):
         # set the timeout
-        self.timeout = time.time() + self.cfg.keepalive
+        self.timeout = util.monotonic() + timeout
 
     def __lt__(self, other):
         return self.timeout < other.timeout
@@ -89,13 +137,73 @@ class ThreadWorker(base.Worker):
         self.tpool = None
         self.poller = None
         self.futures = deque()
+        # the listeners are unregistered while the pool is saturated
+        self.accepting = False
+        self.depth_logged = 0
+        # (deadline, conn) of the keepalive connections. The keepalive
+        # timeout doesn't change so deadlines are added in order, an entry
+        # is stale once the connection has another deadline.
         self._keep = deque()
+        # (deadline, conn) of the connections sending their request head
+        self._heads = deque()
+
+    @classmethod
+    def capacity(cls, cfg):
+        return cfg.threads
 
     def _wrap_future(self, fs, conn):
         fs.conn = conn
         self.futures.append(fs)
         fs.add_done_callback(self.finish_request)
 
+    def submit(self, conn):
+        conn.timeout = None
+        conn.queued = util.monotonic()
+        fs = self.tpool.submit(self.handle, conn)
+        self._wrap_future(fs, conn)
+
+    def set_accepting(self, accepting):
+        """\
+        Register the listeners in the poller or unregister them. Connections
+        wait in the backlog of the listeners while they are unregistered.
+        """
+        if accepting == self.accepting:
+            return
+        self.accepting = accepting
+        for s in self.sockets:
+            if accepting:
+                self.poller.register(s, selectors.EVENT_READ, self.accept)
+            else:
+                self.poller.unregister(s)
+
+    def wakeup(self):
+        try:
+            os.write(self.PIPE[1], b'.')
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+
+    def clear_pipe(self, fd):
+        try:
+            while os.read(fd, 4096):
+                pass
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+
+    def log_queue_depth(self):
+        # the connections submitted beyond the threads wait in the queue
+        # of the pool
+        now = util.monotonic()
+        if now - self.depth_logged < 1:
+            return
+        self.depth_logged = now
+        depth = max(len(self.futures) - self.cfg.threads, 0)
+        self.log.debug("%s queued connections", depth,
+                       extra={"metric": "gunicorn.queue.depth",
+                              "value": depth,
+                              "mtype": "gauge"})
+
     def init_process(self):
         self.tpool = futures.ThreadPoolExecutor(max_workers=self.cfg.threads)
         self.poller = selectors.DefaultSelector()
@@ -107,9 +215,11 @@ class ThreadWorker(base.Worker):
 
         try:
             client, addr = listener.accept()
-            conn = TConn(self.cfg, listener, client, addr)
+            conn = TConn(self.cfg, listener, client, addr,
+                    self.parser_class)
 
             # wait for the read event to handle the connection
+            self.wait_head(conn)
             self.poller.register(client, selectors.EVENT_READ,
                     partial(self.handle_client, conn))
 
@@ -118,42 +228,65 @@ class ThreadWorker(base.Worker):
                     errno.ECONNABORTED, errno.EWOULDBLOCK):
                 raise
 
+    def wait_head(self, conn):
+        """\
+        Close ``conn`` unless its request head is read within the
+        ``timeout``. Partial heads don't extend the deadline.
+        """
+        conn.keepalived = False
+        if not self.cfg.timeout:
+            conn.timeout = None
+            return
+        conn.set_timeout(self.cfg.timeout)
+        self._heads.append((conn.timeout, conn))
+
     def handle_client(self, conn, client):
+        # slow clients don't hold a thread while they send the request head
+        if not conn.read_head():
+            if conn.keepalived:
+                # the next request started, the keepalive timeout is over
+                self.wait_head(conn)
+            return
+
         # unregister the client from the poller
         self.poller.unregister(client)
 
         # submit the connection to a worker
-        fs = self.tpool.submit(self.handle, conn)
-        self._wrap_future(fs, conn)
+        self.submit(conn)
 
     def murder_keepalived(self):
-        now = time.time()
-        while True:
-            try:
-                # remove the connection from the queue
-                conn = self._keep.popleft()
-            except IndexError:
+        now = util.monotonic()
+        for queue in (self._keep, self._heads):
+            self.murder_expired(queue, now)
+
+    def murder_expired(self, queue, now):
+        while queue:
+            deadline, conn = queue[0]
+            if conn.timeout != deadline:
+                # the connection was used since
+                queue.popleft()
+                continue
+            if deadline > now:
                 break
 
-            delta = conn.timeout - now
-            if delta > 0:
-                # add the connection back to the queue
-                self._keep.appendleft(conn)
-                break
-            else:
-                # remove the socket from the poller
-                self.poller.unregister(conn.sock)
+            queue.popleft()
+            conn.timeout = None
 
-                # close the socket
-                util.close(conn.sock)
+            # remove the socket from the poller
+            self.poller.unregister(conn.sock)
+
+            # close the socket
+            util.close(conn.sock)
 
     def run(self):
         # init listeners, add them to the event loop
         for s in self.sockets:
             s.setblocking(False)
-            self.poller.register(s, selectors.EVENT_READ, self.accept)
+        self.set_accepting(True)
 
-        timeout = self.cfg.timeout or 0.5
+        # finished requests wake up the loop to accept again
+        self.poller.register(self.PIPE[0], selectors.EVENT_READ,
+                self.clear_pipe)
 
         while self.alive:
             # If our parent changed then we shut down.
@@ -172,14 +305,10 @@ class ThreadWorker(base.Worker):
             # hanle keepalive timeouts
             self.murder_keepalived()
 
-            # if we more connections than the max number of connections
-            # accepted on a worker, wait until some complete or exit.
-            if len(self.futures) >= self.worker_connections:
-                res = futures.wait(self.futures, timeout=timeout)
-                if not res:
-                    self.alive = False
-                    self.log.info("max requests achieved")
-                    break
+            # stop accepting while the connections handled or waiting for a
+            # thread reach the limit, the kernel queues the new ones.
+            self.set_accepting(len(self.futures) < self.worker_connections)
+            self.log_queue_depth()
 
         # shutdown the pool
         self.poller.close()
@@ -213,9 +342,16 @@ class ThreadWorker(base.Worker):
                 # flag the socket as non blocked
                 conn.sock.setblocking(False)
 
+                if conn.head_received():
+                    # the next request was pipelined, handle it now since
+                    # the socket may not be readable anymore
+                    self.submit(conn)
+                    return
+
                 # register the connection
-                conn.set_timeout()
-                self._keep.append(conn)
+                conn.set_timeout(self.cfg.keepalive)
+                conn.keepalived = True
+                self._keep.append((conn.timeout, conn))
 
                 # add the socket to the event loop
                 self.poller.register(conn.sock, selectors.EVENT_READ,
@@ -232,17 +368,23 @@ class ThreadWorker(base.Worker):
                 self.futures.remove(fs)
             except ValueError:
                 pass
+            if not self.accepting:
+                self.wakeup()
 
     def handle(self, conn):
-        if not conn.init():
-            # connection kept alive
-            try:
-                self._keep.remove(conn)
-            except ValueError:
-                pass
+        conn.init()
+
+        waited = (util.monotonic() - conn.queued) * 1000
+        self.log.debug("Connection queued for %dms", waited,
+                       extra={"metric": "gunicorn.queue.wait",
+                              "value": int(waited),
+                              "mtype": "histogram"})
+        if self.cfg.max_queue_time and waited > self.cfg.max_queue_time:
+            return self.reject(conn)
 
         keepalive = False
         req = None
+        self.set_status(READING)
         try:
             req = six.next(conn.parser)
             if not req:
@@ -275,7 +417,24 @@ class ThreadWorker(base.Worker):
                     self.log.debug("Ignoring connection epipe")
         except Exception as e:
             self.handle_error(req, conn.sock, conn.addr, e)
+        finally:
+            self.set_status(IDLE)
+
+        return (False, conn)
 
+    def reject(self, conn):
+        """\
+        Answer a connection which waited too long for a thread with a 503.
+        """
+        self.log.debug("Rejected a connection queued for too long",
+                       extra={"metric": "gunicorn.queue.rejected",
+                              "value": 1,
+                              "mtype": "counter"})
+        try:
+            util.write_error(conn.sock, 503, "Service Unavailable",
+                    "The server is overloaded, retry later.")
+        except socket.error:
+            pass
         return (False, conn)
 
     def handle_request(self, req, conn):
@@ -291,14 +450,15 @@ class ThreadWorker(base.Worker):
             self.nr += 1
 
             if self.alive and self.nr >= self.max_requests:
-                self.log.info("Autorestarting worker after current request.")
                 resp.force_close()
-                self.alive = False
+                self.retire()
 
             if not self.cfg.keepalive:
                 resp.force_close()
 
+            self.set_status(APP, req)
             respiter = self.wsgi(environ, resp.start_response)
+            self.set_status(WRITING)
             try:
                 if isinstance(respiter, environ['wsgi.file_wrapper']):
                     resp.write_file(respiter)
@@ -337,5 +497,7 @@ class ThreadWorker(base.Worker):
                 self.cfg.post_request(self, req, environ, resp)
             except Exception:
                 self.log.exception("Exception in post_request hook")
+            # the temporary file of a spooled body
+            req.body.close()
 
         return True
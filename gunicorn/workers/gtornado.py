@@ -15,6 +15,7 @@ from tornado.ioloop import IOLoop, PeriodicCallback
 from tornado.wsgi import WSGIContainer
 from gunicorn.workers.base import Worker
 from gunicorn import __version__ as gversion
+from gunicorn import util
 
 
 class TornadoWorker(Worker):
@@ -30,6 +31,18 @@ class TornadoWorker(Worker):
         web.RequestHandler.clear = clear
         sys.modules["tornado.web"] = web
 
+    def init_process(self):
+        if self.cfg.event_loop != "auto":
+            # run the IOLoop on the asyncio loop of the setting
+            util.set_event_loop_policy(self.cfg.event_loop)
+            try:
+                from tornado.platform.asyncio import AsyncIOMainLoop
+            except ImportError:
+                raise RuntimeError("You need tornado >= 3.2 to use an "
+                        "asyncio event loop.")
+            AsyncIOMainLoop().install()
+        super(TornadoWorker, self).init_process()
+
     def handle_exit(self, sig, frame):
         if self.alive:
             super(TornadoWorker, self).handle_exit(sig, frame)
@@ -38,8 +51,7 @@ class TornadoWorker(Worker):
     def handle_request(self):
         self.nr += 1
         if self.alive and self.nr >= self.max_requests:
-            self.alive = False
-            self.log.info("Autorestarting worker after current request.")
+            self.retire()
             self.stop()
 
     def watchdog(self):
@@ -6,21 +6,103 @@
 
 from datetime import datetime
 import errno
+import fcntl
 import os
+import platform
+import re
 import select
 import socket
 import ssl
 import sys
+import tempfile
 
 import gunicorn.http as http
 import gunicorn.http.wsgi as wsgi
 import gunicorn.util as util
 import gunicorn.workers.base as base
 from gunicorn import six
+from gunicorn.workers.workertmp import IDLE, READING, APP, WRITING
+
+# wake up a single waiter per connection, linux 4.5 or later
+EPOLLEXCLUSIVE = getattr(select, "EPOLLEXCLUSIVE", 1 << 28)
+
+# how long a worker which didn't get the accept lock waits to try again
+ACCEPT_LOCK_DELAY = 0.1
+
+_accept_lock = None
+
+
+def get_accept_lock(cfg):
+    """\
+    Return the file the sync workers lock to wait for connections in turn,
+    opened once before they are forked.
+    """
+    global _accept_lock
+    if _accept_lock is None:
+        _accept_lock = tempfile.TemporaryFile(dir=cfg.worker_tmp_dir)
+        util.close_on_exec(_accept_lock.fileno())
+    return _accept_lock
+
+
+def has_epoll_exclusive():
+    """\
+    Return True when epoll honours ``EPOLLEXCLUSIVE``. Kernels before 4.5
+    accept the flag and ignore it, so the version is checked instead.
+    """
+    if not hasattr(select, "epoll"):
+        return False
+    match = re.match(r"(\d+)\.(\d+)", platform.release())
+    if match is None:
+        return False
+    return tuple(int(n) for n in match.groups()) >= (4, 5)
 
 
 class SyncWorker(base.Worker):
 
+    def __init__(self, *args, **kwargs):
+        super(SyncWorker, self).__init__(*args, **kwargs)
+        self.poller = None
+        self.listeners = {}
+        self.accept_lock = None
+        if self.cfg.accept_mutex and not self.cfg.reuse_port:
+            self.accept_lock = get_accept_lock(self.cfg)
+
+    def init_poller(self):
+        """\
+        Wait for connections with an epoll object registering the
+        listeners with ``EPOLLEXCLUSIVE``, so a connection wakes up a
+        single worker instead of all of them. Return False when the system
+        doesn't support it or the workers take turns with the accept lock.
+        """
+        if self.accept_lock is not None or not has_epoll_exclusive():
+            return False
+        poller = select.epoll()
+        try:
+            for s in self.sockets:
+                poller.register(s.fileno(), select.EPOLLIN | EPOLLEXCLUSIVE)
+                self.listeners[s.fileno()] = s
+        except (IOError, OSError) as e:
+            poller.close()
+            self.listeners = {}
+            if e.errno != errno.EINVAL:
+                raise
+            return False
+        util.close_on_exec(poller.fileno())
+        self.poller = poller
+        return True
+
+    def lock_accept(self):
+        try:
+            fcntl.lockf(self.accept_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EACCES, errno.EAGAIN):
+                raise
+            return False
+        return True
+
+    def unlock_accept(self):
+        fcntl.lockf(self.accept_lock, fcntl.LOCK_UN)
+
     def accept(self, listener):
         client, addr = listener.accept()
         client.setblocking(1)
@@ -28,13 +110,31 @@ class SyncWorker(base.Worker):
         self.handle(listener, client, addr)
 
     def wait(self, timeout):
+        """\
+        Return the listeners with connections waiting, an empty list when
+        none came in ``timeout`` seconds and False when the worker must
+        exit.
+        """
         try:
             self.notify()
-            ret = select.select(self.sockets, [], self.PIPE, timeout)
-            if ret[0]:
-                return ret[0]
+            if self.poller is not None:
+                events = self.poller.poll(timeout)
+                return [self.listeners[fd] for fd, _ in events]
 
-        except select.error as e:
+            if self.accept_lock is None:
+                return select.select(self.sockets, [], self.PIPE, timeout)[0]
+            # only the worker holding the lock waits on the listeners,
+            # the others try again shortly
+            if not self.lock_accept():
+                select.select([], [], self.PIPE,
+                              min(timeout, ACCEPT_LOCK_DELAY))
+                return []
+            try:
+                return select.select(self.sockets, [], self.PIPE, timeout)[0]
+            finally:
+                self.unlock_accept()
+
+        except (select.error, IOError) as e:
             if e.args[0] == errno.EINTR:
                 return self.sockets
             if e.args[0] == errno.EBADF:
@@ -75,7 +175,7 @@ class SyncWorker(base.Worker):
             if not self.is_parent_alive():
                 return
 
-            if not self.wait(timeout):
+            if self.wait(timeout) is False:
                 return
 
     def run_for_multiple(self, timeout):
@@ -83,7 +183,7 @@ class SyncWorker(base.Worker):
             self.notify()
 
             ready = self.wait(timeout)
-            if not ready:
+            if ready is False:
                 return
 
             for listener in ready:
@@ -107,6 +207,8 @@ class SyncWorker(base.Worker):
         for s in self.sockets:
             s.setblocking(0)
 
+        self.init_poller()
+
         if len(self.sockets) > 1:
             self.run_for_multiple(timeout)
         else:
@@ -114,12 +216,13 @@ class SyncWorker(base.Worker):
 
     def handle(self, listener, client, addr):
         req = None
+        self.set_status(READING)
         try:
             if self.cfg.is_ssl:
                 client = ssl.wrap_socket(client, server_side=True,
                     **self.cfg.ssl_options)
 
-            parser = http.RequestParser(self.cfg, client)
+            parser = self.parser_class(self.cfg, client)
             req = six.next(parser)
             self.handle_request(listener, req, client, addr)
         except http.errors.NoMoreData as e:
@@ -145,6 +248,7 @@ class SyncWorker(base.Worker):
             self.handle_error(req, client, addr, e)
         finally:
             util.close(client)
+            self.set_status(IDLE)
 
     def handle_request(self, listener, req, client, addr):
         environ = {}
@@ -160,9 +264,10 @@ class SyncWorker(base.Worker):
             resp.force_close()
             self.nr += 1
             if self.nr >= self.max_requests:
-                self.log.info("Autorestarting worker after current request.")
-                self.alive = False
+                self.retire()
+            self.set_status(APP, req)
             respiter = self.wsgi(environ, resp.start_response)
+            self.set_status(WRITING)
             try:
                 if isinstance(respiter, environ['wsgi.file_wrapper']):
                     resp.write_file(respiter)
@@ -196,3 +301,5 @@ class SyncWorker(base.Worker):
                 self.cfg.post_request(self, req, environ, resp)
             except Exception:
                 self.log.exception("Exception in post_request hook")
+            # the temporary file of a spooled body
+            req.body.close()
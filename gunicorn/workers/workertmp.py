@@ -3,54 +3,179 @@
 # This file is part of gunicorn released under the MIT license.
 # See the NOTICE for more information.
 
+import mmap
 import os
-import platform
-import tempfile
+import struct
+import time
 
 from gunicorn import util
 
-PLATFORM = platform.system()
-IS_CYGWIN = PLATFORM.startswith('CYGWIN')
+# a slot holds the time of the last notification and the number of
+# requests handled, followed by the scoreboard: the state of the worker,
+# the number of requests in progress, the time the current request
+# started and its url. Slots are a multiple of the cache line size so
+# workers don't write in the same line.
+SLOT = struct.Struct("=dQ")
+STATUS = struct.Struct("=BHdH")
+STATE = struct.Struct("=BH")
+ACTIVE = struct.Struct("=H")
+STATUS_OFFSET = SLOT.size
+URL_OFFSET = STATUS_OFFSET + STATUS.size
+SLOT_SIZE = 256
+MAX_URL = SLOT_SIZE - URL_OFFSET
+
+# worker states
+IDLE, READING, APP, WRITING, SPARE, BOOTING = range(6)
+STATE_NAMES = ["idle", "reading", "app", "writing", "spare", "booting"]
+
+
+class HeartbeatTable(object):
+    """\
+    Worker heartbeats in an anonymous shared memory mapping.
+
+    The table is created before the workers are forked. Each worker is
+    given a slot it updates without any system call and the arbiter reads
+    the slots from the same memory.
+    """
+
+    def __init__(self, size=1024):
+        self.mem = mmap.mmap(-1, size * SLOT_SIZE)
+        self.free = list(range(size - 1, -1, -1))
+
+    def acquire(self):
+        return self.free.pop()
+
+    def release(self, index):
+        self.free.append(index)
+
+    def write(self, index, timestamp, requests):
+        SLOT.pack_into(self.mem, index * SLOT_SIZE, timestamp, requests)
+
+    def read(self, index):
+        return SLOT.unpack_from(self.mem, index * SLOT_SIZE)
+
+    def write_status(self, index, state, active, started=None, url=None):
+        offset = index * SLOT_SIZE
+        if state is None:
+            ACTIVE.pack_into(self.mem, offset + STATUS_OFFSET + 1, active)
+            return
+        elif url is None:
+            STATE.pack_into(self.mem, offset + STATUS_OFFSET, state, active)
+            return
+
+        url = url[:MAX_URL]
+        STATUS.pack_into(self.mem, offset + STATUS_OFFSET, state, active,
+                started, len(url))
+        self.mem[offset + URL_OFFSET:offset + URL_OFFSET + len(url)] = url
+
+    def read_status(self, index):
+        offset = index * SLOT_SIZE
+        state, active, started, size = STATUS.unpack_from(self.mem,
+                offset + STATUS_OFFSET)
+        url = self.mem[offset + URL_OFFSET:offset + URL_OFFSET + size]
+        return state, active, started, url
+
+
+# table of the workers spawned by this process, a new one is created when
+# it is full
+_table = None
+
+
+def get_table():
+    """\
+    Return the table the next slot is acquired from.
+    """
+    global _table
+    if _table is None or not _table.free:
+        _table = HeartbeatTable()
+    return _table
+
+
+def detach():
+    """\
+    Acquire the next slots from a new table, in a process forked from the
+    one which acquires the slots of the workers.
+    """
+    global _table
+    _table = None
 
 
 class WorkerTmp(object):
+    """\
+    Heartbeat and scoreboard entry of a worker, a slot of the heartbeat
+    table.
+    """
 
     def __init__(self, cfg):
-        old_umask = os.umask(cfg.umask)
-        fdir = cfg.worker_tmp_dir
-        if fdir and not os.path.isdir(fdir):
-            raise RuntimeError("%s doesn't exist. Can't create workertmp." % fdir)
-        fd, name = tempfile.mkstemp(prefix="wgunicorn-", dir=fdir)
-
-        # allows the process to write to the file
-        util.chown(name, cfg.uid, cfg.gid)
-        os.umask(old_umask)
-
-        # unlink the file so we don't leak tempory files
-        try:
-            if not IS_CYGWIN:
-                util.unlink(name)
-            self._tmp = os.fdopen(fd, 'w+b', 1)
-        except:
-            os.close(fd)
-            raise
-
-        self.spinner = 0
-
-    def notify(self):
-        try:
-            self.spinner = (self.spinner + 1) % 2
-            os.fchmod(self._tmp.fileno(), self.spinner)
-        except AttributeError:
-            # python < 2.6
-            self._tmp.truncate(0)
-            os.write(self._tmp.fileno(), b"X")
+        self.table = get_table()
+        self.index = self.table.acquire()
+        self.pid = os.getpid()
+        self.closed = False
+        self.notify()
+        self.set_status(BOOTING, 0, "")
+
+    @classmethod
+    def attach(cls, table, index):
+        """\
+        Return the entry of the slot ``index`` of ``table``, acquired by
+        another process which gives it back.
+        """
+        tmp = cls.__new__(cls)
+        tmp.table = table
+        tmp.index = index
+        tmp.pid = None
+        tmp.closed = False
+        tmp.notify()
+        tmp.set_status(BOOTING, 0, "")
+        return tmp
+
+    def notify(self, requests=0):
+        self.table.write(self.index, util.monotonic(), requests)
 
     def last_update(self):
-        return os.fstat(self._tmp.fileno()).st_ctime
+        return self.table.read(self.index)[0]
+
+    def requests(self):
+        return self.table.read(self.index)[1]
+
+    def active(self):
+        return self.table.read_status(self.index)[1]
+
+    def ready(self):
+        """\
+        Return True once the worker has booted.
+        """
+        return self.table.read_status(self.index)[0] != BOOTING
+
+    def set_status(self, state, active, url=None):
+        """\
+        Set the state of the worker, None to keep it, and its number of
+        requests in progress, and the url of the request when it starts.
+        """
+        if url is not None:
+            url = util.to_bytestring(url)
+        self.table.write_status(self.index, state, active, time.time(), url)
 
-    def fileno(self):
-        return self._tmp.fileno()
+    def status(self):
+        """\
+        Return the scoreboard entry of the worker as a dict.
+        """
+        last_update, requests = self.table.read(self.index)
+        state, active, started, url = self.table.read_status(self.index)
+        status = {
+            "state": STATE_NAMES[state],
+            "active": active,
+            "requests": requests,
+            "last_update": round(util.monotonic() - last_update, 3)
+        }
+        if state not in (IDLE, SPARE, BOOTING):
+            status["started"] = started
+            status["url"] = url.decode("utf-8", "replace")
+        return status
 
     def close(self):
-        return self._tmp.close()
+        # the slot is given back by the process which acquired it, once the
+        # worker is gone
+        if not self.closed and self.pid == os.getpid():
+            self.closed = True
+            self.table.release(self.index)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_accept.py [workers] [requests] [clients]
+#
+# Run gunicorn with ``workers`` sync workers (32 by default) and send
+# ``requests`` requests (5000 by default) from ``clients`` concurrent
+# clients (4 by default), each on a new connection. The context switches
+# and the CPU time of the workers during the run are read from /proc and
+# reported for each way the workers wait for connections:
+#
+# - select: every worker selects on the listener, each connection wakes
+#   them all up
+# - accept-mutex: only the worker holding the accept lock selects
+# - epoll: the listener is registered with EPOLLEXCLUSIVE, each connection
+#   wakes up a single worker (Linux 4.5 or later)
+#
+# Linux only.
+#
+from __future__ import print_function
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """\
+from gunicorn.workers.sync import SyncWorker
+
+
+class SelectWorker(SyncWorker):
+
+    def init_poller(self):
+        return False
+
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Length", "2")])
+    return [b"ok"]
+"""
+
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def children(ppid):
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % name) as f:
+                stat = f.read()
+        except IOError:
+            continue
+        # the command name is between parentheses and may hold spaces
+        if int(stat.rsplit(")", 1)[1].split()[1]) == ppid:
+            pids.append(int(name))
+    return pids
+
+
+def usage(pid):
+    """Return the context switches and the CPU seconds of a process."""
+    switches = 0
+    with open("/proc/%s/status" % pid) as f:
+        for line in f:
+            if line.startswith(("voluntary_ctxt_switches:",
+                                "nonvoluntary_ctxt_switches:")):
+                switches += int(line.split()[1])
+    with open("/proc/%s/stat" % pid) as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, the 14th and 15th fields of the whole line
+    cpu = (int(fields[11]) + int(fields[12])) / float(CLK_TCK)
+    return switches, cpu
+
+
+def total_usage(pids):
+    switches = cpu = 0
+    for pid in pids:
+        s, c = usage(pid)
+        switches += s
+        cpu += c
+    return switches, cpu
+
+
+def get(port):
+    sock = socket.create_connection(("127.0.0.1", port))
+    try:
+        sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+        while sock.recv(8192):
+            pass
+    finally:
+        sock.close()
+
+
+def load(port, requests, clients):
+    def client(n):
+        for _ in range(n):
+            get(port)
+    threads = [threading.Thread(target=client, args=(requests // clients,))
+               for _ in range(clients)]
+    start = time.time()
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    return time.time() - start
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(tmpdir, workers, requests, clients, extra):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, tmpdir]))
+    args = [sys.executable, "-m", "gunicorn.app.wsgiapp",
+            "-w", str(workers), "-b", "127.0.0.1:%d" % port,
+            "--log-level", "warning", "benchapp:app"] + extra
+    proc = subprocess.Popen(args, env=env)
+    try:
+        deadline = time.time() + 60
+        while len(children(proc.pid)) < workers:
+            if proc.poll() is not None or time.time() > deadline:
+                raise RuntimeError("workers didn't start")
+            time.sleep(0.2)
+        time.sleep(1)
+        pids = children(proc.pid)
+        before = total_usage(pids)
+        elapsed = load(port, requests, clients)
+        after = total_usage(pids)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return after[0] - before[0], after[1] - before[1], elapsed
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmpdir, "benchapp.py"), "w") as f:
+            f.write(APP)
+        for name, extra in [
+                ("select", ["-k", "benchapp.SelectWorker"]),
+                ("accept-mutex", ["--accept-mutex"]),
+                ("epoll", [])]:
+            switches, cpu, elapsed = run(tmpdir, workers, requests, clients,
+                                         extra)
+            print("%-12s: %6d req/s %8d context switches %6.2fs CPU" % (
+                name, requests / elapsed, switches, cpu))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
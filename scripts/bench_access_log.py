@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_access_log.py [requests]
+#
+# Log ``requests`` accesses (100000 by default) to /dev/null with the
+# default access log format and a format using headers, and report the
+# best time of 3 runs and the time per request.
+#
+from __future__ import print_function
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+
+FORMATS = [
+    ("default", None),
+    ("headers", '%(h)s %(t)s "%(r)s" %(s)s %(b)s %(D)s "%({x-request-id}i)s" '
+                '"%({content-type}o)s"'),
+]
+
+
+class Response(object):
+    status = "200 OK"
+    response_length = 1024
+    headers = [("Content-Type", "text/html"), ("Content-Length", "1024"),
+               ("Cache-Control", "no-cache"), ("X-Frame-Options", "DENY")]
+
+
+class Request(object):
+    headers = [("HOST", "localhost:8000"), ("USER-AGENT", "bench/1.0"),
+               ("ACCEPT", "*/*"), ("ACCEPT-ENCODING", "gzip, deflate"),
+               ("CONNECTION", "keep-alive"), ("X-REQUEST-ID", "abcdef")]
+
+
+ENVIRON = {"REQUEST_METHOD": "GET", "RAW_URI": "/index.html",
+           "SERVER_PROTOCOL": "HTTP/1.1", "REMOTE_ADDR": "127.0.0.1",
+           "HTTP_USER_AGENT": "bench/1.0"}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    resp, req = Response(), Request()
+    request_time = datetime.timedelta(microseconds=1234)
+    for name, fmt in FORMATS:
+        cfg = Config()
+        cfg.set("accesslog", os.devnull)
+        if fmt is not None:
+            cfg.set("access_log_format", fmt)
+        logger = Logger(cfg)
+        elapsed = None
+        for _ in range(3):
+            start = time.time()
+            for _ in range(count):
+                logger.access(resp, req, ENVIRON, request_time)
+            elapsed = min(elapsed or 1e9, time.time() - start)
+        print("%-8s: %8.3f s %8.2f us/request" % (name, elapsed,
+            elapsed * 1e6 / count))
+
+
+if __name__ == "__main__":
+    main()
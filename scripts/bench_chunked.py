@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_chunked.py [body_size]
+#
+# Decode a chunked request body of ``body_size`` bytes (1 MiB by default)
+# sent with chunks of 1 byte up to the whole body, and report the best
+# time of 3 runs and the throughput for each chunk size.
+#
+from __future__ import print_function
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gunicorn.config import Config
+from gunicorn.http.parser import RequestParser
+from gunicorn import six
+
+CHUNK_SIZES = [1, 16, 256, 4096, 65536, 1 << 20]
+
+
+def chunked_request(payload, chunk_size):
+    chunks = [b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"]
+    for i in range(0, len(payload), chunk_size):
+        chunk = payload[i:i + chunk_size]
+        chunks.append(("%x\r\n" % len(chunk)).encode("latin1"))
+        chunks.append(chunk + b"\r\n")
+    chunks.append(b"0\r\n\r\n")
+    return b"".join(chunks)
+
+
+def segments(data, size=8192):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20
+    payload = b"x" * size
+    cfg = Config()
+    for chunk_size in CHUNK_SIZES:
+        if chunk_size > size:
+            break
+        data = chunked_request(payload, chunk_size)
+        elapsed = None
+        for _ in range(3):
+            start = time.time()
+            req = six.next(RequestParser(cfg, segments(data)))
+            body = req.body.read()
+            elapsed = min(elapsed or 1e9, time.time() - start)
+            assert body == payload
+        print("chunk size %8d: %8.3f s %10.1f KiB/s" % (chunk_size, elapsed,
+            size / 1024.0 / elapsed))
+
+
+if __name__ == "__main__":
+    main()
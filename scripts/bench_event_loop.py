@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_event_loop.py [requests] [clients]
+#
+# Run gunicorn with a single gasyncio worker serving a hello world ASGI
+# application on each event loop (asyncio and uvloop when it is installed),
+# and send ``requests`` requests (20000 by default) from ``clients`` client
+# processes (4 by default) over keepalive connections. The requests per
+# second and the requests per second of CPU time of the worker, which is
+# what a core serves, are reported for each loop.
+#
+# Linux only, Python 3.5 or later.
+#
+from __future__ import print_function
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """\
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        raise ValueError("no lifespan")
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-length", b"2")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+"""
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def children(ppid):
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % name) as f:
+                stat = f.read()
+        except IOError:
+            continue
+        # the command name is between parentheses and may hold spaces
+        if int(stat.rsplit(")", 1)[1].split()[1]) == ppid:
+            pids.append(int(name))
+    return pids
+
+
+def cpu_time(pid):
+    with open("/proc/%s/stat" % pid) as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, the 14th and 15th fields of the whole line
+    return (int(fields[11]) + int(fields[12])) / float(CLK_TCK)
+
+
+def client(args):
+    port, requests = args
+    sock = socket.create_connection(("127.0.0.1", port))
+    try:
+        for _ in range(requests):
+            sock.sendall(REQUEST)
+            data = b""
+            while not data.endswith(b"ok"):
+                chunk = sock.recv(8192)
+                if not chunk:
+                    raise RuntimeError("connection closed")
+                data += chunk
+    finally:
+        sock.close()
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(tmpdir, loop, requests, clients):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, tmpdir]))
+    args = [sys.executable, "-m", "gunicorn.app.wsgiapp", "-k",
+            "gunicorn.workers.gasyncio.AsyncioWorker",
+            "--event-loop", loop, "--keep-alive", "60",
+            "-b", "127.0.0.1:%d" % port, "--log-level", "warning",
+            "benchapp:app"]
+    proc = subprocess.Popen(args, env=env)
+    pool = multiprocessing.Pool(clients)
+    try:
+        deadline = time.time() + 60
+        while not children(proc.pid):
+            if proc.poll() is not None or time.time() > deadline:
+                raise RuntimeError("worker didn't start")
+            time.sleep(0.2)
+        time.sleep(1)
+        worker = children(proc.pid)[0]
+        before = cpu_time(worker)
+        start = time.time()
+        pool.map(client, [(port, requests // clients)] * clients)
+        elapsed = time.time() - start
+        cpu = cpu_time(worker) - before
+    finally:
+        pool.terminate()
+        proc.terminate()
+        proc.wait()
+    return elapsed, cpu
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmpdir, "benchapp.py"), "w") as f:
+            f.write(APP)
+        for loop in ("asyncio", "uvloop"):
+            if loop == "uvloop":
+                try:
+                    import uvloop  # noqa
+                except ImportError:
+                    print("%-8s: skipped, not installed" % loop)
+                    continue
+            elapsed, cpu = run(tmpdir, loop, requests, clients)
+            print("%-8s: %6d req/s %6d req/s per core" % (
+                loop, requests / elapsed, requests / cpu))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
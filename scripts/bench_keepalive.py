@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_keepalive.py [idle,idle,...] [requests]
+#
+# Run gunicorn with a single gthread worker, open ``idle`` keepalive
+# connections (0, 10000 and 50000 by default) which make a request and
+# stay idle, then send ``requests`` requests (20000 by default) from 4
+# clients over keepalive connections. The CPU time the worker spends per
+# 1000 requests is reported for each number of idle connections.
+#
+# The worker and the script need a file descriptor per connection, the
+# soft limit is raised to the hard limit and the numbers of connections
+# above it are skipped. The idle connections are bound to several
+# loopback addresses so they don't run out of local ports. Linux only.
+#
+from __future__ import print_function
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """\
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Length", "2")])
+    return [b"ok"]
+"""
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+# connections per local address
+PER_ADDRESS = 10000
+
+
+def children(ppid):
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % name) as f:
+                stat = f.read()
+        except IOError:
+            continue
+        # the command name is between parentheses and may hold spaces
+        if int(stat.rsplit(")", 1)[1].split()[1]) == ppid:
+            pids.append(int(name))
+    return pids
+
+
+def cpu_time(pid):
+    with open("/proc/%s/stat" % pid) as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, the 14th and 15th fields of the whole line
+    return (int(fields[11]) + int(fields[12])) / float(CLK_TCK)
+
+
+def read_response(sock):
+    data = b""
+    while not data.endswith(b"ok"):
+        chunk = sock.recv(8192)
+        if not chunk:
+            raise RuntimeError("connection closed")
+        data += chunk
+
+
+def open_idle(port, count):
+    conns = []
+    for i in range(count):
+        sock = socket.socket()
+        sock.bind(("127.0.0.%d" % (2 + i // PER_ADDRESS), 0))
+        sock.connect(("127.0.0.1", port))
+        sock.sendall(REQUEST)
+        conns.append(sock)
+    for sock in conns:
+        read_response(sock)
+    return conns
+
+
+def load(port, requests, clients):
+    def client(n):
+        sock = socket.create_connection(("127.0.0.1", port))
+        try:
+            for _ in range(n):
+                sock.sendall(REQUEST)
+                read_response(sock)
+        finally:
+            sock.close()
+    threads = [threading.Thread(target=client, args=(requests // clients,))
+               for _ in range(clients)]
+    start = time.time()
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    return time.time() - start
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(tmpdir, idle, requests):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, tmpdir]))
+    args = [sys.executable, "-m", "gunicorn.app.wsgiapp", "-k",
+            "gunicorn.workers.gthread.ThreadWorker",
+            "--threads", "4", "--keep-alive", "600", "--backlog", "4096",
+            "-b", "127.0.0.1:%d" % port, "--log-level", "warning",
+            "benchapp:app"]
+    proc = subprocess.Popen(args, env=env)
+    conns = []
+    try:
+        deadline = time.time() + 60
+        while not children(proc.pid):
+            if proc.poll() is not None or time.time() > deadline:
+                raise RuntimeError("worker didn't start")
+            time.sleep(0.2)
+        time.sleep(1)
+        worker = children(proc.pid)[0]
+        conns = open_idle(port, idle)
+        before = cpu_time(worker)
+        elapsed = load(port, requests, 4)
+        cpu = cpu_time(worker) - before
+    finally:
+        for sock in conns:
+            sock.close()
+        proc.terminate()
+        proc.wait()
+    return cpu, elapsed
+
+
+def main():
+    counts = [0, 10000, 50000]
+    if len(sys.argv) > 1:
+        counts = [int(c) for c in sys.argv[1].split(",")]
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmpdir, "benchapp.py"), "w") as f:
+            f.write(APP)
+        for idle in counts:
+            if hard != resource.RLIM_INFINITY and idle + 100 > hard:
+                print("%6d idle: skipped, the limit is %d files" % (
+                    idle, hard))
+                continue
+            cpu, elapsed = run(tmpdir, idle, requests)
+            print("%6d idle: %6d req/s %6.1fms CPU per 1000 requests" % (
+                idle, requests / elapsed, 1000 * cpu * 1000 / requests))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_parser.py [segment_size [parser_class]]
+#
+# Parse every request of the tests/requests/valid corpus, fed to the
+# parser in segments of ``segment_size`` bytes (1 by default, i.e. a client
+# trickling its request head), and report the time spent per request.
+# ``parser_class`` is one of the values of the ``parser_class`` setting.
+#
+from __future__ import print_function
+import glob
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "tests"))
+
+import treq
+
+ROUNDS = 20
+
+
+def segments(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def load_corpus(parser_class):
+    reqdir = os.path.join(os.path.dirname(HERE), "tests", "requests", "valid")
+    corpus = []
+    for fname in sorted(glob.glob(os.path.join(reqdir, "*.http"))):
+        env = treq.load_py(os.path.splitext(fname)[0] + ".py", parser_class)
+        req = treq.request(fname, env["request"])
+        corpus.append((env["cfg"], req.data))
+    return corpus
+
+
+def parse_all(corpus, size):
+    count = 0
+    for cfg, data in corpus:
+        for req in cfg.parser_class(cfg, segments(data, size)):
+            req.body.read()
+            count += 1
+    return count
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    parser_class = sys.argv[2] if len(sys.argv) > 2 else "python"
+    corpus = load_corpus(parser_class)
+
+    start = time.time()
+    for _ in range(ROUNDS):
+        count = parse_all(corpus, size)
+    elapsed = time.time() - start
+    print("parser: %s, requests: %d, segment size: %d" % (parser_class,
+        count, size))
+    print("time per request: %.1f us" % (elapsed * 1e6 / (count * ROUNDS)))
+
+
+if __name__ == "__main__":
+    main()
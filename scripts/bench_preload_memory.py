@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# Usage: python scripts/bench_preload_memory.py [workers] [objects]
+#
+# Run gunicorn with a preloaded application holding ``objects`` small
+# dicts (200000 by default) and ``workers`` sync workers (4 by default),
+# with and without ``--gc-freeze``. Each request makes the worker run a
+# full garbage collection, then the shared and private memory of every
+# worker is read from /proc/<pid>/smaps and the averages are reported.
+#
+# gc.freeze() needs Python 3.7, run the script with such an interpreter to
+# see the difference. Linux only.
+#
+from __future__ import print_function
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """\
+import gc
+
+DATA = [{"id": i, "name": "item %%d" %% i} for i in range(%d)]
+
+
+def app(environ, start_response):
+    gc.collect()
+    start_response("200 OK", [("Content-Length", "2")])
+    return [b"ok"]
+"""
+
+
+def children(ppid):
+    pids = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open("/proc/%s/stat" % name) as f:
+                stat = f.read()
+        except IOError:
+            continue
+        # the command name is between parentheses and may hold spaces
+        if int(stat.rsplit(")", 1)[1].split()[1]) == ppid:
+            pids.append(int(name))
+    return pids
+
+
+def memory(pid):
+    """Return the shared and private memory of a process in kB."""
+    shared = private = 0
+    with open("/proc/%s/smaps" % pid) as f:
+        for line in f:
+            if line.startswith(("Shared_Clean:", "Shared_Dirty:")):
+                shared += int(line.split()[1])
+            elif line.startswith(("Private_Clean:", "Private_Dirty:")):
+                private += int(line.split()[1])
+    return shared, private
+
+
+def get(port):
+    sock = socket.create_connection(("127.0.0.1", port))
+    try:
+        sock.sendall(b"GET / HTTP/1.0\r\n\r\n")
+        while sock.recv(8192):
+            pass
+    finally:
+        sock.close()
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run(tmpdir, workers, extra):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, tmpdir]))
+    args = [sys.executable, "-m", "gunicorn.app.wsgiapp", "--preload",
+            "-w", str(workers), "-b", "127.0.0.1:%d" % port,
+            "--log-level", "warning", "benchapp:app"] + extra
+    proc = subprocess.Popen(args, env=env)
+    try:
+        deadline = time.time() + 60
+        while len(children(proc.pid)) < workers:
+            if proc.poll() is not None or time.time() > deadline:
+                raise RuntimeError("workers didn't start")
+            time.sleep(0.2)
+        time.sleep(1)
+        for _ in range(workers * 20):
+            get(port)
+        time.sleep(0.5)
+        usage = [memory(pid) for pid in children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait()
+    shared = sum(u[0] for u in usage) / len(usage)
+    private = sum(u[1] for u in usage) / len(usage)
+    return shared, private
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    objects = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    tmpdir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(tmpdir, "benchapp.py"), "w") as f:
+            f.write(APP % objects)
+        for name, extra in [("preload", []),
+                            ("gc-freeze", ["--gc-freeze"])]:
+            shared, private = run(tmpdir, workers, extra)
+            print("%-10s: %8d kB shared %8d kB private per worker" % (
+                name, shared, private))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
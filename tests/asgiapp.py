@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+# ASGI applications of the gasyncio worker tests, apart since their syntax
+# needs Python 3.5.
+
+
+class EchoApp(object):
+    "Answer with the request body, record the lifespan events"
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                self.events.append(message["type"])
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(body)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-length",
+                                 str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+async def hello(scope, receive, send):
+    if scope["type"] != "http":
+        raise ValueError("no lifespan")
+    await send({"type": "http.response.start", "status": 404,
+                "headers": []})
+    await send({"type": "http.response.body", "body": b"hello",
+                "more_body": True})
+    await send({"type": "http.response.body", "body": b" world"})
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import os
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.arbiter import Arbiter
+from gunicorn.workers import workertmp
+from gunicorn.workers.workertmp import WorkerTmp
+
+
+class App(BaseApplication):
+    "Application configured with the settings it is given"
+
+    def __init__(self, **settings):
+        self.settings = settings
+        super(App, self).__init__()
+
+    def init(self, parser, opts, args):
+        pass
+
+    def load(self):
+        pass
+
+    def load_config(self):
+        for k, v in self.settings.items():
+            self.cfg.set(k, v)
+
+
+class FakeWorker(object):
+    "Worker the arbiter tracks without a process"
+    retiring = False
+    aborted = False
+    max_requests = 10
+
+    def __init__(self, age, cfg, spare=False, active=None):
+        self.age = age
+        self.tmp = WorkerTmp(cfg)
+        if active is not None:
+            self.tmp.set_status(workertmp.APP, active)
+        # the arbiter promotes a spare by writing to its pipe
+        self.spare = None
+        self.pipe = None
+        if spare:
+            self.pipe = os.pipe()
+            self.spare = self.pipe[1]
+
+    def close(self):
+        self.tmp.close()
+        if self.pipe is not None:
+            os.close(self.pipe[0])
+        if self.spare is not None:
+            os.close(self.spare)
+
+
+def make_arbiter(**settings):
+    """\
+    Return an arbiter whose spawned workers are fake workers, the spare
+    flags of the workers spawned are recorded in ``spawned`` and the
+    signals sent in ``killed``.
+    """
+    arbiter = Arbiter(App(**settings))
+    arbiter.WORKERS = {}
+    arbiter.spawned = []
+    arbiter.killed = []
+
+    def spawn_worker(spare=False):
+        arbiter.spawned.append(spare)
+        return add_worker(arbiter, spare=spare)
+
+    def kill_worker(pid, sig):
+        arbiter.killed.append((pid, sig))
+
+    arbiter.spawn_worker = spawn_worker
+    arbiter.kill_worker = kill_worker
+    return arbiter
+
+
+def add_worker(arbiter, **kwargs):
+    "Add a fake worker to ``arbiter``, return its pid"
+    arbiter.worker_age += 1
+    pid = arbiter.worker_age
+    arbiter.WORKERS[pid] = FakeWorker(pid, arbiter.cfg, **kwargs)
+    return pid
+
+
+def killed(arbiter):
+    "Return the pids of the workers ``arbiter`` sent a signal to"
+    return [pid for pid, _ in arbiter.killed]
+
+
+def close(arbiter):
+    for worker in arbiter.WORKERS.values():
+        worker.close()
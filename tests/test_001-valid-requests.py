@@ -13,8 +13,8 @@ dirname = os.path.dirname(__file__)
 from py.test import skip
 reqdir = os.path.join(dirname, "requests", "valid")
 
-def a_case(fname):
-    env = treq.load_py(os.path.splitext(fname)[0] + ".py")
+def a_case(fname, parser_class):
+    env = treq.load_py(os.path.splitext(fname)[0] + ".py", parser_class)
     expect = env['request']
     cfg = env['cfg']
     req = treq.request(fname, expect)
@@ -23,12 +23,14 @@ def a_case(fname):
 
 def test_http_parser():
     for fname in glob.glob(os.path.join(reqdir, "*.http")):
-        if os.getenv("GUNS_BLAZING"):
-            env = treq.load_py(os.path.splitext(fname)[0] + ".py")
-            expect = env['request']
-            cfg = env['cfg']
-            req = treq.request(fname, expect)
-            for case in req.gen_cases(cfg):
-                yield case
-        else:
-            yield (a_case, fname)
+        for parser_class in treq.PARSERS:
+            if os.getenv("GUNS_BLAZING"):
+                env = treq.load_py(os.path.splitext(fname)[0] + ".py",
+                                   parser_class)
+                expect = env['request']
+                cfg = env['cfg']
+                req = treq.request(fname, expect)
+                for case in req.gen_cases(cfg):
+                    yield case
+            else:
+                yield (a_case, fname, parser_class)
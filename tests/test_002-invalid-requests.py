@@ -17,13 +17,15 @@ reqdir = os.path.join(dirname, "requests", "invalid")
 
 def test_http_parser():
     for fname in glob.glob(os.path.join(reqdir, "*.http")):
-        env = treq.load_py(os.path.splitext(fname)[0] + ".py")
-
-        expect = env['request']
-        cfg = env['cfg']
-        req = treq.badrequest(fname)
-
-        with pytest.raises(expect):
-            def f(fname):
-                return req.check(cfg)
-            f(fname)
+        for parser_class in treq.PARSERS:
+            env = treq.load_py(os.path.splitext(fname)[0] + ".py",
+                               parser_class)
+
+            expect = env['request']
+            cfg = env['cfg']
+            req = treq.badrequest(fname)
+
+            with pytest.raises(expect):
+                def f(fname):
+                    return req.check(cfg)
+                f(fname)
@@ -11,6 +11,7 @@ import sys
 
 from gunicorn import config
 from gunicorn.app.base import Application
+from gunicorn.http import parser
 from gunicorn.workers.sync import SyncWorker
 
 dirname = os.path.dirname(__file__)
@@ -113,6 +114,15 @@ def test_pos_int_validation():
     t.raises(ValueError, c.set, "workers", -21)
     t.raises(TypeError, c.set, "workers", c)
 
+def test_percent_validation():
+    c = config.Config()
+    c.set("scale_up_threshold", "100")
+    t.eq(c.scale_up_threshold, 100)
+    c.set("scale_down_threshold", 1)
+    t.eq(c.scale_down_threshold, 1)
+    t.raises(ValueError, c.set, "scale_up_threshold", 0)
+    t.raises(ValueError, c.set, "scale_down_threshold", 101)
+
 def test_str_validation():
     c = config.Config()
     t.eq(c.proc_name, "gunicorn")
@@ -249,3 +259,20 @@ def test_nworkers_changed():
 
     c.set("nworkers_changed", nworkers_changed_3)
     t.eq(3, c.nworkers_changed(1, 2, 3))
+
+
+def test_parser_class():
+    c = config.Config()
+    t.eq(c.parser_class, parser.DefaultRequestParser)
+
+    c.set("parser_class", "python")
+    t.eq(c.parser_class, parser.RequestParser)
+
+    c.set("parser_class", "gunicorn.http.parser.RequestParser")
+    t.eq(c.parser_class, parser.RequestParser)
+
+    c.set("parser_class", "httptools")
+    if parser.HttptoolsRequest is None:
+        t.raises(RuntimeError, getattr, c, "parser_class")
+    else:
+        t.eq(c.parser_class, parser.HttptoolsRequestParser)
@@ -1,6 +1,15 @@
+import os
+import socket
+
 import t
-from gunicorn.http.body import Body
+from gunicorn import six
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+from gunicorn.http.body import Body, SpooledBody
+from gunicorn.http.parser import RequestParser
 from gunicorn.six import BytesIO
+from gunicorn.sock import TCPSocket
+from gunicorn.workers.sync import SyncWorker
 
 
 def assert_readline(payload, size, expected):
@@ -58,3 +67,112 @@ def test_readline_buffer_loaded_with_size():
     t.eq(body.readline(2), b"\n")
     t.eq(body.readline(2), b"de")
     t.eq(body.readline(2), b"f")
+
+
+def chunked_request(payload, chunk_size):
+    chunks = [b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"]
+    for i in range(0, len(payload), chunk_size):
+        chunk = payload[i:i + chunk_size]
+        chunks.append(("%x\r\n" % len(chunk)).encode("latin1"))
+        chunks.append(chunk + b"\r\n")
+    chunks.append(b"0\r\nX-Trailer: 1\r\n\r\n")
+    return b"".join(chunks)
+
+
+def segments(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_chunked_pathological_sizes():
+    payload = bytes(bytearray(i % 251 for i in range(1 << 14)))
+    for chunk_size in (1, 3, 1024, 1 << 14):
+        data = chunked_request(payload, chunk_size)
+        for segment_size in (7, 8192, len(data)):
+            req = six.next(RequestParser(Config(),
+                                         segments(data, segment_size)))
+            t.eq(req.body.read(), payload)
+            t.eq(req.trailers, [("X-TRAILER", "1")])
+
+
+def test_spooled_body_rolls_over():
+    payload = b"".join(("line %d\n" % i).encode() for i in range(2000))
+    body = SpooledBody(BytesIO(payload), 10000)
+    t.eq(body.readline(), b"line 0\n")
+    t.eq(body.readline(3), b"lin")
+    t.eq(body.read(4), b"e 1\n")
+    t.eq(body.file._rolled, False)
+    t.eq(body.read(), payload[14:])
+    t.eq(body.file._rolled, True)
+    t.eq(body.read(), b"")
+
+
+def test_spooled_body_seek():
+    payload = b"abc\ndef\nghi"
+    body = SpooledBody(BytesIO(payload), 4)
+    t.eq(body.seek(5), 5)
+    t.eq(body.read(2), b"ef")
+    t.eq(body.tell(), 7)
+    body.seek(0)
+    t.eq(list(body), [b"abc\n", b"def\n", b"ghi"])
+    t.eq(body.seek(-2, 2), 9)
+    t.eq(body.read(), b"hi")
+    body.seek(-8, 1)
+    t.eq(body.readlines(), [b"\n", b"def\n", b"ghi"])
+    t.raises(ValueError, body.seek, -1)
+
+
+def test_spool_threshold_setting():
+    cfg = Config()
+    cfg.set("body_spool_threshold", 16)
+    payload = b"x" * 100
+    req = (b"POST / HTTP/1.1\r\nContent-Length: 100\r\n\r\n" + payload +
+           b"GET / HTTP/1.1\r\n\r\n")
+    parser = RequestParser(cfg, iter([req]))
+    mesg = six.next(parser)
+    t.istype(mesg.body, SpooledBody)
+    t.eq(mesg.body.read(10), b"x" * 10)
+    mesg = six.next(parser)
+    t.eq(mesg.path, "/")
+
+
+def test_spooled_body_closed_by_parser():
+    cfg = Config()
+    cfg.set("body_spool_threshold", 16)
+    req = (b"POST / HTTP/1.1\r\nContent-Length: 100\r\n\r\n" + b"x" * 100 +
+           b"GET / HTTP/1.1\r\n\r\n")
+    parser = RequestParser(cfg, iter([req]))
+    body = six.next(parser).body
+    t.eq(body.read(50), b"x" * 50)
+    t.eq(body.file._rolled, True)
+    six.next(parser)
+    t.eq(body.file.closed, True)
+
+
+def test_spooled_body_closed_by_worker():
+    cfg = Config()
+    cfg.set("body_spool_threshold", 16)
+    listener = TCPSocket(("127.0.0.1", 0), cfg, None)
+    worker = SyncWorker(1, os.getppid(), [listener], None, 30, cfg,
+                        Logger(cfg))
+    bodies = []
+
+    def app(environ, start_response):
+        bodies.append(environ["wsgi.input"])
+        environ["wsgi.input"].read()
+        start_response("200 OK", [("Content-Length", "0")])
+        return [b""]
+
+    worker.wsgi = app
+    req = six.next(RequestParser(cfg, iter([
+        b"POST / HTTP/1.1\r\nContent-Length: 100\r\n\r\n" + b"x" * 100])))
+    server, client = socket.socketpair()
+    try:
+        worker.handle_request(listener, req, server, ("127.0.0.1", 1234))
+        t.eq(bodies[0].file._rolled, True)
+        t.eq(bodies[0].file.closed, True)
+    finally:
+        server.close()
+        client.close()
+        worker.tmp.close()
+        listener.close()
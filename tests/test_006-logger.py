@@ -1,9 +1,15 @@
 import datetime
+import logging
+import os
+import shutil
+import tempfile
+import time
 
 import t
 
 from gunicorn.config import Config
-from gunicorn.glogging import Logger
+from gunicorn.glogging import AccessFormatter, Logger, QueuedHandler, SafeAtoms
+from gunicorn.six import StringIO
 
 
 class Mock():
@@ -25,3 +31,85 @@ def test_atoms_defaults():
     t.eq(atoms['r'], 'GET http://my.uri HTTP/1.1')
     t.eq(atoms['{accept}i'], 'application/json')
     t.eq(atoms['{content-type}o'], 'application/json')
+
+
+def test_access_formatter():
+    response = Mock(status='200 OK', response_length=None,
+        headers=(('Content-Type', 'application/json'), ))
+    request = Mock(headers=(('ACCEPT', 'text/html'), ('ACCEPT', 'a/"b"')))
+    environ = {'REQUEST_METHOD': 'GET', 'RAW_URI': '/my"uri',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_USER_AGENT': 'test'}
+    request_time = datetime.timedelta(seconds=1, microseconds=20)
+    fmt = ('%(h)s %(l)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(T)s %(D)d '
+           '%(L)s %(p)s %({Accept}i)s %({content-type}o)s %({x}i)s %(z)s')
+    logger = Logger(Config())
+    safe_atoms = SafeAtoms(logger.atoms(response, request, environ,
+        request_time))
+    formatter = AccessFormatter(fmt)
+    t.eq(formatter.format(response, request, environ, request_time),
+         fmt % safe_atoms)
+    t.eq(formatter.format(response, request, environ, request_time),
+         '127.0.0.1 - "GET /my\\"uri HTTP/1.1" 200 - "-" "test" 1 1000020 '
+         '1.000020 <%s> a/\\"b\\" application/json - -' % os.getpid())
+
+
+def test_access_formatter_time():
+    formatter = AccessFormatter('%(t)s')
+    t.eq(formatter.format(None, None, {}, None), Logger(Config()).now())
+
+
+def test_queued_handler():
+    stream = StringIO()
+    target = logging.StreamHandler(stream)
+    handler = QueuedHandler(target, 1)
+    log = logging.getLogger("gunicorn.test.queued")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        # hold the stream so the first line waits to be written, the
+        # second fills the queue and the third is dropped
+        target.acquire()
+        log.warning("1")
+        while not handler.queue.empty():
+            time.sleep(0.01)
+        log.warning("2")
+        log.warning("3")
+        target.release()
+        handler.flush()
+        t.eq(stream.getvalue(), "1\n2\n")
+        t.eq(handler.dropped, 1)
+
+        log.warning("4")
+        handler.close()
+        t.eq(stream.getvalue(), "1\n2\n4\n")
+        t.eq(handler.thread.is_alive(), False)
+    finally:
+        log.removeHandler(handler)
+
+
+def test_queued_access_log_reopen():
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "access.log")
+    cfg = Config()
+    cfg.set("accesslog", path)
+    cfg.set("access_log_queue_size", 10)
+    logger = Logger(cfg)
+    handler = logger._get_gunicorn_handler(logger.access_log)
+    try:
+        t.istype(handler, QueuedHandler)
+        logger.access_log.info("first")
+        handler.flush()
+        os.rename(path, path + ".1")
+        logger.reopen_files()
+        logger.access_log.info("second")
+        handler.flush()
+        with open(path + ".1") as f:
+            t.eq(f.read(), "first\n")
+        with open(path) as f:
+            t.eq(f.read(), "second\n")
+    finally:
+        logger.access_log.removeHandler(handler)
+        handler.close()
+        handler.target.close()
+        shutil.rmtree(tmpdir)
@@ -69,6 +69,11 @@ def test_instrument():
     t.eq(sio.getvalue(), "Blah\n")  # log is unchanged
     logger.sock.reset()
 
+    # Zero values are sent too
+    logger.debug("", extra={"mtype": "gauge", "metric": "gunicorn.debug", "value": 0})
+    t.eq(logger.sock.msgs[0], "gunicorn.debug:0|g")
+    logger.sock.reset()
+
     logger.critical("Boom")
     t.eq(logger.sock.msgs[0], "gunicorn.log.critical:1|c|@1.0")
     logger.sock.reset()
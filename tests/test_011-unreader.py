@@ -0,0 +1,68 @@
+import socket
+
+import t
+from gunicorn.http.body import LengthReader
+from gunicorn.http.unreader import IterUnreader, SocketUnreader
+
+
+def test_iter_unreader_read_sizes():
+    unreader = IterUnreader([b"abc", b"defg", b"h"])
+    t.eq(unreader.read(2), b"ab")
+    t.eq(unreader.read(4), b"cdef")
+    t.eq(unreader.read(), b"g")
+    t.eq(unreader.read(), b"h")
+    t.eq(unreader.read(), b"")
+    t.eq(unreader.read(5), b"")
+
+
+def test_unread_steps_back():
+    unreader = IterUnreader([b"abcdef"])
+    t.eq(unreader.read(2), b"ab")
+    data = unreader.read()
+    t.eq(data, b"cdef")
+    unreader.unread(data[1:])
+    t.eq(unreader.start, 3)
+    t.eq(unreader.read(2), b"de")
+    t.eq(unreader.read(), b"f")
+
+
+def test_unread_does_not_grow_buffer():
+    unreader = IterUnreader([b"abcdef"] * 100)
+    for _ in range(100):
+        data = unreader.read()
+        unreader.unread(data[3:])
+        t.eq(unreader.read(), b"def")
+    t.eq(len(unreader.buf), 8192)
+
+
+def test_unread_more_than_read():
+    unreader = IterUnreader([b"abc", b"def"])
+    t.eq(unreader.read(1), b"a")
+    unreader.unread(b"xyz")
+    t.eq(unreader.read(), b"xyzbc")
+    t.eq(unreader.read(), b"def")
+
+
+def test_buffer_grows_for_large_reads():
+    chunks = [b"x" * 5000, b"y" * 5000, b"z" * 5000]
+    unreader = IterUnreader(chunks)
+    t.eq(unreader.read(12000), b"x" * 5000 + b"y" * 5000 + b"z" * 2000)
+    t.eq(unreader.read(), b"z" * 3000)
+
+
+def test_socket_unreader_recv_into():
+    a, b = socket.socketpair()
+    try:
+        payload = bytes(bytearray(i % 256 for i in range(20000)))
+        a.sendall(payload)
+        a.close()
+        reader = LengthReader(SocketUnreader(b, max_chunk=4096),
+                              len(payload))
+        data = []
+        chunk = reader.read(1000)
+        while chunk:
+            data.append(chunk)
+            chunk = reader.read(1000)
+        t.eq(b"".join(data), payload)
+    finally:
+        b.close()
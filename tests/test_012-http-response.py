@@ -0,0 +1,180 @@
+import socket
+import sys
+import time
+
+import t
+from gunicorn import SERVER_SOFTWARE, six, util
+from gunicorn.config import Config
+from gunicorn.http.parser import RequestParser
+from gunicorn.http.wsgi import Response
+
+
+class MockSocket(object):
+    "Send at most ``limit`` bytes per call"
+    def __init__(self, limit):
+        self.limit = limit
+        self.calls = 0
+        self.data = []
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        sent = 0
+        for buf in buffers:
+            buf = bytes(bytearray(buf))[:self.limit - sent]
+            self.data.append(buf)
+            sent += len(buf)
+        return sent
+
+    def sendall(self, data):
+        self.calls += 1
+        self.data.append(data)
+
+
+def make_response(version, sock, cfg=None):
+    cfg = cfg or Config()
+    data = ("GET / HTTP/%s\r\n\r\n" % version).encode("latin-1")
+    req = six.next(RequestParser(cfg, iter([data])))
+    return Response(req, sock, cfg)
+
+
+def recv_all(sock):
+    ret = []
+    data = sock.recv(8192)
+    while data:
+        ret.append(data)
+        data = sock.recv(8192)
+    return b"".join(ret)
+
+
+def test_writev_partial_sends():
+    sock = MockSocket(5)
+    can_sendmsg = util.can_sendmsg
+    util.can_sendmsg = lambda sock: True
+    try:
+        util.writev(sock, [b"abc", b"", b"defgh", b"ijklmnopq"])
+    finally:
+        util.can_sendmsg = can_sendmsg
+    t.eq(b"".join(sock.data), b"abcdefghijklmnopq")
+    t.eq(sock.calls, 4)
+
+
+def test_response_chunked():
+    a, b = socket.socketpair()
+    try:
+        resp = make_response("1.1", a)
+        resp.start_response("200 OK", [("Content-Type", "text/plain")])
+        resp.write(b"hello")
+        resp.write(b"")
+        resp.write(b" world")
+        resp.close()
+        a.close()
+        data = recv_all(b)
+    finally:
+        b.close()
+
+    head, body = data.split(b"\r\n\r\n", 1)
+    t.eq(head.split(b"\r\n")[0], b"HTTP/1.1 200 OK")
+    t.isin(b"Transfer-Encoding: chunked", head.split(b"\r\n"))
+    t.eq(body, b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n")
+
+
+def test_response_length():
+    a, b = socket.socketpair()
+    try:
+        resp = make_response("1.0", a)
+        resp.start_response("200 OK", [("Content-Length", "8")])
+        resp.write(b"hello")
+        resp.write(b" world")
+        resp.close()
+        a.close()
+        data = recv_all(b)
+    finally:
+        b.close()
+
+    head, body = data.split(b"\r\n\r\n", 1)
+    t.isin(b"Content-Length: 8", head.split(b"\r\n"))
+    t.eq(body, b"hello wo")
+
+
+def test_response_headers_only():
+    a, b = socket.socketpair()
+    try:
+        resp = make_response("1.1", a)
+        resp.start_response("204 No Content", [])
+        resp.close()
+        a.close()
+        data = recv_all(b)
+    finally:
+        b.close()
+
+    t.eq(data.split(b"\r\n")[0], b"HTTP/1.1 204 No Content")
+    t.eq(data.endswith(b"\r\n\r\n"), True)
+
+
+def test_response_buffer():
+    cfg = Config()
+    cfg.set("response_buffer_size", 64)
+    sock = MockSocket(0)
+    resp = make_response("1.1", sock, cfg)
+    resp.start_response("200 OK", [])
+    # the headers fill the buffer, then every 8 chunks of 9 bytes
+    for _ in range(10):
+        resp.write(b"abcd")
+    t.eq(sock.calls, 2)
+    resp.flush()
+    t.eq(sock.calls, 3)
+    resp.write(b"x" * 100)
+    t.eq(sock.calls, 4)
+    resp.write(b"efgh")
+    resp.close()
+    t.eq(sock.calls, 5)
+
+    data = b"".join(sock.data)
+    t.eq(data.split(b"\r\n\r\n", 1)[1],
+         b"4\r\nabcd\r\n" * 10 + b"64\r\n" + b"x" * 100 + b"\r\n" +
+         b"4\r\nefgh\r\n0\r\n\r\n")
+
+
+def test_response_buffer_headers_sent():
+    cfg = Config()
+    cfg.set("response_buffer_size", 1024)
+    sock = MockSocket(0)
+    resp = make_response("1.1", sock, cfg)
+    resp.start_response("200 OK", [("X-Old", "1")])
+    resp.write(b"abcd")
+    # only buffered, an error can still be answered instead
+    t.eq(resp.headers_sent, False)
+    try:
+        raise ValueError()
+    except ValueError:
+        resp.start_response("500 Internal Server Error",
+                            [("Content-Length", "5")], sys.exc_info())
+    resp.write(b"error")
+    resp.close()
+    t.eq(resp.headers_sent, True)
+
+    data = b"".join(sock.data)
+    t.eq(data.startswith(b"HTTP/1.1 500 Internal Server Error\r\n"), True)
+    t.eq(b"X-Old" in data, False)
+    t.eq(data.split(b"\r\n\r\n", 1)[1], b"error")
+
+
+def test_header_bytes(monkeypatch):
+    monkeypatch.setattr(time, "time", lambda: 1413000000.5)
+    resp = make_response("1.0", None)
+    resp.start_response("200 OK", [("Content-Length", "0")])
+    lines = resp.header_bytes().split(b"\r\n")
+    server = b"Server: " + SERVER_SOFTWARE.encode()
+    t.eq(lines[:2], [b"HTTP/1.0 200 OK", server])
+    t.eq(lines[2], b"Date: Sat, 11 Oct 2014 04:00:00 GMT")
+    t.eq(lines[3:], [b"Connection: close", b"Content-Length: 0", b"", b""])
+
+
+def test_date_header(monkeypatch):
+    now = [1413000000.2]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    t.eq(util.date_header(), b"Date: Sat, 11 Oct 2014 04:00:00 GMT\r\n")
+    now[0] = 1413000000.9
+    t.eq(util.date_header(), b"Date: Sat, 11 Oct 2014 04:00:00 GMT\r\n")
+    now[0] = 1413000001.0
+    t.eq(util.date_header(), b"Date: Sat, 11 Oct 2014 04:00:01 GMT\r\n")
@@ -0,0 +1,134 @@
+import json
+import os
+import select
+import socket
+import tempfile
+import time
+
+import t
+from gunicorn import util
+from gunicorn.admin import AdminSocket
+from gunicorn.config import Config
+from gunicorn.workers import workertmp
+from gunicorn.workers.workertmp import HeartbeatTable, WorkerTmp
+
+
+def test_notify_from_child():
+    tmp = WorkerTmp(Config())
+    try:
+        t.eq(tmp.requests(), 0)
+        t.lt(util.monotonic() - tmp.last_update(), 1)
+        pid = os.fork()
+        if pid == 0:
+            tmp.notify(42)
+            tmp.close()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        t.eq(tmp.requests(), 42)
+    finally:
+        tmp.close()
+
+
+def test_slots_are_reused():
+    table = HeartbeatTable(2)
+    t.eq(table.acquire(), 0)
+    t.eq(table.acquire(), 1)
+    table.release(0)
+    t.eq(table.acquire(), 0)
+    t.raises(IndexError, table.acquire)
+
+
+def test_new_table_when_full():
+    old_table = workertmp._table
+    workertmp._table = HeartbeatTable(1)
+    try:
+        first = WorkerTmp(Config())
+        second = WorkerTmp(Config())
+        t.ne(first.table, second.table)
+        first.notify(1)
+        second.notify(2)
+        t.eq((first.requests(), second.requests()), (1, 2))
+        first.close()
+        first.close()
+        t.eq(first.table.free, [0])
+    finally:
+        workertmp._table = old_table
+
+
+def test_status():
+    tmp = WorkerTmp(Config())
+    try:
+        t.eq(tmp.status()["state"], "booting")
+        t.eq(tmp.ready(), False)
+        tmp.set_status(workertmp.IDLE, 0)
+        t.eq(tmp.ready(), True)
+        tmp.set_status(workertmp.READING, 1)
+        tmp.set_status(workertmp.APP, 1, "/path?" + "x" * 300)
+        status = tmp.status()
+        t.eq(status["state"], "app")
+        t.eq(status["active"], 1)
+        t.eq(status["url"], ("/path?" + "x" * 300)[:workertmp.MAX_URL])
+        tmp.set_status(None, 2)
+        t.eq((tmp.status()["state"], tmp.status()["active"]), ("app", 2))
+        tmp.set_status(workertmp.IDLE, 0)
+        t.eq(sorted(tmp.status()), ["active", "last_update", "requests",
+                                    "state"])
+    finally:
+        tmp.close()
+
+
+class FakeWorker(object):
+    def __init__(self, age):
+        self.age = age
+        self.tmp = WorkerTmp(Config())
+
+
+class FakeArbiter(object):
+    pid = 1
+    num_workers = 2
+
+    def __init__(self):
+        self.WORKERS = {11: FakeWorker(2), 10: FakeWorker(1)}
+
+
+def test_admin_socket():
+    path = os.path.join(tempfile.mkdtemp(), "admin.sock")
+    admin = AdminSocket(path, Config())
+    arbiter = FakeArbiter()
+    client = socket.socket(socket.AF_UNIX)
+    try:
+        client.connect(path)
+        select.select([admin], [], [], 1)
+        admin.handle(arbiter)
+        data = json.loads(client.recv(65536).decode("utf-8"))
+        t.eq(data["pid"], 1)
+        t.eq([w["pid"] for w in data["workers"]], [10, 11])
+        t.eq(data["workers"][0]["state"], "booting")
+    finally:
+        client.close()
+        admin.close()
+        for worker in arbiter.WORKERS.values():
+            worker.tmp.close()
+    t.eq(os.path.exists(path), False)
+    os.rmdir(os.path.dirname(path))
+
+
+def test_admin_socket_never_waits(monkeypatch):
+    path = os.path.join(tempfile.mkdtemp(), "admin.sock")
+    admin = AdminSocket(path, Config())
+    # larger than any socket buffer, the client reads nothing
+    status = {"workers": "x" * (64 << 20)}
+    monkeypatch.setattr(admin, "status", lambda arbiter: status)
+    client = socket.socket(socket.AF_UNIX)
+    try:
+        client.connect(path)
+        select.select([admin], [], [], 1)
+        start = time.time()
+        admin.handle(None)
+        t.eq(time.time() - start < 1, True)
+        client.settimeout(1)
+        t.eq(client.recv(2), b'{"')
+    finally:
+        client.close()
+        admin.close()
+    os.rmdir(os.path.dirname(path))
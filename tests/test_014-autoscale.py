@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import socket
+import sys
+
+import pytest
+
+import t
+from gunicorn.arbiter import Arbiter
+from gunicorn.config import Config
+from gunicorn.sock import TCPSocket
+from tarbiter import App, add_worker, close, make_arbiter
+
+
+class FakeListener(object):
+    def __init__(self, queued):
+        self._queued = queued
+
+    def queued(self):
+        return self._queued
+
+
+def loaded_arbiter(active, queued=None, **settings):
+    settings.setdefault("max_workers", 8)
+    settings.setdefault("scale_cooldown", 0)
+    arbiter = make_arbiter(**settings)
+    for n in active:
+        add_worker(arbiter, active=n)
+    arbiter.LISTENERS = [FakeListener(queued)]
+    return arbiter
+
+
+def test_initial_workers_clamped():
+    t.eq(Arbiter(App(workers=1, min_workers=2, max_workers=4)).num_workers, 2)
+    t.eq(Arbiter(App(workers=6, max_workers=4)).num_workers, 4)
+    t.eq(Arbiter(App(workers=6)).num_workers, 6)
+
+
+def test_thresholds_ordered():
+    t.raises(RuntimeError, Arbiter, App(max_workers=4, scale_up_threshold=50,
+                                        scale_down_threshold=50))
+    t.raises(RuntimeError, Arbiter, App(max_workers=4, scale_up_threshold=20))
+    # unused without autoscaling
+    t.eq(Arbiter(App(scale_up_threshold=20)).scale_thresholds, None)
+
+
+def test_thresholds_kept_on_reload():
+    arbiter = Arbiter(App(max_workers=4, scale_up_threshold=60))
+    t.eq(arbiter.scale_thresholds, (30, 60))
+    arbiter.setup(App(max_workers=4, scale_up_threshold=10), reloading=True)
+    t.eq(arbiter.scale_thresholds, (30, 60))
+    arbiter.setup(App(max_workers=4, scale_down_threshold=40), reloading=True)
+    t.eq(arbiter.scale_thresholds, (40, 80))
+
+    # autoscaling enabled by the reload
+    arbiter = Arbiter(App())
+    arbiter.setup(App(max_workers=4, scale_up_threshold=10), reloading=True)
+    t.eq(arbiter.scale_thresholds, (30, 80))
+
+
+def test_scale_up():
+    arbiter = loaded_arbiter([1, 1], queued=3, workers=2)
+    try:
+        arbiter.autoscale()
+        # 5 busy out of 2 is 250%, 7 workers bring it under 80%
+        t.eq(arbiter.num_workers, 7)
+    finally:
+        close(arbiter)
+
+
+def test_scale_up_to_max_workers():
+    arbiter = loaded_arbiter([1, 1], queued=30, workers=2)
+    try:
+        arbiter.autoscale()
+        t.eq(arbiter.num_workers, 8)
+    finally:
+        close(arbiter)
+
+
+def test_scale_down():
+    arbiter = loaded_arbiter([0, 0, 0], workers=3, min_workers=2)
+    try:
+        arbiter.autoscale()
+        t.eq(arbiter.num_workers, 2)
+        arbiter.WORKERS.pop(3).close()
+        arbiter.autoscale()
+        t.eq(arbiter.num_workers, 2)
+    finally:
+        close(arbiter)
+
+
+def test_hysteresis():
+    arbiter = loaded_arbiter([1, 0, 0, 1], workers=4)
+    try:
+        arbiter.autoscale()
+        t.eq(arbiter.num_workers, 4)
+    finally:
+        close(arbiter)
+
+
+def test_cooldown():
+    arbiter = loaded_arbiter([1, 1], queued=3, workers=2, scale_cooldown=60)
+    try:
+        arbiter.autoscale()
+        t.eq(arbiter.num_workers, 2)
+        t.eq(len(arbiter.load_samples), 1)
+        arbiter.last_scale -= 60
+        arbiter.autoscale()
+        t.eq(arbiter.num_workers, 7)
+        t.eq(arbiter.load_samples, [])
+    finally:
+        close(arbiter)
+
+
+def test_nworkers_changed():
+    changes = []
+
+    def nworkers_changed(arbiter, new_value, old_value):
+        changes.append((new_value, old_value))
+
+    arbiter = loaded_arbiter([1, 1], workers=2, max_workers=3,
+                             nworkers_changed=nworkers_changed)
+    try:
+        arbiter.autoscale()
+        t.eq(changes, [(2, None), (3, 2)])
+    finally:
+        close(arbiter)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="TCP_INFO is linux only")
+def test_tcp_queued():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    clients = []
+    try:
+        listener = TCPSocket(sock.getsockname(), Config(), None,
+                             fd=sock.fileno())
+        t.eq(listener.queued(), 0)
+        for _ in range(3):
+            client = socket.socket()
+            client.connect(sock.getsockname())
+            clients.append(client)
+        t.eq(listener.queued(), 3)
+    finally:
+        for client in clients:
+            client.close()
+        listener.close()
+        sock.close()
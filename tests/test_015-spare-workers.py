@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import os
+
+import t
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+from gunicorn.workers.base import Worker
+from tarbiter import add_worker, close, killed, make_arbiter
+
+
+def spare_arbiter(spares, **settings):
+    arbiter = make_arbiter(**settings)
+    for spare in spares:
+        add_worker(arbiter, spare=spare)
+    return arbiter
+
+
+def test_spawn_spares():
+    arbiter = spare_arbiter([False, False], workers=2, spare_workers=2)
+    try:
+        arbiter.manage_workers()
+        t.eq(arbiter.spawned, [True, True])
+        t.eq(arbiter.killed, [])
+    finally:
+        close(arbiter)
+
+
+def test_promote_spare_on_retirement():
+    arbiter = spare_arbiter([False, False, True, True], workers=2,
+                            spare_workers=2)
+    try:
+        arbiter.WORKERS[2].tmp.notify(10)
+        arbiter.manage_workers()
+        t.eq(arbiter.WORKERS[2].retiring, True)
+        # the oldest spare takes its place and a new spare is started
+        t.eq(arbiter.WORKERS[3].spare, None)
+        t.eq(os.read(arbiter.WORKERS[3].pipe[0], 1), b".")
+        t.eq(arbiter.WORKERS[4].spare is None, False)
+        t.eq(arbiter.spawned, [True])
+        t.eq(arbiter.killed, [])
+        t.eq([pid for pid, _ in arbiter.active_workers()], [1, 3])
+    finally:
+        close(arbiter)
+
+
+def test_promote_dead_spare():
+    arbiter = spare_arbiter([False, True], workers=2, spare_workers=1)
+    try:
+        os.close(arbiter.WORKERS[2].pipe[0])
+        arbiter.WORKERS[2].pipe = None
+        arbiter.manage_workers()
+        t.eq(arbiter.WORKERS[2].retiring, True)
+        t.eq(arbiter.WORKERS[2].spare, None)
+        t.eq(arbiter.spawned, [False, True])
+    finally:
+        close(arbiter)
+
+
+def test_retire_spares():
+    arbiter = spare_arbiter([False, True, True], workers=1, spare_workers=1)
+    try:
+        arbiter.manage_workers()
+        t.eq(killed(arbiter), [2])
+        arbiter.num_workers = 0
+        arbiter.manage_workers()
+        t.eq(killed(arbiter), [2, 1, 3])
+        t.eq(arbiter.spawned, [])
+    finally:
+        close(arbiter)
+
+
+def test_wait_promotion():
+    cfg = Config()
+    worker = Worker(1, os.getppid(), [], None, 30, cfg, Logger(cfg))
+    r, w = os.pipe()
+    worker.spare = r
+    try:
+        os.write(w, b".")
+        worker.wait_promotion()
+        t.eq(worker.spare, None)
+        t.eq(worker.alive, True)
+        t.eq(worker.tmp.status()["state"], "spare")
+        worker.ready()
+        t.eq(worker.tmp.status()["state"], "idle")
+    finally:
+        os.close(w)
+        worker.tmp.close()
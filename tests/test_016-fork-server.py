@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import os
+import signal
+import sys
+import time
+import traceback
+
+import pytest
+
+import t
+from gunicorn import util
+from gunicorn.arbiter import Arbiter
+from gunicorn.forkserver import ForkServer
+from gunicorn.workers.base import Worker
+from tarbiter import App
+
+
+class ParentWorker(Worker):
+    "Publish the pid of its parent as its number of requests and exit"
+
+    def init_process(self):
+        self.tmp.notify(os.getppid())
+        os._exit(0)
+
+
+class ExitingForkServer(ForkServer):
+
+    def run(self):
+        # don't go back to the test runner in the forked process
+        try:
+            super(ExitingForkServer, self).run()
+        finally:
+            os._exit(0)
+
+
+def wait_adopted(pid):
+    limit = time.time() + 5
+    while True:
+        try:
+            return os.waitpid(pid, 0)[0]
+        except OSError:
+            if time.time() > limit:
+                raise
+            time.sleep(0.01)
+
+
+def in_child(func):
+    "Run ``func`` in a forked process, which doesn't change the runner"
+    def run():
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                func()
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        t.eq(os.waitpid(pid, 0)[1], 0)
+    run.__name__ = func.__name__
+    return run
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="child subreapers are linux only")
+@in_child
+def test_fork_server():
+    arbiter = Arbiter(App())
+    arbiter.pid = os.getpid()
+    arbiter.worker_class = ParentWorker
+    # the orphans of the process running the tests would be its children
+    # from now on
+    arbiter.subreaper = util.set_child_subreaper()
+    t.eq(arbiter.subreaper, True)
+    arbiter.fork_server = ExitingForkServer(arbiter)
+    server_pid = arbiter.fork_server.start()
+    try:
+        pid = arbiter.spawn_worker()
+        worker = arbiter.WORKERS[pid]
+        # the worker is adopted by the arbiter once the intermediate
+        # process exits
+        t.eq(wait_adopted(pid), pid)
+        t.eq(worker.tmp.requests(), os.getpid())
+        worker.tmp.close()
+    finally:
+        arbiter.fork_server.stop()
+        os.waitpid(server_pid, 0)
+
+
+class StalledForkServer(ForkServer):
+
+    def run(self):
+        # as if the application took forever to load
+        time.sleep(60)
+        os._exit(0)
+
+
+def test_fork_server_timeout():
+    arbiter = Arbiter(App(timeout=1))
+    arbiter.pid = os.getpid()
+    arbiter.worker_class = ParentWorker
+    arbiter.fork_server = StalledForkServer(arbiter)
+    server_pid = arbiter.fork_server.start()
+    start = time.time()
+    # the arbiter forks the worker itself
+    pid = arbiter.spawn_worker()
+    t.eq(time.time() - start < 5, True)
+    t.eq(arbiter.fork_server, None)
+    t.eq(os.waitpid(server_pid, 0)[1] & 0x7f, signal.SIGKILL)
+    worker = arbiter.WORKERS[pid]
+    t.eq(os.waitpid(pid, 0)[0], pid)
+    t.eq(worker.tmp.requests(), os.getpid())
+    worker.tmp.close()
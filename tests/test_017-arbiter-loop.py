@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import signal
+
+import t
+from gunicorn import util
+from tarbiter import FakeWorker, make_arbiter
+
+
+def test_heartbeat_timers():
+    arbiter = make_arbiter(timeout=30)
+    workers = [FakeWorker(age, arbiter.cfg) for age in range(3)]
+    try:
+        for pid, worker in enumerate(workers):
+            arbiter.add_worker(pid + 10, worker)
+        t.eq(len(arbiter.timeouts), 3)
+        t.eq(arbiter.sleep_timeout() > 29, True)
+
+        # a worker still notifying gets a later deadline
+        now = util.monotonic()
+        arbiter.timeouts = [(now - 1, 10, 0), (now + 30, 11, 1),
+                            (now + 30, 12, 2)]
+        arbiter.murder_workers()
+        t.eq(arbiter.killed, [])
+        t.eq(sorted(pid for _, pid, _ in arbiter.timeouts), [10, 11, 12])
+        t.eq(arbiter.timeouts[0][0] > now, True)
+
+        # a worker which didn't notify is aborted, then killed
+        workers[0].tmp.table.write(workers[0].tmp.index, now - 31, 0)
+        arbiter.timeouts = [(now - 1, 10, 0)]
+        t.eq(arbiter.sleep_timeout(), 0)
+        arbiter.murder_workers()
+        t.eq(arbiter.killed, [(10, signal.SIGABRT)])
+        t.eq(workers[0].aborted, True)
+        arbiter.timeouts = [(now - 1, 10, 0)]
+        arbiter.murder_workers()
+        t.eq(arbiter.killed[-1], (10, signal.SIGKILL))
+    finally:
+        for worker in workers:
+            worker.close()
+
+
+def test_heartbeat_timer_of_gone_worker():
+    arbiter = make_arbiter(timeout=30)
+    worker = FakeWorker(1, arbiter.cfg)
+    try:
+        arbiter.add_worker(10, worker)
+        arbiter.WORKERS.pop(10)
+        arbiter.timeouts = [(util.monotonic() - 1, 10, 1)]
+        arbiter.murder_workers()
+        t.eq(arbiter.killed, [])
+        t.eq(arbiter.timeouts, [])
+    finally:
+        worker.close()
+
+
+def test_sleep_timeout():
+    arbiter = make_arbiter(timeout=0)
+    t.eq(arbiter.sleep_timeout(), None)
+    arbiter = make_arbiter(timeout=0, max_workers=4)
+    t.eq(arbiter.sleep_timeout(), 1.0)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import t
+from gunicorn.workers import workertmp
+from tarbiter import close, killed, make_arbiter
+
+
+def booted_arbiter(num_workers, **settings):
+    arbiter = make_arbiter(workers=num_workers, **settings)
+    arbiter.spawn_workers()
+    boot(arbiter)
+    return arbiter
+
+
+def boot(arbiter):
+    for worker in arbiter.WORKERS.values():
+        worker.tmp.set_status(workertmp.IDLE, 0)
+
+
+def test_rolling_reload():
+    arbiter = booted_arbiter(5, reload_batch_size=2)
+    try:
+        arbiter.reload_age = arbiter.worker_age
+        arbiter.roll_workers()
+        t.eq(sorted(arbiter.WORKERS), [1, 2, 3, 4, 5, 6, 7])
+
+        # nothing is stopped until the new workers are ready
+        arbiter.manage_workers()
+        arbiter.roll_workers()
+        t.eq(killed(arbiter), [])
+        t.eq(len(arbiter.WORKERS), 7)
+
+        boot(arbiter)
+        arbiter.manage_workers()
+        arbiter.roll_workers()
+        t.eq(killed(arbiter), [1, 2])
+        t.eq(sorted(arbiter.WORKERS)[-2:], [8, 9])
+
+        boot(arbiter)
+        arbiter.roll_workers()
+        t.eq(killed(arbiter), [1, 2, 3, 4])
+        t.eq(sorted(arbiter.WORKERS)[-1], 10)
+
+        boot(arbiter)
+        arbiter.roll_workers()
+        t.eq(killed(arbiter), [1, 2, 3, 4, 5])
+        t.eq(arbiter.reload_age, None)
+        t.eq([pid for pid, _ in arbiter.active_workers()],
+             [6, 7, 8, 9, 10])
+    finally:
+        close(arbiter)
+
+
+def test_rolling_reload_fewer_workers():
+    arbiter = booted_arbiter(3, reload_batch_size=2)
+    try:
+        arbiter.num_workers = 1
+        arbiter.reload_age = arbiter.worker_age
+        arbiter.roll_workers()
+        # the extra old workers are stopped right away and a single worker
+        # replaces the last one
+        t.eq(killed(arbiter), [1, 2])
+        t.eq(sorted(arbiter.WORKERS), [1, 2, 3, 4])
+        boot(arbiter)
+        arbiter.roll_workers()
+        t.eq(killed(arbiter), [1, 2, 3])
+        t.eq(arbiter.reload_age, None)
+        arbiter.manage_workers()
+        t.eq(killed(arbiter), [1, 2, 3])
+    finally:
+        close(arbiter)
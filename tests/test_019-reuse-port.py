@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import errno
+import os
+import socket
+import sys
+
+import pytest
+
+import t
+from gunicorn import util
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+from gunicorn.sock import TCPSocket
+from gunicorn.workers.base import Worker
+
+
+def make_config(reuse_port):
+    cfg = Config()
+    cfg.set("reuse_port", reuse_port)
+    return cfg
+
+
+def refused(addr):
+    client = socket.socket()
+    try:
+        client.connect(addr)
+    except socket.error as e:
+        return e.args[0] == errno.ECONNREFUSED
+    finally:
+        client.close()
+    return False
+
+
+def test_shared_listener():
+    listener = TCPSocket(("127.0.0.1", 0), make_config(False), None)
+    try:
+        t.eq(listener.reuse_port, False)
+        t.eq(listener.worker_socket() is listener, True)
+    finally:
+        listener.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="SO_REUSEPORT is tested on linux")
+def test_worker_listeners():
+    cfg = make_config(True)
+    listener = TCPSocket(("127.0.0.1", 0), cfg, None)
+    workers = []
+    try:
+        addr = listener.getsockname()
+        # the arbiter doesn't accept connections
+        t.eq(listener.reuse_port, True)
+        t.eq(listener.queued(), None)
+        t.eq(refused(addr), True)
+
+        workers = [listener.worker_socket() for _ in range(2)]
+        t.eq([w.getsockname() for w in workers], [addr, addr])
+        t.eq(workers[0].fileno() != workers[1].fileno(), True)
+        # the workers only get connections once they listen
+        t.eq(refused(addr), True)
+        for worker in workers:
+            worker.listen(cfg.backlog)
+        t.eq(refused(addr), False)
+    finally:
+        for worker in workers:
+            worker.close()
+        listener.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="SO_REUSEPORT is tested on linux")
+def test_inherited_listener():
+    cfg = make_config(True)
+    listener = TCPSocket(("127.0.0.1", 0), cfg, None)
+    try:
+        # the socket given to a new arbiter on USR2 keeps the mode
+        fd = os.dup(listener.fileno())
+        inherited = TCPSocket(listener.getsockname(), cfg, None, fd=fd)
+        os.close(fd)
+        t.eq(inherited.reuse_port, True)
+        inherited.close()
+
+        # a listening socket, e.g. from systemd, is shared
+        shared = socket.socket()
+        shared.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        shared.bind(("127.0.0.1", 0))
+        shared.listen(16)
+        inherited = TCPSocket(shared.getsockname(), cfg, None,
+                              fd=shared.fileno())
+        t.eq(inherited.reuse_port, False)
+        t.eq(inherited.worker_socket() is inherited, True)
+        inherited.close()
+        shared.close()
+    finally:
+        listener.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"),
+                    reason="SO_REUSEPORT is tested on linux")
+def test_worker_socket_bound_before_setuid(monkeypatch):
+    cfg = make_config(True)
+    listener = TCPSocket(("127.0.0.1", 0), cfg, None)
+    worker = Worker(1, os.getppid(), [listener], None, 30, cfg, Logger(cfg))
+    owned = []
+
+    def set_owner_process(uid, gid):
+        owned.extend(worker.sockets)
+        raise SystemExit()
+
+    monkeypatch.setattr(util, "set_owner_process", set_owner_process)
+    try:
+        t.raises(SystemExit, worker.init_process)
+        t.eq(len(owned), 1)
+        t.eq(owned[0] is listener, False)
+        t.eq(owned[0].getsockname(), listener.getsockname())
+    finally:
+        for sock in owned:
+            sock.close()
+        worker.tmp.close()
+        listener.close()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import os
+import platform
+import select
+import socket
+
+import pytest
+
+import t
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+from gunicorn.sock import TCPSocket
+from gunicorn.workers import sync
+from gunicorn.workers.sync import SyncWorker
+
+
+def make_worker(**settings):
+    cfg = Config()
+    for k, v in settings.items():
+        cfg.set(k, v)
+    listener = TCPSocket(("127.0.0.1", 0), cfg, None)
+    worker = SyncWorker(1, os.getppid(), [listener], None, 30, cfg,
+                        Logger(cfg))
+    return worker, listener
+
+
+def close(worker, listener):
+    worker.tmp.close()
+    if worker.poller is not None:
+        worker.poller.close()
+    listener.close()
+
+
+def test_wait_select():
+    worker, listener = make_worker()
+    client = socket.socket()
+    try:
+        t.eq(worker.wait(0), [])
+        client.connect(listener.getsockname())
+        t.eq(worker.wait(1), [listener])
+    finally:
+        client.close()
+        close(worker, listener)
+
+
+@pytest.mark.skipif(not hasattr(select, "epoll"),
+                    reason="EPOLLEXCLUSIVE needs epoll")
+def test_wait_epoll():
+    worker, listener = make_worker()
+    client = socket.socket()
+    try:
+        if not worker.init_poller():
+            pytest.skip("EPOLLEXCLUSIVE isn't supported by the kernel")
+        t.eq(worker.wait(0), [])
+        client.connect(listener.getsockname())
+        t.eq(worker.wait(1), [listener])
+    finally:
+        client.close()
+        close(worker, listener)
+
+
+@pytest.mark.skipif(not hasattr(select, "epoll"),
+                    reason="EPOLLEXCLUSIVE needs epoll")
+def test_epoll_exclusive_kernel(monkeypatch):
+    # older kernels ignore the flag instead of rejecting it
+    for release, supported in [("4.4.0-210-generic", False),
+                               ("4.5.0", True), ("5.15.0-91-generic", True),
+                               ("unknown", False)]:
+        monkeypatch.setattr(platform, "release", lambda: release)
+        t.eq(sync.has_epoll_exclusive(), supported)
+
+
+def test_accept_lock_over_epoll():
+    worker, listener = make_worker(accept_mutex=True)
+    try:
+        t.eq(worker.init_poller(), False)
+        t.eq(worker.poller, None)
+    finally:
+        close(worker, listener)
+
+
+def test_accept_lock():
+    worker, listener = make_worker(accept_mutex=True)
+    locked = os.pipe()
+    done = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # another worker holds the lock until the test is done
+        worker.lock_accept()
+        os.write(locked[1], b".")
+        os.read(done[0], 1)
+        os._exit(0)
+
+    client = socket.socket()
+    try:
+        t.eq(os.read(locked[0], 1), b".")
+        client.connect(listener.getsockname())
+        # the connection is left to the worker holding the lock
+        t.eq(worker.lock_accept(), False)
+        t.eq(worker.wait(1), [])
+        os.write(done[1], b".")
+        os.waitpid(pid, 0)
+        t.eq(worker.wait(1), [listener])
+        # the lock is released after waiting
+        t.eq(worker.lock_accept(), True)
+        worker.unlock_accept()
+    finally:
+        [os.close(fd) for fd in locked + done]
+        client.close()
+        close(worker, listener)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import t
+from gunicorn import util
+from tgthread import close, finish, make_conn, make_worker
+
+
+def test_murder_keepalived():
+    worker = make_worker(keepalive=5)
+    pairs = [make_conn(worker.cfg) for _ in range(3)]
+    conns = [conn for conn, _ in pairs]
+    monotonic = util.monotonic
+    now = [100.0]
+    util.monotonic = lambda: now[0]
+    try:
+        for conn in conns:
+            finish(worker, conn)
+            now[0] += 1
+        t.eq(len(worker._keep), 3)
+        t.eq(len(worker.poller.get_map()), 3)
+
+        # the second connection starts a new request, it is kept alive
+        # again once done
+        worker.handle_client(conns[1], conns[1].sock)
+        t.eq(conns[1].timeout, 133)
+        finish(worker, conns[1])
+
+        # the first and last connections expire, the second one has a later
+        # deadline
+        now[0] = 107
+        worker.murder_keepalived()
+        t.eq(conns[0].sock.fileno(), -1)
+        t.eq(conns[1].timeout, 108)
+        t.eq(conns[2].sock.fileno(), -1)
+        t.eq([c for _, c in worker._keep], [conns[1]])
+
+        now[0] = 113
+        worker.murder_keepalived()
+        t.eq(conns[1].sock.fileno(), -1)
+        t.eq(len(worker._keep), 0)
+        t.eq(len(worker.poller.get_map()), 0)
+    finally:
+        util.monotonic = monotonic
+        close(worker)
+        for conn, client in pairs:
+            conn.sock.close()
+            client.close()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import t
+from gunicorn import util
+from gunicorn.config import Config
+from tgthread import close, finish, gthread, make_conn, make_worker
+
+
+def test_read_head():
+    conn, client = make_conn(Config())
+    try:
+        # nothing to read yet
+        t.eq(conn.read_head(), False)
+        for data in [b"GET /first HTTP/1.1\r\nHost: a", b"\r\n\r",
+                     b"\n"]:
+            t.eq(conn.head_received(), False)
+            client.sendall(data)
+            done = conn.read_head()
+        t.eq(done, True)
+        t.eq(conn.scanned, 0)
+
+        # the request is parsed from the buffer
+        conn.init()
+        req = next(conn.parser)
+        t.eq(req.path, "/first")
+        t.eq(req.headers, [("HOST", "a")])
+    finally:
+        conn.sock.close()
+        client.close()
+
+
+def test_read_head_end():
+    conn, client = make_conn(Config())
+    try:
+        client.sendall(b"GET / HTTP/1.1\r\n")
+        t.eq(conn.read_head(), False)
+        client.close()
+        # the client is gone, the parser reports it
+        t.eq(conn.read_head(), True)
+    finally:
+        conn.sock.close()
+
+
+def test_read_head_too_large():
+    cfg = Config()
+    cfg.set("limit_request_fields", 1)
+    cfg.set("limit_request_field_size", 10)
+    conn, client = make_conn(cfg)
+    try:
+        client.sendall(b"GET / HTTP/1.1\r\n")
+        t.eq(conn.read_head(), False)
+        client.sendall(b"X" * conn.max_head)
+        while not conn.read_head():
+            pass
+        t.eq(conn.scanned, 0)
+    finally:
+        conn.sock.close()
+        client.close()
+
+
+def test_handle_client():
+    worker = make_worker()
+    conn, client = make_conn(Config())
+    try:
+        worker.poller.register(conn.sock, gthread.selectors.EVENT_READ)
+        worker.wait_head(conn)
+        deadline = conn.timeout
+        client.sendall(b"GET / HTTP/1.1\r\n")
+        worker.handle_client(conn, conn.sock)
+        t.eq(worker.tpool.submitted, [])
+        t.eq(len(worker.poller.get_map()), 1)
+        t.eq(conn.timeout, deadline)
+
+        client.sendall(b"\r\n")
+        worker.handle_client(conn, conn.sock)
+        t.eq(worker.tpool.submitted, [conn])
+        t.eq(len(worker.poller.get_map()), 0)
+        t.eq(conn.timeout, None)
+    finally:
+        close(worker)
+        conn.sock.close()
+        client.close()
+
+
+def test_pipelined_request():
+    worker = make_worker()
+    conn, client = make_conn(Config())
+    try:
+        client.sendall(b"GET /1 HTTP/1.1\r\n\r\nGET /2 HTTP/1.1\r\n\r\n")
+        t.eq(conn.read_head(), True)
+        conn.init()
+        t.eq(next(conn.parser).path, "/1")
+
+        finish(worker, conn)
+        # the buffered request is handled without waiting for the socket
+        t.eq(worker.tpool.submitted, [conn])
+        t.eq(len(worker.poller.get_map()), 0)
+        t.eq(len(worker._keep), 0)
+    finally:
+        close(worker)
+        conn.sock.close()
+        client.close()
+
+
+def test_head_timeout():
+    worker = make_worker(timeout=10)
+    conn, client = make_conn(worker.cfg)
+    monotonic = util.monotonic
+    now = [100.0]
+    util.monotonic = lambda: now[0]
+    try:
+        worker.poller.register(conn.sock, gthread.selectors.EVENT_READ)
+        worker.wait_head(conn)
+        t.eq(conn.timeout, 110)
+
+        # a client sending its head slowly doesn't get more time
+        for data in [b"GET / HTTP/1.1\r\n", b"Host: a\r\n"]:
+            now[0] += 4
+            client.sendall(data)
+            worker.handle_client(conn, conn.sock)
+            worker.murder_keepalived()
+            t.eq(conn.timeout, 110)
+
+        now[0] = 110
+        worker.murder_keepalived()
+        t.eq(conn.sock.fileno(), -1)
+        t.eq(len(worker._heads), 0)
+        t.eq(len(worker.poller.get_map()), 0)
+        t.eq(worker.tpool.submitted, [])
+    finally:
+        util.monotonic = monotonic
+        close(worker)
+        conn.sock.close()
+        client.close()
+
+
+def test_keepalive_then_head_timeout():
+    worker = make_worker(keepalive=2, timeout=10)
+    conn, client = make_conn(worker.cfg)
+    monotonic = util.monotonic
+    now = [100.0]
+    util.monotonic = lambda: now[0]
+    try:
+        finish(worker, conn)
+        t.eq(conn.timeout, 102)
+
+        # the next request starts, its head must come within the timeout
+        now[0] = 101
+        client.sendall(b"GET / HTTP/1.1\r\n")
+        worker.handle_client(conn, conn.sock)
+        t.eq(conn.timeout, 111)
+        now[0] = 105
+        worker.murder_keepalived()
+        t.eq(conn.sock.fileno() != -1, True)
+        now[0] = 111
+        worker.murder_keepalived()
+        t.eq(conn.sock.fileno(), -1)
+    finally:
+        util.monotonic = monotonic
+        close(worker)
+        conn.sock.close()
+        client.close()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import os
+import socket
+
+import t
+from gunicorn import util
+from tgthread import close, finish, futures, make_conn, make_worker
+
+
+def test_set_accepting():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    worker = make_worker()
+    worker.sockets = [listener]
+    # the listeners aren't registered yet
+    worker.accepting = False
+    try:
+        worker.set_accepting(True)
+        t.eq(list(worker.poller.get_map()), [listener.fileno()])
+        worker.set_accepting(True)
+        t.eq(len(worker.poller.get_map()), 1)
+
+        # the listener is left in the backlog while the pool is saturated
+        worker.set_accepting(False)
+        t.eq(len(worker.poller.get_map()), 0)
+        worker.set_accepting(False)
+        t.eq(worker.accepting, False)
+    finally:
+        close(worker)
+        listener.close()
+
+
+def test_finish_request_wakes_up_the_loop():
+    worker = make_worker()
+    worker.PIPE = os.pipe()
+    for p in worker.PIPE:
+        util.set_non_blocking(p)
+    # the pool is saturated
+    worker.accepting = False
+    conn, client = make_conn(worker.cfg)
+    try:
+        finish(worker, conn, keepalive=False)
+        t.eq(len(worker.futures), 0)
+        t.eq(os.read(worker.PIPE[0], 1), b".")
+        worker.clear_pipe(worker.PIPE[0])
+    finally:
+        close(worker)
+        [os.close(p) for p in worker.PIPE]
+        client.close()
+
+
+def test_queue_wait():
+    worker = make_worker()
+    conn, client = make_conn(worker.cfg)
+    try:
+        client.sendall(b"GET / HTTP/1.1\r\n\r\n")
+        client.shutdown(socket.SHUT_WR)
+        conn.queued = util.monotonic() - 1
+        worker.handle_request = lambda req, conn: False
+        t.eq(worker.handle(conn), (False, conn))
+        metric, value = worker.log.metrics[0]
+        t.eq(metric, "gunicorn.queue.wait")
+        t.eq(value >= 1000, True)
+    finally:
+        close(worker)
+        conn.sock.close()
+        client.close()
+
+
+def test_max_queue_time():
+    worker = make_worker(max_queue_time=500)
+    conn, client = make_conn(worker.cfg)
+    try:
+        client.sendall(b"GET / HTTP/1.1\r\n\r\n")
+        conn.queued = util.monotonic() - 1
+        t.eq(worker.handle(conn), (False, conn))
+        t.eq(worker.log.metrics[-1], ("gunicorn.queue.rejected", 1))
+        t.eq(client.recv(4096).startswith(b"HTTP/1.1 503 "), True)
+
+        # a connection within the budget is handled
+        handled = []
+        worker.handle_request = lambda req, conn: handled.append(req.path)
+        conn.queued = util.monotonic()
+        worker.handle(conn)
+        t.eq(handled, ["/"])
+    finally:
+        close(worker)
+        conn.sock.close()
+        client.close()
+
+
+def test_queue_depth():
+    worker = make_worker(threads=2)
+    try:
+        worker.futures.extend([futures.Future() for _ in range(5)])
+        worker.log_queue_depth()
+        t.eq(worker.log.metrics, [("gunicorn.queue.depth", 3)])
+        # sampled at most once per second
+        worker.log_queue_depth()
+        t.eq(len(worker.log.metrics), 1)
+    finally:
+        close(worker)
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+from functools import partial
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+import t
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+from gunicorn.http import wsgi
+from gunicorn.http.parser import RequestParser
+
+if sys.version_info < (3, 5):
+    pytest.skip("the gasyncio worker requires Python >= 3.5")
+asyncio = pytest.importorskip("asyncio")
+futures = pytest.importorskip("concurrent.futures")
+from gunicorn.workers import _gasyncio
+import asgiapp
+
+
+def echo(environ, start_response):
+    body = environ["wsgi.input"].read()
+    start_response("200 OK", [("Content-Length", str(len(body)))])
+    return [body]
+
+
+def make_worker(app, **settings):
+    cfg = Config()
+    for k, v in settings.items():
+        cfg.set(k, v)
+    worker = _gasyncio.AsyncioWorker(1, os.getppid(), [], None, 30, cfg,
+                                     Logger(cfg))
+    worker.loop = asyncio.new_event_loop()
+    worker.tpool = futures.ThreadPoolExecutor(max_workers=2)
+    worker.wsgi = app
+    if _gasyncio.is_asgi(app):
+        worker.lifespan = _gasyncio.Lifespan(worker)
+    return worker
+
+
+def close_worker(worker):
+    worker.tpool.shutdown()
+    worker.loop.close()
+    worker.tmp.close()
+
+
+def exchange(worker, data):
+    "Send ``data`` to the worker and return what it sends back"
+    loop = worker.loop
+    server = loop.run_until_complete(loop.create_server(
+        partial(_gasyncio.HttpProtocol, worker), "127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+
+    def client():
+        sock = socket.create_connection(("127.0.0.1", port))
+        try:
+            sock.sendall(data)
+            sock.shutdown(socket.SHUT_WR)
+            received = []
+            chunk = sock.recv(8192)
+            while chunk:
+                received.append(chunk)
+                chunk = sock.recv(8192)
+            return b"".join(received)
+        finally:
+            sock.close()
+
+    try:
+        return loop.run_until_complete(loop.run_in_executor(None, client))
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+
+
+def bodies(response):
+    return [part.split(b"\r\n\r\n", 1)[1].split(b"HTTP/1.1")[0]
+            for part in response.split(b"HTTP/1.1 200 OK")[1:]]
+
+
+REQUESTS = (b"POST / HTTP/1.1\r\nContent-Length: 5\r\n\r\nfirst"
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"3\r\nsec\r\n3\r\nond\r\n0\r\n\r\n"
+            b"GET / HTTP/1.1\r\n\r\n")
+
+
+def test_feed_unreader():
+    unreader = _gasyncio.FeedUnreader()
+    drained = []
+    unreader.on_drain = lambda: drained.append(True)
+    unreader.feed(b"abc")
+    t.eq(unreader.buffered(), 3)
+    t.eq(unreader.read(2), b"ab")
+    t.eq(drained, [True])
+
+    # a reader waits for the data of the loop
+    timer = threading.Timer(0.1, unreader.feed, [b"def"])
+    timer.start()
+    t.eq(unreader.read(4), b"cdef")
+    timer.join()
+    unreader.feed_eof()
+    t.eq(unreader.read(), b"")
+
+
+def test_asgi_scope():
+    parser = RequestParser(Config(), [
+        b"GET /a%20b?x=1 HTTP/1.1\r\nHost: example.com:8000\r\n"
+        b"X-Test: 1\r\n\r\n"])
+    req = next(parser)
+    resp, environ = wsgi.create(req, None, ("10.0.0.1", 1234),
+                                ("127.0.0.1", 8000), Config())
+    scope = _gasyncio.asgi_scope(req, environ)
+    t.eq(scope["type"], "http")
+    t.eq(scope["http_version"], "1.1")
+    t.eq(scope["path"], "/a b")
+    t.eq(scope["raw_path"], b"/a%20b")
+    t.eq(scope["query_string"], b"x=1")
+    t.eq(scope["headers"], [(b"host", b"example.com:8000"),
+                            (b"x-test", b"1")])
+    t.eq(scope["client"], ("10.0.0.1", 1234))
+    t.eq(scope["server"], ("127.0.0.1", 8000))
+
+
+def test_is_asgi():
+    t.eq(_gasyncio.is_asgi(echo), False)
+    t.eq(_gasyncio.is_asgi(asgiapp.hello), True)
+    t.eq(_gasyncio.is_asgi(asgiapp.EchoApp()), True)
+
+
+def test_wsgi():
+    worker = make_worker(echo)
+    try:
+        response = exchange(worker, REQUESTS)
+        # the requests are handled in turn on the same connection
+        t.eq(bodies(response), [b"first", b"second", b""])
+        t.eq(worker.nr, 3)
+    finally:
+        close_worker(worker)
+
+
+def test_asgi():
+    app = asgiapp.EchoApp()
+    worker = make_worker(app)
+    try:
+        worker.loop.run_until_complete(worker.lifespan.startup())
+        t.eq(app.events, ["lifespan.startup"])
+        response = exchange(worker, REQUESTS)
+        t.eq(bodies(response), [b"first", b"second", b""])
+        worker.loop.run_until_complete(worker.lifespan.shutdown())
+        t.eq(app.events, ["lifespan.startup", "lifespan.shutdown"])
+    finally:
+        close_worker(worker)
+
+
+def test_asgi_without_lifespan():
+    worker = make_worker(asgiapp.hello)
+    try:
+        worker.loop.run_until_complete(worker.lifespan.startup())
+        response = exchange(worker, b"GET / HTTP/1.0\r\n\r\n")
+        t.eq(response.split(b"\r\n")[0], b"HTTP/1.0 404 Not Found")
+        t.eq(response.endswith(b"\r\n\r\nhello world"), True)
+    finally:
+        close_worker(worker)
+
+
+def test_bad_request():
+    worker = make_worker(echo)
+    try:
+        response = exchange(worker, b"GET / HTTP/9x\r\n\r\n")
+        t.eq(response.split(b"\r\n")[0], b"HTTP/1.1 400 Bad Request")
+        t.eq(worker.nr, 0)
+    finally:
+        close_worker(worker)
+
+
+def closed_after(worker, *heads):
+    """\
+    Connect a client sending each of ``heads`` and return the seconds
+    after which the worker closed their connections.
+    """
+    loop = worker.loop
+    server = loop.run_until_complete(loop.create_server(
+        partial(_gasyncio.HttpProtocol, worker), "127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+
+    def client():
+        socks = []
+        try:
+            for head in heads:
+                sock = socket.create_connection(("127.0.0.1", port))
+                sock.settimeout(10)
+                socks.append(sock)
+                sock.sendall(head)
+            start = time.time()
+            elapsed = []
+            for sock in socks:
+                # what the worker answered to complete requests, then EOF
+                while sock.recv(8192):
+                    pass
+                elapsed.append(time.time() - start)
+            return elapsed
+        finally:
+            [sock.close() for sock in socks]
+
+    try:
+        return loop.run_until_complete(loop.run_in_executor(None, client))
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+
+
+def test_head_timeout():
+    worker = make_worker(echo, timeout=1, keepalive=30)
+    try:
+        # an idle client and one stopping in the middle of its head
+        elapsed = closed_after(worker, b"", b"GET / HTTP/1.1\r\n")
+        t.eq([e < 5 for e in elapsed], [True, True])
+    finally:
+        close_worker(worker)
+
+
+def test_keepalive_then_head_timeout():
+    worker = make_worker(echo, timeout=1, keepalive=30)
+    try:
+        # the next request started, the keepalive timeout no longer applies
+        elapsed = closed_after(worker, b"GET / HTTP/1.1\r\n\r\n"
+                                       b"GET / HTTP/1.1\r\n")
+        t.eq(elapsed[0] < 5, True)
+        t.eq(worker.nr, 1)
+    finally:
+        close_worker(worker)
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.data = []
+        self.closed = False
+
+    def get_extra_info(self, name):
+        return None
+
+    def write(self, data):
+        self.data.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+def test_head_too_large():
+    worker = make_worker(echo)
+    protocol = _gasyncio.HttpProtocol(worker)
+    transport = FakeTransport()
+    protocol.connection_made(transport)
+
+    def flood():
+        # a request line then headers without their end, in the loop
+        protocol.data_received(b"GET / HTTP/1.1\r\n")
+        for _ in range(100):
+            protocol.data_received(b"X" * 8400)
+            if transport.closed:
+                break
+
+    thread = threading.Thread(target=flood)
+    thread.daemon = True
+    thread.start()
+    thread.join(5)
+    try:
+        # the loop isn't blocked waiting for the end of the head
+        t.eq(thread.is_alive(), False)
+        t.eq(transport.closed, True)
+        response = b"".join(transport.data)
+        t.eq(response.split(b"\r\n")[0], b"HTTP/1.1 400 Bad Request")
+    finally:
+        protocol.connection_lost(None)
+        close_worker(worker)
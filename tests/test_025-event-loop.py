@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import sys
+import types
+
+import pytest
+
+import t
+from gunicorn import util
+from gunicorn.config import Config
+
+asyncio = pytest.importorskip("asyncio")
+
+
+class FakePolicy(asyncio.DefaultEventLoopPolicy):
+    pass
+
+
+def with_uvloop(func):
+    "Run ``func`` with a fake uvloop module installed"
+    def run():
+        saved = sys.modules.get("uvloop")
+        uvloop = types.ModuleType("uvloop")
+        uvloop.EventLoopPolicy = FakePolicy
+        sys.modules["uvloop"] = uvloop
+        try:
+            func()
+        finally:
+            asyncio.set_event_loop_policy(None)
+            if saved is None:
+                del sys.modules["uvloop"]
+            else:
+                sys.modules["uvloop"] = saved
+    run.__name__ = func.__name__
+    return run
+
+
+def test_event_loop_setting():
+    cfg = Config()
+    t.eq(cfg.event_loop, "auto")
+    cfg.set("event_loop", "uvloop")
+    t.eq(cfg.event_loop, "uvloop")
+    t.raises(ValueError, cfg.set, "event_loop", "tornado")
+
+
+@with_uvloop
+def test_uvloop_policy():
+    for name in ("auto", "uvloop"):
+        asyncio.set_event_loop_policy(None)
+        util.set_event_loop_policy(name)
+        t.eq(type(asyncio.get_event_loop_policy()), FakePolicy)
+
+    util.set_event_loop_policy("asyncio")
+    t.eq(type(asyncio.get_event_loop_policy()) is FakePolicy, False)
+
+
+def test_without_uvloop():
+    saved = sys.modules.get("uvloop")
+    # a None entry makes the import fail
+    sys.modules["uvloop"] = None
+    try:
+        policy = asyncio.get_event_loop_policy()
+        util.set_event_loop_policy("auto")
+        t.eq(asyncio.get_event_loop_policy() is policy, True)
+        t.raises(RuntimeError, util.set_event_loop_policy, "uvloop")
+    finally:
+        if saved is None:
+            del sys.modules["uvloop"]
+        else:
+            sys.modules["uvloop"] = saved
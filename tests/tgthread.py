@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -
+#
+# This file is part of gunicorn released under the MIT license.
+# See the NOTICE for more information.
+
+import os
+import socket
+
+import pytest
+
+from gunicorn.config import Config
+from gunicorn.glogging import Logger
+from gunicorn.http.parser import RequestParser
+
+futures = pytest.importorskip("concurrent.futures")
+gthread = pytest.importorskip("gunicorn.workers.gthread")
+
+
+class MetricsLogger(Logger):
+    "Record the metrics logged instead of the debug messages"
+
+    def __init__(self, cfg):
+        super(MetricsLogger, self).__init__(cfg)
+        self.metrics = []
+
+    def debug(self, msg, *args, **kwargs):
+        extra = kwargs.get("extra")
+        if extra is not None:
+            self.metrics.append((extra["metric"], extra["value"]))
+
+
+class FakePool(object):
+    "Record the connections submitted, they are never handled"
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, conn):
+        self.submitted.append(conn)
+        return futures.Future()
+
+
+def make_worker(**settings):
+    """\
+    Return a thread worker accepting connections, as in run(), with a
+    fake pool.
+    """
+    cfg = Config()
+    for k, v in settings.items():
+        cfg.set(k, v)
+    worker = gthread.ThreadWorker(1, os.getppid(), [], None, 30, cfg,
+                                  MetricsLogger(cfg))
+    worker.poller = gthread.selectors.DefaultSelector()
+    worker.tpool = FakePool()
+    worker.accepting = True
+    return worker
+
+
+def make_conn(cfg):
+    "Return a connection and the socket of its client"
+    a, b = socket.socketpair()
+    conn = gthread.TConn(cfg, None, a, None, RequestParser)
+    return conn, b
+
+
+def finish(worker, conn, keepalive=True):
+    "Finish the request handled on ``conn`` by a thread"
+    fs = futures.Future()
+    fs.conn = conn
+    fs.set_result((keepalive, conn))
+    worker.futures.append(fs)
+    worker.finish_request(fs)
+
+
+def close(worker):
+    worker.tmp.close()
+    worker.poller.close()
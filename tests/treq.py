@@ -12,13 +12,24 @@ import random
 from gunicorn._compat import execfile_
 from gunicorn.config import Config
 from gunicorn.http.errors import ParseException
-from gunicorn.http.parser import RequestParser
+from gunicorn.http.parser import HttptoolsRequestParser
 from gunicorn.six.moves.urllib.parse import urlparse
 from gunicorn import six
 
 dirname = os.path.dirname(__file__)
 random.seed()
 
+# parsers every request of the corpus is checked against
+PARSERS = ["python"]
+try:
+    HttptoolsRequestParser.setup()
+except RuntimeError:
+    # the httptools tox environment must test that parser
+    if os.environ.get("GUNICORN_TEST_HTTPTOOLS"):
+        raise
+else:
+    PARSERS.append("httptools")
+
 def uri(data):
     ret = {"raw": data}
     parts = urlparse(data)
@@ -38,11 +49,12 @@ def uri(data):
     ret["fragment"] = parts.fragment or ''
     return ret
 
-def load_py(fname):
+def load_py(fname, parser_class="python"):
     config = globals().copy()
     config["uri"] = uri
     config["cfg"] = Config()
     execfile_(fname, config)
+    config["cfg"].set("parser_class", parser_class)
     return config
 
 class request(object):
@@ -251,7 +263,7 @@ class request(object):
 
     def check(self, cfg, sender, sizer, matcher):
         cases = self.expect[:]
-        p = RequestParser(cfg, sender())
+        p = cfg.parser_class(cfg, sender())
         for req in p:
             self.same(req, sizer, matcher, cases.pop(0))
         t.eq(len(cases), 0)
@@ -287,5 +299,5 @@ class badrequest(object):
             read += chunk
 
     def check(self, cfg):
-        p = RequestParser(cfg, self.send())
+        p = cfg.parser_class(cfg, self.send())
         six.next(p)